@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+
+import os, sys
+import csv
+import time
+import sqlite3
+
+"""Campaign store: injected bugs, tool runs, findings and metrics of evaluation campaigns in one SQLite file"""
+
+schema = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    started REAL
+);
+CREATE TABLE IF NOT EXISTS contracts (
+    id INTEGER PRIMARY KEY,
+    campaign INTEGER NOT NULL REFERENCES campaigns(id),
+    contract TEXT NOT NULL,
+    bug_type TEXT NOT NULL,
+    buggy_file TEXT,
+    UNIQUE (campaign, contract, bug_type)
+);
+CREATE TABLE IF NOT EXISTS injected_bugs (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL REFERENCES contracts(id) ON DELETE CASCADE,
+    loc INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    bug_type TEXT NOT NULL,
+    approach TEXT
+);
+CREATE TABLE IF NOT EXISTS tool_runs (
+    id INTEGER PRIMARY KEY,
+    contract_id INTEGER NOT NULL REFERENCES contracts(id) ON DELETE CASCADE,
+    tool TEXT NOT NULL,
+    status TEXT,
+    returncode INTEGER,
+    time REAL,
+    report TEXT,
+    user_time REAL,
+    sys_time REAL,
+    max_rss INTEGER,
+    read_bytes INTEGER,
+    write_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS injection_usage (
+    contract_id INTEGER PRIMARY KEY REFERENCES contracts(id) ON DELETE CASCADE,
+    wall REAL,
+    user_time REAL,
+    sys_time REAL,
+    max_rss INTEGER,
+    read_bytes INTEGER,
+    write_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES tool_runs(id) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    code TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    campaign INTEGER NOT NULL REFERENCES campaigns(id),
+    tool TEXT NOT NULL,
+    bug_type TEXT NOT NULL,
+    injected INTEGER,
+    false_negatives INTEGER,
+    misclassified INTEGER,
+    undetected INTEGER,
+    false_positives INTEGER,
+    excluded_by_majority INTEGER,
+    PRIMARY KEY (campaign, tool, bug_type)
+);
+CREATE INDEX IF NOT EXISTS contracts_by_type ON contracts (bug_type, campaign);
+CREATE INDEX IF NOT EXISTS bugs_by_contract ON injected_bugs (contract_id);
+CREATE INDEX IF NOT EXISTS runs_by_tool ON tool_runs (tool, contract_id);
+CREATE INDEX IF NOT EXISTS findings_by_run ON findings (run_id, line);
+CREATE INDEX IF NOT EXISTS metrics_by_tool ON metrics (tool, bug_type);
+"""
+
+"""Columns added since the first version of the schema, added to older stores when they are opened"""
+added_columns = {'tool_runs':[('user_time', 'REAL'), ('sys_time', 'REAL'), ('max_rss', 'INTEGER'), ('read_bytes', 'INTEGER'), ('write_bytes', 'INTEGER')]}
+
+"""WAL lets readers and one writer of a host work at once, but needs shared memory: stores on a network
+filesystem (e.g. reached from job_queue.py workers on several hosts) must use DELETE"""
+journal_mode = "WAL"
+
+def connect(db_path, mode=None):
+    """Open (and create if needed) a campaign store; safe to use from several worker processes of one host,
+    and from several hosts with the journal mode DELETE"""
+    mode = mode or journal_mode
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode={0}".format(mode))
+    if mode == "WAL":
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(schema)
+    for table, columns in added_columns.items():
+        existing = set(row[1] for row in conn.execute("PRAGMA table_info({0})".format(table)))
+        for name, kind in columns:
+            if name not in existing:
+                conn.execute("ALTER TABLE {0} ADD COLUMN {1} {2}".format(table, name, kind))
+    return conn
+
+def get_campaign(conn, name):
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO campaigns (name, started) VALUES (?, ?)", (name, time.time()))
+    return conn.execute("SELECT id FROM campaigns WHERE name = ?", (name,)).fetchone()[0]
+
+def get_contract(conn, campaign, contract, bug_type, buggy_file=None):
+    conn.execute("INSERT OR IGNORE INTO contracts (campaign, contract, bug_type, buggy_file) VALUES (?, ?, ?, ?)",
+                 (campaign, str(contract), bug_type, buggy_file))
+    if buggy_file is not None:
+        conn.execute("UPDATE contracts SET buggy_file = ? WHERE campaign = ? AND contract = ? AND bug_type = ?",
+                     (buggy_file, campaign, str(contract), bug_type))
+    return conn.execute("SELECT id FROM contracts WHERE campaign = ? AND contract = ? AND bug_type = ?",
+                        (campaign, str(contract), bug_type)).fetchone()[0]
+
+def record_injections(conn, campaign, injections):
+    """Store bug logs in one transaction, replacing previous injections of the same contract and type
+
+    injections is a list of dicts with 'contract', 'bug_type', 'buggy_file', 'bug_log' (solidifi.BugLog rows)
+    and optionally 'usage', the resources the injection took (see resources.py)
+    """
+    with conn:
+        for inj in injections:
+            contract_id = get_contract(conn, campaign, inj['contract'], inj['bug_type'], inj['buggy_file'])
+            conn.execute("DELETE FROM injected_bugs WHERE contract_id = ?", (contract_id,))
+            conn.executemany("INSERT INTO injected_bugs (contract_id, loc, length, bug_type, approach) VALUES (?, ?, ?, ?, ?)",
+                             [(contract_id, bug['loc'], bug['length'], bug['bug type'], bug['approach']) for bug in inj['bug_log']])
+            usage = inj.get('usage')
+            if usage is not None:
+                conn.execute("INSERT OR REPLACE INTO injection_usage VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (contract_id, usage['wall'], usage['user'], usage['sys'], usage['max_rss'], usage['read_bytes'], usage['write_bytes']))
+
+def record_tool_runs(conn, campaign, runs):
+    """Store analyzer runs and the bugs they reported in one transaction
+
+    runs is a list of dicts with 'tool', 'contract', 'bug_type' and 'result' (a tool_runner result)
+    """
+    with conn:
+        for run in runs:
+            result = run['result']
+            usage = result.get('usage') or {}
+            contract_id = get_contract(conn, campaign, run['contract'], run['bug_type'])
+            cur = conn.execute("INSERT INTO tool_runs (contract_id, tool, status, returncode, time, report, user_time, sys_time, max_rss, read_bytes, write_bytes) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (contract_id, run['tool'], result.get('status'), result.get('returncode'), result.get('time'), result.get('report'),
+                                usage.get('user'), usage.get('sys'), usage.get('max_rss'), usage.get('read_bytes'), usage.get('write_bytes')))
+            conn.executemany("INSERT INTO findings (run_id, line, code) VALUES (?, ?, ?)",
+                             [(cur.lastrowid, bug['lines'], bug['bugType'].strip()) for bug in result.get('bugs', [])])
+
+def record_metrics(conn, campaign, tool, FNs, FPs):
+    """Store the false negative and false positive tables computed by inspection for one tool"""
+    rows = {}
+    for fn in FNs:
+        rows[fn['BugType']] = [fn['InjectedBugs'], fn['FalseNegatives'], fn['MisClassified'], fn['UnDetected'], None, None]
+    for fp in FPs:
+        row = rows.setdefault(fp['BugType'], [None, None, None, None, None, None])
+        row[4] = fp['FalsePositives']
+        row[5] = fp['ExcludedByMajority']
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [tuple([campaign, tool, bug_type] + row) for bug_type, row in rows.items()])
+
+def fn_rate(conn, tool, bug_type, campaign=None):
+    """False negative rate of a tool on a bug type, per campaign (or for one campaign)"""
+    query = ("SELECT c.name, m.injected, m.false_negatives, 1.0*m.false_negatives/m.injected FROM metrics m "
+             "JOIN campaigns c ON c.id = m.campaign WHERE m.tool = ? AND m.bug_type = ? AND m.injected > 0")
+    args = [tool, bug_type]
+    if campaign is not None:
+        query += " AND c.name = ?"
+        args.append(campaign)
+    return [{'campaign':r[0], 'InjectedBugs':r[1], 'FalseNegatives':r[2], 'FNRate':r[3]} for r in conn.execute(query, args)]
+
+def export_csv(conn, table, csv_file):
+    """Write a table (or a SELECT query) of the store to a CSV file"""
+    query = table if table.strip().upper().startswith("SELECT") else "SELECT * FROM " + table
+    cur = conn.execute(query)
+    with open(csv_file, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow([d[0] for d in cur.description])
+        writer.writerows(cur)
+
+def printUsage(prog):
+    print("%s <campaign.db> fn-rate <tool> <bug type> [<campaign>]" % prog)
+    print("%s <campaign.db> export <table or SELECT query> <file.csv>" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    conn = connect(sys.argv[1])
+    if sys.argv[2] == 'fn-rate':
+        for row in fn_rate(conn, sys.argv[3], sys.argv[4], sys.argv[5] if len(sys.argv) > 5 else None):
+            print("{campaign}: {FalseNegatives}/{InjectedBugs} = {FNRate:.3f}".format(**row))
+    elif sys.argv[2] == 'export':
+        export_csv(conn, sys.argv[3], sys.argv[4])
+    else:
+        printUsage(sys.argv[0])
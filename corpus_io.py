@@ -0,0 +1,214 @@
+#!/usr/bin/python3
+
+import os, sys
+import json
+import gzip
+import shutil
+import tarfile
+import zipfile
+import tempfile
+
+"""Contract corpora and campaign outputs kept in a few archive files instead of many small ones
+
+Inputs can be a directory of .sol files, a tar (optionally compressed), a zip or a JSON lines file with
+one {"name": ..., "source": ...} object per line. Outputs are appended to a zip archive, with a JSON
+lines index next to it (<archive>.index.jsonl) describing each member.
+"""
+
+chunk_size = 100
+
+def get_member_name(name):
+    """Path of a contract relative to its corpus, refusing absolute paths and paths leaving the corpus"""
+    name = os.path.normpath(name.replace("\\", "/"))
+    if os.path.isabs(name) or name == ".." or name.startswith("../"):
+        raise ValueError("Contract path outside the corpus: {0}".format(name))
+    return name
+
+def iter_contracts(source):
+    """Yield (name, source bytes) for every contract of a corpus, name being its path relative to the corpus"""
+    names = set()
+    for name, data in iter_members(source):
+        name = get_member_name(name)
+        if name in names:
+            raise ValueError("Duplicate contract in corpus: {0}".format(name))
+        names.add(name)
+        yield name, data
+
+def iter_members(source):
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".sol"):
+                with open(os.path.join(source, name), 'rb') as fh:
+                    yield name, fh.read()
+    elif source.endswith(".jsonl") or source.endswith(".jsonl.gz"):
+        opener = gzip.open if source.endswith(".gz") else open
+        with opener(source, 'rt') as fh:
+            for line in fh:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry['name'], entry['source'].encode()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if info.filename.endswith(".sol") and not info.is_dir():
+                    yield info.filename, zf.read(info)
+    else:
+        """Stream mode reads the tar sequentially, compressed or not"""
+        with tarfile.open(source, 'r|*') as tf:
+            for member in tf:
+                if member.isfile() and member.name.endswith(".sol"):
+                    yield member.name, tf.extractfile(member).read()
+
+class ArchiveWriter:
+    """Appends files to a zip archive and records them in its index"""
+    def __init__(self, path):
+        self.path = path
+        self.zf = zipfile.ZipFile(path, 'a' if os.path.isfile(path) else 'w', zipfile.ZIP_DEFLATED)
+        self.names = set(self.zf.namelist())
+        self.index = open(path+".index.jsonl", 'a')
+
+    def write(self, name, data, **meta):
+        if isinstance(data, str):
+            data = data.encode()
+        self.zf.writestr(name, data)
+        self.names.add(name)
+        meta.update({'name':name, 'size':len(data)})
+        self.index.write(json.dumps(meta)+"\n")
+
+    def add_tree(self, root, prefix=""):
+        """Add every file under root, named by its path relative to root"""
+        for dirpath, dirs, files in os.walk(root):
+            dirs.sort()
+            for f in sorted(files):
+                path = os.path.join(dirpath, f)
+                with open(path, 'rb') as fh:
+                    self.write(os.path.join(prefix, os.path.relpath(path, root)), fh.read())
+
+    def close(self):
+        self.zf.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class ArchiveReader:
+    """Reads files by relative name from a zip archive or, for a directory, from the filesystem"""
+    def __init__(self, path):
+        self.path = path
+        self.zf = None
+        self.names = None
+        if not os.path.isdir(path):
+            self.zf = zipfile.ZipFile(path)
+            self.names = set(self.zf.namelist())
+
+    def exists(self, name):
+        if self.zf is None:
+            return os.path.isfile(os.path.join(self.path, name))
+        return os.path.normpath(name) in self.names
+
+    def read(self, name):
+        if self.zf is None:
+            with open(os.path.join(self.path, name), 'rb') as fh:
+                return fh.read()
+        return self.zf.read(os.path.normpath(name))
+
+    def close(self):
+        if self.zf is not None:
+            self.zf.close()
+
+def read_index(archive):
+    """The index entries of an output archive"""
+    entries = []
+    with open(archive+".index.jsonl") as fh:
+        for line in fh:
+            entries.append(json.loads(line))
+    return entries
+
+def inject_corpus(source, bug_type_list, output):
+    """Inject every contract of a corpus and append the buggy contracts, bug logs and ASTs to an output archive
+
+    Contracts are staged in a local temporary directory, chunk_size at a time, so the network
+    filesystem only sees the archive being appended to. Outputs keep the folders of the contracts in the
+    corpus, e.g. a/4.sol gives <bug type>/a/buggy_4.sol.
+    """
+    import solidifi
+    counts = {'contracts':0, 'failed':0}
+    with ArchiveWriter(output) as out, tempfile.TemporaryDirectory(prefix="solidifi_corpus_") as work_dir:
+        chunk = []
+        contracts = iter_contracts(source)
+        while True:
+            for name, data in contracts:
+                path = os.path.join(work_dir, "src", name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as fh:
+                    fh.write(data)
+                chunk.append(path)
+                if len(chunk) == chunk_size:
+                    break
+            if len(chunk) == 0:
+                break
+
+            failed = set(solidifi.compile_check(chunk))
+            for path in chunk:
+                name = os.path.relpath(path, os.path.join(work_dir, "src"))
+                folder, tail = os.path.split(name)
+                counts['contracts'] += 1
+                if path in failed:
+                    counts['failed'] += 1
+                    continue
+                solidifi.clear_globals()
+                buggy_root = os.path.join(work_dir, "buggy")
+                ast_dir = os.path.join(work_dir, "ast")
+                injected = solidifi.inject_all(path, bug_type_list, buggy_root, ast_dir)
+                if injected is None:
+                    counts['failed'] += 1
+                    continue
+                stem = os.path.splitext(tail)[0]
+                for bug_type, result in injected.items():
+                    with open(result['buggy_file'], 'rb') as fh:
+                        out.write(os.path.join(bug_type, folder, "buggy_"+tail), fh.read(), kind='buggy', contract=name, bug_type=bug_type,
+                                  injected_bugs=len(result['bug_log']))
+                    with open(os.path.join(buggy_root, bug_type, "BugLog_"+stem+".csv"), 'rb') as fh:
+                        out.write(os.path.join(bug_type, folder, "BugLog_"+stem+".csv"), fh.read(), kind='bug_log', contract=name, bug_type=bug_type)
+                ast_file = os.path.join(ast_dir, stem+".json")
+                if os.path.isfile(ast_file) and os.path.join("ast", folder, stem+".json") not in out.names:
+                    with open(ast_file, 'rb') as fh:
+                        out.write(os.path.join("ast", folder, stem+".json"), fh.read(), kind='ast', contract=name)
+                shutil.rmtree(buggy_root, ignore_errors=True)
+                shutil.rmtree(ast_dir, ignore_errors=True)
+            shutil.rmtree(os.path.join(work_dir, "src"), ignore_errors=True)
+            chunk = []
+    return counts
+
+def printUsage(prog):
+    print("%s inject <corpus dir, .tar[.gz], .zip or .jsonl> <output.zip> [<bug type>,... | all] [--parser <solc|solparse>]" % prog)
+    print("%s pack <directory> <output.zip>" % prog)
+    print("%s list <archive.zip>" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    if sys.argv[1] == 'inject' and '--parser' in sys.argv[:-1]:
+        import solidifi
+        solidifi.ast_parser = sys.argv[sys.argv.index('--parser')+1]
+        del sys.argv[sys.argv.index('--parser'):sys.argv.index('--parser')+2]
+    if sys.argv[1] == 'inject' and len(sys.argv) in (4, 5):
+        import solidifi
+        bug_type_list = [bug_info['bug_type'] for bug_info in solidifi.get_bug_types()]
+        if len(sys.argv) == 5 and sys.argv[4] != 'all':
+            bug_type_list = sys.argv[4].split(',')
+        counts = inject_corpus(sys.argv[2], bug_type_list, sys.argv[3])
+        print("{0} contracts injected, {1} failed".format(counts['contracts']-counts['failed'], counts['failed']))
+    elif sys.argv[1] == 'pack' and len(sys.argv) == 4:
+        with ArchiveWriter(sys.argv[3]) as out:
+            out.add_tree(sys.argv[2])
+    elif sys.argv[1] == 'list':
+        for entry in read_index(sys.argv[2]):
+            print(entry)
+    else:
+        printUsage(sys.argv[0])
@@ -7,10 +7,39 @@ import solidifi
 import inspection
 import os,sys
 import shutil, glob
+import getopt
+import tempfile
+import time
+import tool_runner
+import tracing
+import campaign_db
+import planner
+import scheduler
+import report_cache
+import verify
+import slicer
+import sampling
+import random
+import resources
 
 
 #tools = ["Oyente", "Securify", "Mythril", "Smartcheck", "Manticore","Slither"]
 tools = []
+concurrency = 1
+batch_mode = False
+combined = False
+adaptive_timeouts = False
+db_path = None
+campaign = None
+batch_size = 0
+slicing = False
+sequential = False
+#seconds between progress summaries while the analyzers run, 0 to disable them
+progress_interval = 60
+#contracts of a smoke campaign (see minimize.py), all 50 when None
+contract_subset = None
+"""Tools accepting several contracts per run, with how their combined report names each contract (see tool_runner.split_report)"""
+batch_tools = {'Oyente':'marker', 'Mythril':'in_file', 'Smartcheck':'marker'}
 bug_types = [
 {'tool':'Oyente','bugs':['Re-entrancy','Timestamp-Dependency','Unhandled-Exceptions','TOD','Overflow-Underflow']},
 {'tool':'Securify','bugs':['Re-entrancy','Unchecked-Send','Unhandled-Exceptions','TOD']},
@@ -20,68 +49,110 @@ bug_types = [
 {'tool':'Slither','bugs':['Re-entrancy','Timestamp-Dependency','Unhandled-Exceptions','tx.origin']}]
 
 
-contract_names_per_file = [{'file':'buggy_1.sol','names':['EIP20Interface','HotDollarsToken']},{'file':'buggy_2.sol','names':['CareerOnToken']},{'file':'buggy_3.sol','names':['CareerOnToken']},{'file':'buggy_4.sol','names':['PHO']},
-{'file':'buggy_5.sol','names':['Ownable','TokenERC20','TTC']},{'file':'buggy_6.sol','names':['Ownable','ChannelWallet']},
-{'file':'buggy_7.sol','names':['Ownable','AccountWallet']},{'file':'buggy_8.sol','names':['Ownable','TokenERC20','YFT']},{'file':'buggy_9.sol','names':['Ownable','XLToken']},{'file':'buggy_10.sol','names':['Ownable','XLToken']},
-{'file':'buggy_11.sol','names':['ERC20Interface','ApproveAndCallFallBack','Owned','ForTheBlockchain']},{'file':'buggy_12.sol','names':['ERC20','ERC223ReceivingContract','ERC223','ERC223Token','Owned','Grand']},
-{'file':'buggy_13.sol','names':['BitCash']},{'file':'buggy_14.sol','names':['ERC20','ERC20Detailed','SaveWon']},{'file':'buggy_15.sol','names':['MD']},
-{'file':'buggy_16.sol','names':['ERC20Interface','Owned','ExclusivePlatform']},{'file':'buggy_17.sol','names':['owned','TokenERC20','AZT']},{'file':'buggy_18.sol','names':['ERC20Interface','ApproveAndCallFallBack','Owned','_Yesbuzz']},
-{'file':'buggy_19.sol','names':['owned','ethBank']},{'file':'buggy_20.sol','names':['Ownable','Stoppable','RampInstantPoolInterface','RampInstantEscrowsPoolInterface','RampInstantPool','RampInstantEthPool']},
-{'file':'buggy_21.sol','names':['Token','StableDEX']},{'file':'buggy_22.sol','names':['owned','tokenRecipient','Token','MindsyncPlatform']},{'file':'buggy_23.sol','names':['Proxy','UpgradeabilityProxy','AdminUpgradeabilityProxy']},
-{'file':'buggy_24.sol','names':['FomoFeast']},{'file':'buggy_25.sol','names':['WhiteBetting']},
-{'file':'buggy_26.sol','names':['UBBCToken']},
-{'file':'buggy_27.sol','names':['Ownable','ERC20Detailed','DanPanCoin']},
-{'file':'buggy_28.sol','names':['ERC20Detailed','HYDROGEN']},
-{'file':'buggy_29.sol','names':['ERC20Interface','IERC20Interface','RaffleToken','RaffleTokenExchange']},
-{'file':'buggy_30.sol','names':['ERC777','MinterRole','PauserRole','Pausable','SKYBITToken']},
-{'file':'buggy_31.sol','names':['Ownable','ReentrancyGuard','FeeTransactionManager']},
-{'file':'buggy_32.sol','names':['ERC20TokenInterface','ERC20Token','AsseteGram']},
-{'file':'buggy_33.sol','names':['Owned','Token','Staking']},
-{'file':'buggy_34.sol','names':['Ownable','LollypopToken']},
-{'file':'buggy_35.sol','names':['owned','BitpayerDEX']},
-{'file':'buggy_36.sol','names':['owned','tokenRecipient','Token','MindsyncPlatform']},
-{'file':'buggy_37.sol','names':['SafeMath','ERC20Interface','ApproveAndCallFallBack','Owned','AugustCoin']},
-{'file':'buggy_38.sol','names':['ERC20Detailed','BIGBOMBv2']},
-{'file':'buggy_39.sol','names':['TAMCContract']},
-{'file':'buggy_40.sol','names':['ERC20','ERC20Detailed','SimpleSwapCoin']},
-{'file':'buggy_41.sol','names':['AO']},
-{'file':'buggy_42.sol','names':['Owned','Token','Staking']},
-{'file':'buggy_43.sol','names':['EventMetadata','Operated','MultiHashWrapper','ProofHash','Template','Post']},
-{'file':'buggy_44.sol','names':['EventMetadata','Operated','ProofHashes','MultiHashWrapper','Template','Feed']},
-{'file':'buggy_45.sol','names':['StockBet']},
-{'file':'buggy_46.sol','names':['ProofOfExistence']},
-{'file':'buggy_47.sol','names':['ERC20Interface','AcunarToken','AcunarIEO']},
-{'file':'buggy_48.sol','names':['ERC20Interface','ApproveAndCallFallBack','Owned','QurasToken']},
-{'file':'buggy_49.sol','names':['TAMC']},
-{'file':'buggy_50.sol','names':['digitalNotary']}]
 
 def evaluate_tools():
     # Contracts
     x = [ i for i in range(1,51)]
+    if contract_subset is not None:
+        x = contract_subset
 
     if os.path.isdir("buggy"):
         shutil.rmtree("buggy")
 
+    #compile all contracts once, batched per resolved solc version
+    failed = solidifi.compile_check(["contracts/"+str(cs)+".sol" for cs in x])
+    for f in failed:
+        print("Contract file {0} contains compilation errors".format(f))
+
+    conn = None
+    if db_path is not None:
+        conn = campaign_db.connect(db_path)
+        campaign_id = campaign_db.get_campaign(conn, campaign)
+
+    #in combined mode, every contract gets the bug types of all tools at once and is shared by the tools
+    combined_logs = {}
+    combined_usage = {}
+    if combined:
+        combined_types = ",".join(get_combined_types())
+        for cs in x:
+            if "contracts/"+str(cs)+".sol" in failed:
+                continue
+            with resources.measure() as combined_usage[cs]:
+                time = solidifi.interior_main("-i" ,"contracts/"+str(cs)+".sol" ,combined_types)
+            combined_logs[cs] = list(solidifi.BugLog)
+        kept = verify_injections([{'contract':cs, 'bug_type':solidifi.combined_dir, 'bug_log':log, 'usage':combined_usage[cs]} for cs, log in combined_logs.items()])
+        combined_logs = dict((inj['contract'], inj['bug_log']) for inj in kept)
+        if slicing:
+            slice_injections(kept)
+        save_injection_usage(kept)
+
     #inject bug types in all contracts for each tool
+    asts = {}
     for tool in tools:    
+        tool_main_dir = os.path.join("tool_results",tool)
+        tool_buggy_sc = os.path.join(tool_main_dir,"analyzed_buggy_contracts")
+        injections = []
+        estimated_cost = 0.0
         for cs in x:
+            if "contracts/"+str(cs)+".sol" in failed:
+                continue
             tool_bugs = [bugs['bugs'] for bugs in bug_types if  bugs['tool'] == tool]
+            if combined:
+                if cs not in combined_logs:
+                    continue
+                estimated_cost += planner.estimate_cost(os.path.join("buggy",solidifi.combined_dir,"buggy_"+str(cs)+".sol"), len(combined_logs[cs]), tool)
+                injections.append({'contract':cs, 'bug_type':solidifi.combined_dir, 'bug_log':combined_logs[cs], 'usage':combined_usage[cs],
+                                   'buggy_file':os.path.join(tool_buggy_sc,solidifi.combined_dir,"buggy_"+str(cs)+".sol")})
+                continue
+            #one AST per contract, shared by all bug types and tools; the injection's usage is shared by its bug types
+            with resources.measure() as usage:
+                injected = solidifi.inject_all("contracts/"+str(cs)+".sol", tool_bugs[0], "buggy", "ast", asts.get(cs))
+            if injected is None:
+                continue
+            asts[cs] = solidifi.cur_contr_ast_data
             for bug_type in tool_bugs[0]:
-                time = solidifi.interior_main("-i" ,"contracts/"+str(cs)+".sol" ,bug_type)
+                estimated_cost += planner.estimate_cost(injected[bug_type]['buggy_file'], len(injected[bug_type]['bug_log']), tool)
+                injections.append({'contract':cs, 'bug_type':bug_type, 'bug_log':injected[bug_type]['bug_log'],
+                                   'usage':resources.share(usage, len(tool_bugs[0])),
+                                   'buggy_file':os.path.join(tool_buggy_sc,bug_type,"buggy_"+str(cs)+".sol")})
+        if not combined:
+            injections = verify_injections(injections)
+            if slicing:
+                slice_injections(injections)
+            save_injection_usage(injections)
+        if conn is not None:
+            campaign_db.record_injections(conn, campaign_id, injections)
+        print("Estimated {0} analysis time: {1:.1f}h".format(tool, estimated_cost/3600))
 
-        tool_main_dir = os.path.join("tool_results",tool)
-        tool_buggy_sc = os.path.join(tool_main_dir,"analyzed_buggy_contracts")
         os.system("rm -rf {0}".format(tool_buggy_sc))
         os.makedirs(tool_buggy_sc,exist_ok=True)
-        mv_cmd = "mv buggy/* {0}".format(tool_buggy_sc)
-        os.system(mv_cmd)
+        if combined:
+            shutil.copytree(os.path.join("buggy",solidifi.combined_dir), os.path.join(tool_buggy_sc,solidifi.combined_dir))
+        else:
+            mv_cmd = "mv buggy/* {0}".format(tool_buggy_sc)
+            os.system(mv_cmd)
         
     #check the generated buggy contracts 
-    for tool in tools:
+    history = scheduler.load_history()
+    aggregator = None
+    if progress_interval > 0:
+        aggregator = inspection.Aggregator(combined, progress_interval)
+        for tool in tools:
+            for injected_scs in set(injected_scs for bug_type, injected_scs in get_tool_dirs(tool)):
+                aggregator.expect(len(glob.glob(injected_scs+"/*.sol")))
+    on_done = aggregator.on_done if aggregator is not None else None
+    if sequential:
+        analyze_sequential(history, conn, campaign_id if conn is not None else None, on_done)
+        tools_to_analyze = []
+    else:
+        tools_to_analyze = tools
+    for tool in tools_to_analyze:
     
         tool_main_dir = os.path.join("tool_results",tool)
         tool_buggy_sc = os.path.join(tool_main_dir,"analyzed_buggy_contracts")
         tool_bugs = [bugs['bugs'] for bugs in bug_types if  bugs['tool'] == tool]
+        if combined:
+            tool_bugs = [[solidifi.combined_dir]]
 
         for bug_type in tool_bugs[0]:
             tool_results = os.path.join(tool_buggy_sc,bug_type)
@@ -89,73 +160,375 @@ def evaluate_tools():
             os.makedirs(tool_result_per_bug, exist_ok=True)
             injected_scs = os.path.join(tool_buggy_sc,bug_type)
     
+            jobs = []
+            batch = []
             for buggy_sc in glob.glob(injected_scs+"/*.sol"): 
                 head, tail = os.path.split(buggy_sc)
                 result_file = tool_result_per_bug+"/"+tail+".txt"
                 if tool in ("Slither","Oyente"):
                     result_file = tool_result_per_bug+"/"+tail+".json"
+                if batch_mode and tool in batch_tools:
+                    batch.append({'file':buggy_sc, 'report':result_file, 'contract':get_contract_id(tail),
+                                  'ast':os.path.join("ast", str(get_contract_id(tail))+".json")})
+                else:
+                    jobs.extend(get_tool_jobs(tool, buggy_sc, injected_scs, result_file))
 
-                if tool =='Oyente':
-                    #Oyente command 
-                    tool_cmd ="docker run -i -t -v {0} luongnguyen/oyente bash -c \" cd oyente ; python oyente.py -ce -j -s ../contracts/{1} \" >{2} ".format(os.path.join(os.getcwd(), injected_scs)+":/oyente/contracts",tail,result_file) 
-                    os.system(tool_cmd)
-    
-                elif tool == 'Securify':
-                
-                    #Securify command 
-                    tool_cmd = "timeout 900 java -jar /securify/build/libs/securify.jar -fs {0} > {1}".format(buggy_sc,result_file)
-                    os.system(tool_cmd)
-    
-                elif tool == 'Mythril':
-                    #Mythril command        
-                    tool_cmd = "myth  analyze {0} --execution-timeout 900 > {1}".format(buggy_sc,result_file)                
-                    os.system(tool_cmd)
-    
-                elif tool == 'Smartcheck':
-                    #Smartcheck command                 
-                    #""If you are using nmp installation""
-                    tool_cmd = "smartcheck -p {0} > {1}".format(buggy_sc,result_file)
-                    os.system(tool_cmd)                                
-    
-                elif tool =='Manticore':
-                    cs_names = [names['names'] for names in contract_names_per_file if names['file'] == tail]
-    
-                    for cs_name in cs_names[0]:
-                        result_file = tool_result_per_bug+"/"+tail[0:len(tail)-4]+"."+cs_name+".txt"
-                        #Manticore command                                        
-                        tool_cmd = "manticore --workspace /tmp/manticore --core.timeout 900 --evm.sha3timeout 60 --smt.timeout 60 --core.mprocessing threading --smt.memory 4000 --contract {0} {1}".format(cs_name,buggy_sc)
-                        os.system(tool_cmd)
-                        workspace= '/tmp/manticore'
-                        src_file = os.path.join(workspace,'global.findings')
-                        if os.path.isfile(src_file):
-                            cp_cmd = "cp {0} {1}".format(src_file,result_file)
-                            os.system(cp_cmd)
-                            rm_cmd ="rm -rf {0}".format(workspace)
-                            os.system(rm_cmd)
-                                            
-                elif tool == 'Slither':
-                    #Slither command                 
-                    tool_cmd = "slither  {0} --json {1}".format(buggy_sc,result_file)
-                    os.system(tool_cmd)
-
-                """
-                To evaluate other tools, add the command to run each tool in this area using the 3-line code pattern as below. 
-                You just need to replace values surrounded by <>
-
-                elif tool == '<ToolName>':              
-                    tool_cmd = "<command to run the tool>"
-                    os.system(tool_cmd)
-                """
+            """Hand the analyzer the whole bug type folder, or chunks of batch_size contracts"""
+            chunk = len(batch) if batch_size == 0 else batch_size
+            for i in range(0, len(batch), max(chunk, 1)):
+                jobs.append(get_batch_job(tool, batch[i:i+chunk], injected_scs, tool_result_per_bug, chunk == len(batch)))
+
+            """Longest predicted jobs first, with timeouts learned from the run history if asked for"""
+            for seq, job in enumerate(jobs):
+                job['seq'] = seq
+            jobs = scheduler.schedule(jobs, history, adaptive_timeouts)
+
+            """Reports are stored as <result_file>.gz and parsed while the tools run"""
+            with tracing.span("analyze", tool=tool, bug_type=bug_type, jobs=len(jobs)):
+                results = tool_runner.run_jobs(jobs, concurrency, on_done)
+            scheduler.record_runs(jobs, results)
+            scheduler.print_report(scheduler.get_report(jobs, results, concurrency))
+            if conn is not None:
+                campaign_db.record_tool_runs(conn, campaign_id, get_tool_runs(tool, bug_type, jobs, results))
+
+    if aggregator is not None:
+        aggregator.print_summary()
+    report_cache.print_stats()
+    if conn is not None:
+        conn.close()
+
+def get_tool_dirs(tool):
+    """(bug type, folder of its buggy contracts) of a tool, the folder being shared by all bug types in combined mode"""
+    tool_buggy_sc = os.path.join("tool_results", tool, "analyzed_buggy_contracts")
+    tool_bugs = [bugs['bugs'] for bugs in bug_types if  bugs['tool'] == tool][0]
+    return [(bug_type, os.path.join(tool_buggy_sc, solidifi.combined_dir if combined else bug_type)) for bug_type in tool_bugs]
+
+def analyze_sequential(history, conn=None, campaign_id=None, on_done=None):
+    """Analyze the contracts in random order, a round of sampling.step contracts at a time, until the FN and FP
+    rates of each tool and bug type are settled (see sampling.py)
+
+    The buggy contracts no tool analyzed are moved to a skipped/ folder, so inspection only scores the analyzed ones.
+    """
+    pairs = dict(((tool, bug_type), injected_scs) for tool in tools for bug_type, injected_scs in get_tool_dirs(tool))
+    contracts = set()
+    for injected_scs in pairs.values():
+        contracts.update(get_contract_id(os.path.basename(f)) for f in glob.glob(injected_scs+"/*.sol"))
+    contracts = sorted(contracts, key=str)
+    random.Random(planner.seed).shuffle(contracts)
+    stats = dict((pair, sampling.new_stats()) for pair in pairs)
+    analyzed = set()
+
+    for start in range(0, len(contracts), sampling.step):
+        chunk = contracts[start:start+sampling.step]
+        active = [pair for pair in sorted(pairs) if stats[pair]['settled_at'] is None]
+        if len(active) == 0:
+            break
+        #one analysis per tool, folder and contract, shared by the bug types of a combined folder
+        runs = {}
+        for tool, bug_type in active:
+            for cs in chunk:
+                runs.setdefault((tool, pairs[(tool, bug_type)], cs), bug_type)
+        jobs = []
+        for (tool, injected_scs, cs), bug_type in sorted(runs.items(), key=str):
+            buggy_sc = os.path.join(injected_scs, "buggy_"+str(cs)+".sol")
+            if not os.path.isfile(buggy_sc):
+                continue
+            analyzed.add((tool, injected_scs, cs))
+            result_file = os.path.join(injected_scs, "results", os.path.basename(buggy_sc)+(".json" if tool in ("Slither","Oyente") else ".txt"))
+            os.makedirs(os.path.dirname(result_file), exist_ok=True)
+            for job in get_tool_jobs(tool, buggy_sc, injected_scs, result_file):
+                job['bug_type'] = bug_type
+                jobs.append(job)
+        for seq, job in enumerate(jobs):
+            job['seq'] = seq
+        jobs = scheduler.schedule(jobs, history, adaptive_timeouts)
+        with tracing.span("analyze", contracts=len(chunk), jobs=len(jobs)):
+            results = tool_runner.run_jobs(jobs, concurrency, on_done)
+        scheduler.record_runs(jobs, results)
+        if conn is not None:
+            for tool, bug_type in set((job['tool'], job['bug_type']) for job in jobs):
+                done = [(job, result) for job, result in zip(jobs, results) if job['tool'] == tool and job['bug_type'] == bug_type]
+                campaign_db.record_tool_runs(conn, campaign_id, get_tool_runs(tool, os.path.basename(pairs[(tool, bug_type)]),
+                                                                              [job for job, result in done], [result for job, result in done]))
+
+        #score the round as inspection does, false positives being counted once per tool, folder and contract
+        non_injected = []
+        scored = {}
+        for tool, bug_type in active:
+            injected_scs = pairs[(tool, bug_type)]
+            for cs in chunk:
+                bug_log = os.path.join(injected_scs, "BugLog_"+str(cs)+".csv")
+                if (tool, injected_scs, cs) not in analyzed or not os.path.isfile(bug_log):
+                    continue
+                try:
+                    score = inspection.Inspector(tool).inspect(bug_log, inspection.get_reports(tool, injected_scs, cs), bug_type, cs,
+                                                               inspection.get_line_map(injected_scs, cs), combined)
+                except (OSError, ValueError):
+                    continue
+                sampling.add_score(stats[(tool, bug_type)], score)
+                if (tool, injected_scs, cs) not in scored:
+                    scored[(tool, injected_scs, cs)] = True
+                    non_injected.extend(score['non_injected'])
+        coded_non_injected = inspection.get_coded_non_injected(non_injected)
+        for tool, bug_type in active:
+            for cs in chunk:
+                if (tool, pairs[(tool, bug_type)], cs) in scored:
+                    fps = [fp for fp in inspection.get_fps(tool, coded_non_injected, [cs]) if fp['BugType'] == bug_type]
+                    sampling.add_fps(stats[(tool, bug_type)], fps[0]['FalsePositives'] if fps else 0)
+
+        for pair in active:
+            if sampling.is_settled(stats[pair]):
+                stats[pair]['settled_at'] = start+len(chunk)
+                print("{0} {1} settled after {2} contracts".format(pair[0], pair[1], stats[pair]['contracts']))
+
+    #the analyzer time the skipped contracts would have taken, predicted as the scheduler does, is shared by the pairs of their folder
+    for tool, injected_scs, cs in sorted(set((tool, f, cs) for (tool, bug_type), f in pairs.items() for cs in contracts) - analyzed, key=str):
+        buggy_sc = os.path.join(injected_scs, "buggy_"+str(cs)+".sol")
+        if not os.path.isfile(buggy_sc):
+            continue
+        skipped_jobs = scheduler.schedule(get_tool_jobs(tool, buggy_sc, injected_scs, os.path.join(injected_scs, "results", "skipped.txt")), history)
+        owners = [pair for pair, f in pairs.items() if f == injected_scs]
+        for pair in owners:
+            stats[pair]['saved'] += sum(job['predicted'] for job in skipped_jobs)/len(owners)
+        skipped_dir = os.path.join(injected_scs, "skipped")
+        os.makedirs(skipped_dir, exist_ok=True)
+        for name in glob.glob(buggy_sc+"*") + glob.glob(os.path.join(injected_scs, "BugLog_"+str(cs)+".csv")+"*"):
+            if os.path.isfile(name):
+                shutil.move(name, os.path.join(skipped_dir, os.path.basename(name)))
+    sampling.print_report(stats, len(contracts))
+
+def verify_injections(injections):
+    """Compile the buggy contracts under buggy/ in batches, repairing broken snippets and dropping what cannot be fixed"""
+    variants = []
+    for inj in injections:
+        injected_scs = os.path.join("buggy", inj['bug_type'])
+        variants.append({'buggy_file':os.path.join(injected_scs, "buggy_"+str(inj['contract'])+".sol"), 'injection':inj,
+                         'bug_log_file':os.path.join(injected_scs, "BugLog_"+str(inj['contract'])+".csv"), 'bug_log':inj['bug_log']})
+    kept = []
+    for v in verify.verify_variants(variants):
+        if v['status'] == 'failed':
+            print("Buggy contract {0} does not compile and is not analyzed".format(v['buggy_file']))
+            os.remove(v['buggy_file'])
+            os.remove(v['bug_log_file'])
+        else:
+            kept.append(v['injection'])
+    return kept
+
+def slice_injections(injections):
+    """Slice the buggy contracts under buggy/ down to the code their injected bugs depend on"""
+    variants = []
+    for inj in injections:
+        injected_scs = os.path.join("buggy", inj['bug_type'])
+        variants.append({'buggy_file':os.path.join(injected_scs, "buggy_"+str(inj['contract'])+".sol"),
+                         'bug_log_file':os.path.join(injected_scs, "BugLog_"+str(inj['contract'])+".csv")})
+    sliced = slicer.slice_files(variants)
+    print("Sliced {0} of {1} buggy contracts".format(len(sliced), len(variants)))
+
+def save_injection_usage(injections):
+    """Store the usage of each injection next to its bug log under buggy/, as BugLog_<n>.csv.usage.json"""
+    for inj in injections:
+        bug_log_file = os.path.join("buggy", inj['bug_type'], "BugLog_"+str(inj['contract'])+".csv")
+        if inj.get('usage') is not None and os.path.isfile(bug_log_file):
+            resources.save(inj['usage'], resources.usage_file(bug_log_file))
+
+def get_combined_types():
+    """Bug types of the selected tools, in the order of bug_types.conf"""
+    all_bugs = set(bug for bugs in bug_types if bugs['tool'] in tools for bug in bugs['bugs'])
+    return [bug_info['bug_type'] for bug_info in solidifi.get_bug_types() if bug_info['bug_type'] in all_bugs]
+
+def get_tool_runs(tool, bug_type, jobs, results):
+    """Per-contract runs of a tool, with batch runs divided between the contracts they analyzed
+
+    Bugs found in sliced contracts are given the lines of the full buggy contracts.
+    """
+    runs = []
+    for job, result in zip(jobs, results):
+        if 'contracts' in result:
+            for c in result['contracts']:
+                bugs = slicer.translate_lines(c['bugs'], slicer.load_line_map(c['file']))
+                share = dict(result, report=c['report'], bugs=bugs, time=result['time']/len(result['contracts']), usage=c.get('usage'))
+                runs.append({'tool':tool, 'contract':c['contract'], 'bug_type':bug_type, 'result':share})
+        else:
+            if 'bugs' in result:
+                slicer.translate_lines(result['bugs'], slicer.load_line_map(job['file']))
+            runs.append({'tool':tool, 'contract':job['contract'], 'bug_type':bug_type, 'result':result})
+    return runs
+
+def get_contract_id(tail):
+    """buggy_12.sol -> 12, the contract number used by inspection"""
+    cs = os.path.splitext(tail)[0].replace("buggy_","")
+    return int(cs) if cs.isdigit() else cs
+
+def get_tool_jobs(tool, buggy_sc, injected_scs, result_file):
+    """Commands to analyze one buggy contract, run without a shell by tool_runner"""
+    head, tail = os.path.split(buggy_sc)
+    tool_result_per_bug, result_tail = os.path.split(result_file)
+    cs = get_contract_id(tail)
+    jobs = []
+
+    if tool =='Oyente':
+        #Oyente command 
+        tool_cmd = ["docker", "run", "--rm", "-v", os.path.join(os.getcwd(), injected_scs)+":/oyente/contracts", "luongnguyen/oyente",
+                    "bash", "-c", "cd oyente ; python oyente.py -ce -j -s ../contracts/{0}".format(tail)]
+        jobs.append({'tool':tool, 'argv':tool_cmd, 'report':result_file, 'contract':cs})
+
+    elif tool == 'Securify':
+        #Securify command 
+        tool_cmd = ["java", "-jar", "/securify/build/libs/securify.jar", "-fs", buggy_sc]
+        jobs.append({'tool':tool, 'argv':tool_cmd, 'report':result_file, 'contract':cs, 'timeout':900})
+
+    elif tool == 'Mythril':
+        #Mythril command        
+        tool_cmd = ["myth", "analyze", buggy_sc, "--execution-timeout", "900"]
+        jobs.append({'tool':tool, 'argv':tool_cmd, 'report':result_file, 'contract':cs})
+
+    elif tool == 'Smartcheck':
+        #Smartcheck command                 
+        #""If you are using nmp installation""
+        tool_cmd = ["smartcheck", "-p", buggy_sc]
+        jobs.append({'tool':tool, 'argv':tool_cmd, 'report':result_file, 'contract':cs})
+
+    elif tool =='Manticore':
+        #One job per contract of the file, each in a workspace of its own so they can run in parallel
+        #a sliced file may have lost contracts of the original one, its names come from its source
+        ast_file = None if slicer.is_sliced(buggy_sc) else os.path.join("ast", str(cs)+".json")
+        for cs_name in solidifi.get_contract_names(buggy_sc, ast_file):
+            workspace = os.path.join(tempfile.gettempdir(), "manticore_{0}_{1}_{2}.{3}".format(os.getpid(), os.path.basename(injected_scs),
+                                                                                           tail[0:len(tail)-4], cs_name))
+            #Manticore command                                        
+            tool_cmd = ["manticore", "--workspace", workspace, "--core.timeout", "900", "--evm.sha3timeout", "60", "--smt.timeout", "60",
+                        "--core.mprocessing", "threading", "--smt.memory", "4000", "--contract", cs_name, buggy_sc]
+            jobs.append({'tool':tool, 'argv':tool_cmd, 'report':tool_result_per_bug+"/"+tail[0:len(tail)-4]+"."+cs_name+".txt", 'contract':cs,
+                         'workspace':workspace, 'output':os.path.join(workspace,'global.findings'),
+                         'after':lambda job, result: shutil.rmtree(job['workspace'], ignore_errors=True)})
+
+    elif tool == 'Slither':
+        #Slither command                 
+        tool_cmd = ["slither", buggy_sc, "--json", "-"]
+        jobs.append({'tool':tool, 'argv':tool_cmd, 'report':result_file, 'contract':cs})
+
+    """
+    To evaluate other tools, add the command to run each tool in this area using the 3-line code pattern as below. 
+    You just need to replace values surrounded by <>
+
+    elif tool == '<ToolName>':              
+        tool_cmd = ["<command>", "<arguments>", buggy_sc]
+        jobs.append({'tool':tool, 'argv':tool_cmd, 'report':result_file, 'contract':cs})
+    """
+    #contract features used by the scheduler
+    for job in jobs:
+        job['file'] = buggy_sc
+        job['ast'] = os.path.join("ast", str(cs)+".json")
+    return jobs
+
+def get_batch_job(tool, batch, injected_scs, tool_result_per_bug, whole_dir):
+    """One analyzer run over several buggy contracts, its report is split back per contract by tool_runner"""
+    first = os.path.splitext(os.path.basename(batch[0]['file']))[0]
+    job = {'tool':tool, 'batch':batch, 'split':batch_tools[tool], 'report':tool_result_per_bug+"/batch_"+first+".txt"}
+    tails = [os.path.basename(c['file']) for c in batch]
+
+    if tool == 'Oyente':
+        #Oyente command, one container for the whole batch
+        loop = "cd oyente ; for f in {0} ; do echo \"==> $f <==\" ; python oyente.py -ce -j -s ../contracts/$f ; done".format(" ".join(tails))
+        job['argv'] = ["docker", "run", "--rm", "-v", os.path.join(os.getcwd(), injected_scs)+":/oyente/contracts", "luongnguyen/oyente", "bash", "-c", loop]
+
+    elif tool == 'Mythril':
+        #Mythril command
+        job['argv'] = ["myth", "analyze"] + [c['file'] for c in batch] + ["--execution-timeout", "900"]
+
+    elif tool == 'Smartcheck':
+        #Smartcheck command, smartcheck only takes directories so chunks are linked into a temporary one
+        if whole_dir:
+            job['argv'] = ["smartcheck", "-p", injected_scs]
+        else:
+            chunk_dir = tempfile.mkdtemp(prefix="smartcheck_")
+            for c in batch:
+                os.symlink(os.path.abspath(c['file']), os.path.join(chunk_dir, os.path.basename(c['file'])))
+            job['argv'] = ["smartcheck", "-p", chunk_dir]
+            job['after'] = lambda job, result: shutil.rmtree(chunk_dir, ignore_errors=True)
+    return job
+
+def printUsage(prog):
+    print("%s [--jobs <n>] [--batch [--batch-size <n>]] [--trace <file>] [--db <campaign.db> [--campaign <name>]] [--max-bugs <n> [--seed <s>]] [--combined] [--adaptive-timeouts] [--slice] [--sequential <width> [--sequential-step <n>]] [--parser <solc|solparse>] [--progress <seconds>] [--contracts <n,n,...|file>] [--no-cache | --cache-size <MB>] <tool1,tool2,...>" % prog)
+    print("--jobs <n>: number of analyzer runs executed concurrently")
+    print("--batch: analyze all contracts of a bug type with one run of the tools that support it ({0})".format(", ".join(batch_tools)))
+    print("--batch-size <n>: analyze at most n contracts per batched run")
+    print("--trace <file>: record a trace of the run, as Chrome trace JSON or as JSON lines if file ends with .jsonl")
+    print("--db <campaign.db>: store bug logs, tool runs, findings and metrics in a SQLite campaign store")
+    print("--max-bugs <n>: inject at most n bugs per contract, spread over node kinds and functions (see planner.conf)")
+    print("--seed <s>: seed of the injection plan, the same seed gives the same buggy contracts")
+    print("--combined: inject the bug types of the selected tools into one buggy contract, analyzed once per tool")
+    print("--adaptive-timeouts: replace the 900s timeout of Securify, Mythril and Manticore with one learned from past runs ({0})".format(scheduler.history_file))
+    print("--slice: drop the functions, events and contracts no injected bug depends on before analysis, findings are mapped back to the full buggy contracts")
+    print("--sequential <width>: analyze the contracts in random order and stop analyzing a tool and bug type once its FN and FP rate intervals are narrower than width")
+    print("--sequential-step <n>: contracts analyzed per round in sequential mode, {0} by default".format(sampling.step))
+    print("--parser solparse: build the ASTs used for injection with the built-in parser instead of solc (see solparse.py validate)")
+    print("--progress <seconds>: print the throughput, ETA and partial FN/FP metrics of each tool this often while the analyzers run, 0 to disable ({0}s by default)".format(progress_interval))
+    print("--contracts <n,n,...|file>: only inject and analyze these contracts, e.g. the subset written by minimize.py for a smoke campaign")
+    print("--no-cache: always run the analyzers instead of reusing reports of identical contracts from {0}".format(report_cache.cache_dir))
+    print("--cache-size <MB>: size of the report cache, least recently used reports are evicted beyond it")
 
 
 if __name__ == "__main__":
-    if 1 != len(sys.argv):
-        if sys.argv[1] in ('--help', '-h'):
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hj:bt:", ["help", "jobs=", "batch", "batch-size=", "trace=", "db=", "campaign=", "max-bugs=", "seed=", "combined", "adaptive-timeouts", "slice", "sequential=", "sequential-step=", "parser=", "progress=", "contracts=", "no-cache", "cache-size="])
+    except getopt.GetoptError:
+        printUsage(sys.argv[0])
+        sys.exit(2)
+    for opt, val in opts:
+        if opt in ('-h', '--help'):
             printUsage(sys.argv[0])
-                
-        tools= sys.argv[1].split(',')
+            sys.exit()
+        elif opt in ('-j', '--jobs'):
+            concurrency = int(val)
+        elif opt in ('-b', '--batch'):
+            batch_mode = True
+        elif opt == '--batch-size':
+            batch_size = int(val)
+        elif opt in ('-t', '--trace'):
+            tracing.enable(val)
+        elif opt == '--db':
+            db_path = val
+        elif opt == '--campaign':
+            campaign = val
+        elif opt == '--no-cache':
+            report_cache.enabled = False
+        elif opt == '--cache-size':
+            report_cache.max_bytes = int(val)*1024**2
+        elif opt == '--adaptive-timeouts':
+            adaptive_timeouts = True
+        elif opt == '--sequential':
+            sequential = True
+            sampling.width = float(val)
+        elif opt == '--sequential-step':
+            sampling.step = int(val)
+        elif opt == '--slice':
+            slicing = True
+        elif opt == '--parser':
+            if val not in ("solc", "solparse"):
+                printUsage(sys.argv[0])
+                sys.exit(2)
+            solidifi.ast_parser = val
+        elif opt == '--progress':
+            progress_interval = float(val)
+        elif opt == '--contracts':
+            if os.path.isfile(val):
+                with open(val) as fh:
+                    val = fh.read()
+            contract_subset = [int(cs) for cs in val.replace("\n", ",").split(",") if cs.strip()]
+        elif opt == '--combined':
+            combined = True
+        elif opt == '--max-bugs':
+            planner.max_bugs = int(val)
+        elif opt == '--seed':
+            planner.seed = int(val)
+    if campaign is None:
+        campaign = time.strftime("campaign-%Y%m%d-%H%M%S")
+
+    if 1 == len(args):
+        tools= args[0].split(',')
         evaluate_tools()
-        inspection.Inspect_results(tools)
+        inspection.Inspect_results(tools, db_path, campaign, combined)
         
     else:
-        print("wrong number of parameters")
\ No newline at end of file
+        print("wrong number of parameters")
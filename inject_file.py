@@ -1,38 +1,114 @@
 #!/usr/bin/python3
 
-import sys
+import os, sys, re
+import mmap
+import bisect
+import tracing
+
+"""Read-only memory mappings of the files looked up during a job, shared by all helpers below"""
+views = {}
+
+class FileView:
+    """mmap of a file plus a lazily built index of its line start offsets"""
+
+    def __init__(self, filename, st):
+        self.key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self.line_starts = None
+        if st.st_size == 0:
+            self.data = b''
+        else:
+            with open(filename, 'rb') as fh:
+                self.data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        tracing.count("file_opens")
+
+    def get_line_starts(self):
+        if self.line_starts is None:
+            self.line_starts = [0]
+            pos = self.data.find(b'\n')
+            while pos >= 0:
+                self.line_starts.append(pos+1)
+                pos = self.data.find(b'\n', pos+1)
+        return self.line_starts
+
+    def line_at(self, offset):
+        """1-based number of the line containing offset"""
+        return bisect.bisect_right(self.get_line_starts(), offset)
+
+    def lines_before(self, offset):
+        """Number of lines starting before offset"""
+        return bisect.bisect_left(self.get_line_starts(), offset)
+
+    def line(self, lineno):
+        """Bytes of a 1-based line, newline included"""
+        starts = self.get_line_starts()
+        if lineno < 1 or lineno > len(starts) or starts[lineno-1] >= len(self.data):
+            return b''
+        end = starts[lineno] if lineno < len(starts) else len(self.data)
+        return self.data[starts[lineno-1]:end]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+def get_view(filename):
+    """Mapping of filename, reused as long as the file is not modified"""
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    view = views.get(path)
+    if view is not None and view.key == (st.st_ino, st.st_size, st.st_mtime_ns):
+        return view
+    if view is not None:
+        view.close()
+    view = views[path] = FileView(path, st)
+    return view
+
+def invalidate(filename):
+    """Drop the mapping of a file before it is written"""
+    view = views.pop(os.path.abspath(filename), None)
+    if view is not None:
+        view.close()
+
+def release_views():
+    """Unmap every file, called at the end of a job"""
+    for view in views.values():
+        view.close()
+    views.clear()
+
+@tracing.traced()
 def update(filename, offset, text):
-    fro = open(filename, "rb")
+    fStr = get_view(filename).data[offset-2:]
+    tracing.count("bytes_read", len(fStr))
+    invalidate(filename)
+
     frw = open(filename, "r+b")
-    fro.seek(offset-2, 0)
     frw.seek(offset-2, 0)
-    fStr = fro.read()
-    fro.close()
-
     frw.write(text)
-    frw.write(fStr[:])
+    frw.write(fStr)
 
     frw.truncate()
     frw.close()
+    tracing.count("file_opens")
 
+@tracing.traced()
 def preprocess_json_file(filename):
-    import re
-    fh = open(filename, 'r+b' )
-    data = fh.read()
-    
-    for item in re.finditer(b'{' , data ) :
-        start = item.start()
-        break
-    for item in re.finditer(b'}' , data ) :
-        end= item.end()
+    data = get_view(filename).data
+    start = data.find(b'{')
+    end = data.rfind(b'}')+1
+    tracing.count("regex_scans", 2)
+    if start == 0 and end == len(data):
+        return
+    content = data[start:end]
+    tracing.count("bytes_read", len(content))
+    invalidate(filename)
     
-    fh.seek(0)
-    fh.write(data[start:end])
+    fh = open(filename, 'r+b' )
+    fh.write(content)
     fh.truncate()
     fh.close()
+    tracing.count("file_opens")
          
+@tracing.traced()
 def get_pattern_offset(filename, pattern):
-    import re
     locs = []
     p1=pattern.replace('(', '\(')
     p2=p1.replace(')', '\)')
@@ -43,88 +119,53 @@ def get_pattern_offset(filename, pattern):
     p7=p6.replace('*', '\*')
     p8=p7.replace('|', '\|')
     pat = re.compile( p8.encode(), re.MULTILINE )
-    fh = open(filename, 'rb' )
-    data = fh.read()
-    for item in re.finditer(pat, data) :
+    view = get_view(filename)
+    tracing.count("regex_scans")
+    for item in re.finditer(pat, view.data) :
         locs.append(item.start())
         locs.append(item.end())
 
     if len(locs)==2:
-        current_line = 0
-        fh.seek(0)
-        while fh.tell() < locs[1]:
-            fh.readline()
-            current_line += 1
-        fh.close()
-        locs.append(current_line)
-
+        locs.append(view.lines_before(locs[1]))
         return locs
     else:
-        fh.close()
         return None
 
+@tracing.traced()
 def get_pattern_all_offsets(filename, pattern):
-    import re
     locs = []
    
     pat = re.compile( pattern.encode(), re.MULTILINE )
-    fh = open(filename, 'rb' )
-    data = fh.read()
-    for item in re.finditer(pat, data) :
-        current_line = 0
-        fh.seek(0)
-        while fh.tell() <= item.start():
-            fh.readline()
-            current_line += 1
-        locs.append({"soffset":item.start(), "eoffset":item.end(), "line":current_line})
+    view = get_view(filename)
+    tracing.count("regex_scans")
+    for item in re.finditer(pat, view.data) :
+        locs.append({"soffset":item.start(), "eoffset":item.end(), "line":view.line_at(item.start())})
     
-    fh.close()
     return locs
     
+@tracing.traced()
 def get_snippet_at_offset(filename, offset, length):
-    fr = open(filename, "rb")
-    fr.seek(offset,0)
-    snippet = fr.read(length)
-    fr.close()
-    return snippet.decode()
+    with memoryview(get_view(filename).data) as mv:
+        snippet = mv[offset:offset+length]
+        tracing.count("bytes_read", len(snippet))
+        text = str(snippet, 'utf-8')
+        snippet.release()
+    return text
 
+@tracing.traced()
 def get_line_at_offset(filename, offset):
-    current_line = 0
-    fh = open(filename, "r", encoding="utf-8", errors="ignore")
-    fh.seek(0)
-    while fh.tell() <= offset:
-            fh.readline()
-            current_line += 1
-    fh.close()
-    return current_line
+    return get_view(filename).line_at(offset)
 
+@tracing.traced()
 def get_lines_between_offsets(filename, soffset,eoffset):
-    current_line = 0
-    lines = []
-    fh = open(filename, "r")
-    fh.seek(0)
-    while fh.tell() < soffset:
-            fh.readline()
-            current_line += 1
-    
-    lines.append(current_line)
-    while fh.tell() < eoffset:
-            fh.readline()
-            current_line += 1
-            lines.append(current_line)
-    fh.close()
-    return lines
+    view = get_view(filename)
+    first = view.lines_before(soffset)
+    return list(range(first, max(first, view.lines_before(eoffset))+1))
 
 
+@tracing.traced()
 def get_snippet_at_line(filename, lineno):
-    current_line = 0
-    fr = open(filename, "r", encoding="utf-8", errors="ignore")
-    fr.seek(0)
-    while current_line <lineno:
-            snippet = fr.readline()
-            current_line += 1
-    fr.close()
-    return snippet
+    return get_view(filename).line(lineno).decode('utf-8', errors='ignore')
 
 def adjust_injected_loc(locs, new_injected_loc, bug_snip_len):
     for i in range(len(locs)):
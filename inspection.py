@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 
-#import solidifi
+import solidifi
 import os,sys
 import shutil, glob
 import csv
@@ -8,12 +8,22 @@ import inject_file
 import re
 import json
 import pandas
+import gzip
+import bisect
+import io
+import time
+import tracing
+import campaign_db
+import corpus_io
+import slicer
+import resources
 
-reported_bugs = []
-reported_non_injected = []
 tools = []
 #tools = ["Oyente", "Securify", "Mythril", "Smartcheck","Slither","Manticore"]
 main_dir ="tool_results"
+combined_dir = "Combined"
+#Reader of a zip archive of tool results, set when main_dir is an archive rather than a directory
+archive = None
 bug_types = [
 {'tool':'Oyente','bugs':['Re-entrancy','Timestamp-Dependency','Unhandled-Exceptions','TOD','Overflow-Underflow']},
 {'tool':'Securify','bugs':['Re-entrancy','Unchecked-Send','Unhandled-Exceptions','TOD']},
@@ -35,47 +45,16 @@ oyente_bug_codes =[{'bug':'Unhandled-Exceptions','codes':['Callstack Depth Attac
 {'bug':'TOD','codes':['Transaction-Ordering Dependency']},{'bug':'Re-entrancy','codes':['Re-Entrancy Vulnerability']},{'bug':'Overflow-Underflow','codes':['Integer Overflow','Integer Underflow']}]
 manticore_bug_codes =[{'bug':'Re-entrancy','codes':['Potential reentrancy vulnerability','Reachable ether leak to sender']},{'bug':'Overflow-Underflow','codes':['Unsigned integer overflow at ADD instruction','Signed integer overflow at ADD instruction','Unsigned integer overflow at SUB instruction','Signed integer overflow at SUB instruction']}]
 
-contract_names_per_file = [{'file':'buggy_1.sol','names':['EIP20Interface','HotDollarsToken']},{'file':'buggy_2.sol','names':['CareerOnToken']},{'file':'buggy_3.sol','names':['CareerOnToken']},{'file':'buggy_4.sol','names':['PHO']},
-{'file':'buggy_5.sol','names':['Ownable','TokenERC20','TTC']},{'file':'buggy_6.sol','names':['Ownable','ChannelWallet']},
-{'file':'buggy_7.sol','names':['Ownable','AccountWallet']},{'file':'buggy_8.sol','names':['Ownable','TokenERC20','YFT']},{'file':'buggy_9.sol','names':['Ownable','XLToken']},{'file':'buggy_10.sol','names':['Ownable','XLToken']},
-{'file':'buggy_11.sol','names':['ERC20Interface','ApproveAndCallFallBack','Owned','ForTheBlockchain']},{'file':'buggy_12.sol','names':['ERC20','ERC223ReceivingContract','ERC223','ERC223Token','Owned','Grand']},
-{'file':'buggy_13.sol','names':['BitCash']},{'file':'buggy_14.sol','names':['ERC20','ERC20Detailed','SaveWon']},{'file':'buggy_15.sol','names':['MD']},
-{'file':'buggy_16.sol','names':['ERC20Interface','Owned','ExclusivePlatform']},{'file':'buggy_17.sol','names':['owned','TokenERC20','AZT']},{'file':'buggy_18.sol','names':['ERC20Interface','ApproveAndCallFallBack','Owned','_Yesbuzz']},
-{'file':'buggy_19.sol','names':['owned','ethBank']},{'file':'buggy_20.sol','names':['Ownable','Stoppable','RampInstantPoolInterface','RampInstantEscrowsPoolInterface','RampInstantPool','RampInstantEthPool']},
-{'file':'buggy_21.sol','names':['Token','StableDEX']},{'file':'buggy_22.sol','names':['owned','tokenRecipient','Token','MindsyncPlatform']},{'file':'buggy_23.sol','names':['Proxy','UpgradeabilityProxy','AdminUpgradeabilityProxy']},
-{'file':'buggy_24.sol','names':['FomoFeast']},{'file':'buggy_25.sol','names':['WhiteBetting']},
-{'file':'buggy_26.sol','names':['UBBCToken']},
-{'file':'buggy_27.sol','names':['Ownable','ERC20Detailed','DanPanCoin']},
-{'file':'buggy_28.sol','names':['ERC20Detailed','HYDROGEN']},
-{'file':'buggy_29.sol','names':['ERC20Interface','IERC20Interface','RaffleToken','RaffleTokenExchange']},
-{'file':'buggy_30.sol','names':['ERC777','MinterRole','PauserRole','Pausable','SKYBITToken']},
-{'file':'buggy_31.sol','names':['Ownable','ReentrancyGuard','FeeTransactionManager']},
-{'file':'buggy_32.sol','names':['ERC20TokenInterface','ERC20Token','AsseteGram']},
-{'file':'buggy_33.sol','names':['Owned','Token','Staking']},
-{'file':'buggy_34.sol','names':['Ownable','LollypopToken']},
-{'file':'buggy_35.sol','names':['owned','BitpayerDEX']},
-{'file':'buggy_36.sol','names':['owned','tokenRecipient','Token','MindsyncPlatform']},
-{'file':'buggy_37.sol','names':['SafeMath','ERC20Interface','ApproveAndCallFallBack','Owned','AugustCoin']},
-{'file':'buggy_38.sol','names':['ERC20Detailed','BIGBOMBv2']},
-{'file':'buggy_39.sol','names':['TAMCContract']},
-{'file':'buggy_40.sol','names':['ERC20','ERC20Detailed','SimpleSwapCoin']},
-{'file':'buggy_41.sol','names':['AO']},
-{'file':'buggy_42.sol','names':['Owned','Token','Staking']},
-{'file':'buggy_43.sol','names':['EventMetadata','Operated','MultiHashWrapper','ProofHash','Template','Post']},
-{'file':'buggy_44.sol','names':['EventMetadata','Operated','ProofHashes','MultiHashWrapper','Template','Feed']},
-{'file':'buggy_45.sol','names':['StockBet']},
-{'file':'buggy_46.sol','names':['ProofOfExistence']},
-{'file':'buggy_47.sol','names':['ERC20Interface','AcunarToken','AcunarIEO']},
-{'file':'buggy_48.sol','names':['ERC20Interface','ApproveAndCallFallBack','Owned','QurasToken']},
-{'file':'buggy_49.sol','names':['TAMC']},
-{'file':'buggy_50.sol','names':['digitalNotary']}]
+
+bug_codes = {'Oyente':oyente_bug_codes, 'Securify':securify_bug_codes, 'Mythril':mythril_bug_codes, 'Smartcheck':smartcheck_bug_codes,
+             'Slither':slither_bug_codes, 'Manticore':manticore_bug_codes}
 
 thresholds = [{'bug':'Re-entrancy','threshold':4},{'bug':'Unhandled-Exceptions','threshold':3},{'bug':'Unchecked-Send','threshold':2},
 {'bug':'Timestamp-Dependency','threshold':3},{'bug':'TOD','threshold':2},{'bug':'Overflow-Underflow','threshold':3},{'bug':'tx.origin','threshold':2}]
 
     
-def Inspect_results(_tools = []):
-    global reported_bugs 
+@tracing.traced()
+def Inspect_results(_tools = [], db_path = None, campaign = None, combined = False):
     oyente_FNs = []
     securify_FNs = []
     mythril_FNs = []
@@ -89,357 +68,63 @@ def Inspect_results(_tools = []):
     smartcheck_FPs = []
     slither_FPs = []
     manticore_FPs = []
+    tools_FNs = {'Oyente':oyente_FNs, 'Securify':securify_FNs, 'Mythril':mythril_FNs, 'Smartcheck':smartcheck_FNs, 'Slither':slither_FNs, 'Manticore':manticore_FNs}
+    tools_FPs = {'Oyente':oyente_FPs, 'Securify':securify_FPs, 'Mythril':mythril_FPs, 'Smartcheck':smartcheck_FPs, 'Slither':slither_FPs, 'Manticore':manticore_FPs}
+    tools_costs = dict((tool, []) for tool in tools_FNs)
 
     tools = _tools
     # Contracts
     x = [ i for i in range(1,51)]
 
+    reported_non_injected = []
     for tool in tools:
-        tool_bugs = [bugs['bugs'] for bugs in bug_types if  bugs['tool'] == tool]
-        for bug_type in tool_bugs[0]:
-            oyente_ibugs =0
-            oyente_bug_fn =0
-            oyente_misclas =0
-            securify_ibugs =0
-            securify_bug_fn =0
-            securify_misclas =0
-            mythril_ibugs =0
-            mythril_bug_fn =0
-            mythril_misclas =0
-            smartcheck_ibugs =0
-            smartcheck_bug_fn =0
-            smartcheck_misclas =0
-            slither_ibugs =0
-            slither_bug_fn =0
-            slither_misclas =0
-            manticore_ibugs =0
-            manticore_bug_fn =0
-            manticore_misclas =0
-            c=0
+        inspector = Inspector(tool)
+        for bug_type in inspector.bug_types:
+            ibugs =0
+            bug_fn =0
+            misclas =0
+            #resources of the runs whose usage was recorded and the bugs they detected
+            runs =0
+            detected =0
+            run_usage = {}
+            injection_usage = {}
             for cs in x:
                 tool_main_dir = os.path.join(main_dir,tool)
                 tool_buggy_sc = os.path.join(tool_main_dir,"analyzed_buggy_contracts")
                 injected_scs = os.path.join(tool_buggy_sc,bug_type)
+                if combined:
+                    injected_scs = os.path.join(tool_buggy_sc,combined_dir)
            
                 bug_log =injected_scs+"/BugLog_"+str(cs)+".csv"
-                buggy_sc =injected_scs+"/buggy_"+str(cs)+".sol"
-                result_file = injected_scs+"/results/buggy_"+str(cs)+".sol.txt"
-                if tool in ("Slither","Oyente"):
-                    result_file = injected_scs+"/results/buggy_"+str(cs)+".sol.json"
-
-                #Read the injected bug logs
-                with open(bug_log, 'r') as f:
-                    reader = csv.reader(f)
-                    bug_log_list = list(reader)                    
+                #contracts that did not compile, or were skipped by a sequential campaign, have no bug log
+                if not file_exists(bug_log):
+                    continue
 
                 #Inspect tool reports for false negatives and false positives positives
-                if tool =='Securify':
-                    detected_bugs = []       
-                    reported_bugs = []
-             
-                    #""locations of all violation patterns in the tool generated report""
-                    violation_pattern= "Violation((.+)\s)+at\s"
-
-                    violation_locs = inject_file.get_pattern_all_offsets(result_file, violation_pattern)
-                    for viol in violation_locs:                        
-                        extract_detected_bug(result_file,viol,tool,cs)            
-                                   
-                    #Inspect flase negatives                    
-                    false_negatives = []
-                    misclassifications = []
-                    tool_reported_bugs = [bugs for bugs in reported_bugs if  bugs['tool'] == tool and bugs['contract'] ==cs]
-                    tool_bug_codes = [codes for codes in securify_bug_codes if  codes['bug'] == bug_type]
-
-                    for ibug in bug_log_list[1:len(bug_log_list)]:
-                        detected = False
-                        misclassified = False
-                        for dbug in tool_reported_bugs:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                if dbug['bugType'].strip() in tool_bug_codes[0]['codes']:
-                                    detected = True
-                                else: 
-                                    misclassified = True
-                        if detected == False:
-                            false_negatives.append(ibug) 
-                        if misclassified == True and detected == False:
-                            misclassifications.append(ibug)
-                    
-                    securify_ibugs +=(len(bug_log_list)-1)
-                    securify_bug_fn +=len(false_negatives)
-                    securify_misclas +=len(misclassifications)
-                    
-                    #Inspect flase positives
-                    false_positives = []
-                    for dbug in tool_reported_bugs:
-                        
-                        injected = False
-                        for ibug in bug_log_list[1:len(bug_log_list)]:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                injected = True
-                        if injected == False:
-                            reported_non_injected.append(dbug)
-                                 
-                elif tool == 'Mythril':
-                    detected_bugs = []
-                    reported_bugs = []
-
-                    #""locations of all reported bug patterns in the tool generated report""                    
-                    violation_pattern= "===((.+)\s)+--"
-                    violation_locs = inject_file.get_pattern_all_offsets(result_file, violation_pattern)
-                    for viol in violation_locs:
-                        extract_detected_bug(result_file,viol,tool,cs)
-                        
-                       
-                    #Inspect flase negatives
-                    false_negatives = []
-                    misclassifications = []
-                    tool_reported_bugs = [bugs for bugs in reported_bugs if  bugs['tool'] == tool and bugs['contract'] ==cs]
-                    tool_bug_codes = [codes for codes in mythril_bug_codes if  codes['bug'] == bug_type]
-
-                    for ibug in bug_log_list[1:len(bug_log_list)]:
-                        detected = False
-                        misclassified = False
-
-                        for dbug in tool_reported_bugs:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                if dbug['bugType'].strip() in tool_bug_codes[0]['codes']:
-                                    detected = True
-                                else: 
-                                    misclassified = True                            
-                        if detected == False:
-                            false_negatives.append(ibug) 
-                        if misclassified == True and detected == False:
-                            misclassifications.append(ibug)
-                                     
-                    mythril_ibugs +=(len(bug_log_list)-1)
-                    mythril_bug_fn +=len(false_negatives)
-                    mythril_misclas +=len(misclassifications)  
-                
-                    #Inspect flase positives
-                    for dbug in tool_reported_bugs:
-                        injected = False
-                        for ibug in bug_log_list[1:len(bug_log_list)]:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                injected = True
-                        if injected == False:
-                            reported_non_injected.append(dbug)
-
-                elif tool == 'Slither':
-                    reported_bugs = []
-                 
-                    #""locations of all reported bug patterns in the tool generated report""
-                    with open(result_file) as fh:
-                        result_file_data = json.loads(fh.read())
-                    violation_locs = get_all_childs(result_file_data)
-                    
-                    for viol in violation_locs:
-                        line = re.findall(r'(?<=sol#)[0-9]*(?=\))',viol['desc'])
-                        if len(line)>0:
-                            bugLine = int (line[0])                        
-                        bugType = viol['type']
-                        reported_bugs.append({'tool':tool,'lines':bugLine,'bugType':bugType,'contract':cs})
-                        
-                                      
-                    #Inspect flase negatives                 
-                    false_negatives = []
-                    misclassifications = []
-                    tool_reported_bugs = [bugs for bugs in reported_bugs if  bugs['tool'] == tool and bugs['contract'] ==cs]
-                    tool_bug_codes = [codes for codes in slither_bug_codes if  codes['bug'] == bug_type]                     
-                    for ibug in bug_log_list[1:len(bug_log_list)]:
-                        detected = False
-                        misclassified = False
-                        for dbug in tool_reported_bugs:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                if dbug['bugType'].strip() in tool_bug_codes[0]['codes']:
-                                    detected = True
-                                else: 
-                                    misclassified = True
-
-                        if detected == False:
-                            false_negatives.append(ibug) 
-                        if misclassified == True and detected == False:
-                            misclassifications.append(ibug)
-                 
-                    #print(false_negatives) 
-                    slither_ibugs +=(len(bug_log_list)-1)
-                    slither_bug_fn +=len(false_negatives)
-                    slither_misclas +=len(misclassifications)
-                                
-                    #Inspect flase positives
-                    false_positives = []
-                    for dbug in tool_reported_bugs:
-                        injected = False
-                        for ibug in bug_log_list[1:len(bug_log_list)]:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                injected = True
-                        if injected == False:
-                            reported_non_injected.append(dbug)
-                    
-                elif tool == 'Smartcheck':
-                    detected_bugs = []
-                    reported_bugs = []
-
-                    #""locations of all reported bug patterns in the tool generated report""
-                    violation_pattern= "ruleId((.+)\s)+line:\s[0-9]*"
-
-                    violation_locs = inject_file.get_pattern_all_offsets(result_file, violation_pattern)
-                                    
-                    for viol in violation_locs:                        
-                        extract_detected_bug(result_file,viol,tool,cs)
-                                                           
-                    #Inspect flase negatives
-                    false_negatives = []
-                    misclassifications = []
-
-                    tool_reported_bugs = [bugs for bugs in reported_bugs if  bugs['tool'] == tool and bugs['contract'] ==cs]
-                    tool_bug_codes = [codes for codes in smartcheck_bug_codes if  codes['bug'] == bug_type]
-
-                    for ibug in bug_log_list[1:len(bug_log_list)]:
-                        detected = False
-                        misclassified = False
-                        for dbug in tool_reported_bugs:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                if dbug['bugType'].strip() in tool_bug_codes[0]['codes']:
-                                    detected = True
-                                else: 
-                                    misclassified = True
-
-                        if detected == False:
-                            false_negatives.append(ibug) 
-                        if misclassified == True and detected == False:
-                            misclassifications.append(ibug)                 
-                    
-                    smartcheck_ibugs +=(len(bug_log_list)-1)
-                    smartcheck_bug_fn +=len(false_negatives)
-                    smartcheck_misclas +=len(misclassifications)
-                    
-                    #Inspect flase positives
-                    false_positives = []
-                    for dbug in tool_reported_bugs:
-                        injected = False
-                        for ibug in bug_log_list[1:len(bug_log_list)]:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                injected = True
-                        if injected == False:
-                            reported_non_injected.append(dbug)
-
-                elif tool == 'Oyente':
-                    detected_bugs = []
-                    reported_bugs = []
-                    head, tail = os.path.split(buggy_sc)
-                    
-                    #""locations of all reported bug patterns in the tool generated report""                    
-                    violation_pattern= "(?<=sol:)(.*)(?=\.\\\)"
-                    
-                    cs_names = [names['names'] for names in contract_names_per_file if  names['file'] == tail]
-                    for cs_name in cs_names[0]:
-                        result_file = injected_scs+"/results/buggy_"+str(cs)+".sol:"+cs_name+".json"
-                        if not os.path.isfile(result_file):
-                            continue
-
-                        violation_locs = inject_file.get_pattern_all_offsets(result_file, violation_pattern)
-                        for viol in violation_locs:
-                            extract_detected_bug(result_file,viol,tool,cs)                            
-                                                                    
-                    #Inspect flase negatives                    
-                    false_negatives = []
-                    misclassifications = []
-                    tool_reported_bugs = [bugs for bugs in reported_bugs if  bugs['tool'] == tool and bugs['contract'] ==cs]
-                    tool_bug_codes = [codes for codes in oyente_bug_codes if  codes['bug'] == bug_type]
-
-                    for ibug in bug_log_list[1:len(bug_log_list)]:
-                        detected = False
-                        misclassified = False
-                        for dbug in tool_reported_bugs:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                if dbug['bugType'].strip() in tool_bug_codes[0]['codes']:
-                                    detected = True
-                                else: 
-                                    misclassified = True
-                        if detected == False:
-                            false_negatives.append(ibug) 
-                        if misclassified == True and detected == False:
-                            misclassifications.append(ibug)
-                                     
-                    oyente_ibugs +=(len(bug_log_list)-1)
-                    oyente_bug_fn +=len(false_negatives)
-                    oyente_misclas +=len(misclassifications)
-                 
-                    #Inspect flase positives
-                    false_positives = []
-                    for dbug in tool_reported_bugs:
-                        injected = False
-                        for ibug in bug_log_list[1:len(bug_log_list)]:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                injected = True
-                        if injected == False:
-                            reported_non_injected.append(dbug)
-
-                    
-                elif tool == 'Manticore':
-                    detected_bugs = []
-                    reported_bugs = []
-                    head, tail = os.path.split(buggy_sc)
-                    
-                    #""locations of all reported bug patterns in the tool generated report""                 
-                    violation_pattern= "\-((.+)\s)+[0-9]+"
-                    
-                    cs_names = [names['names'] for names in contract_names_per_file if  names['file'] == tail]                    
-                    for cs_name in cs_names[0]:
-                        result_file = injected_scs+"/results/buggy_"+str(cs)+"."+cs_name+".txt"                        
-                        if not os.path.isfile(result_file):
-                            continue                        
-                        violation_locs = inject_file.get_pattern_all_offsets(result_file, violation_pattern)
-                        for viol in violation_locs:                            
-                            extract_detected_bug(result_file,viol,tool,cs)
-                                                                            
-                    
-                    #Inspect flase negatives                    
-                    false_negatives = []
-                    misclassifications = []
-                    tool_reported_bugs = [bugs for bugs in reported_bugs if  bugs['tool'] == tool and bugs['contract'] ==cs]
-                    tool_bug_codes = [codes for codes in manticore_bug_codes if  codes['bug'] == bug_type]                    
-                    for ibug in bug_log_list[1:len(bug_log_list)]:
-                        detected = False
-                        misclassified = False
-                        for dbug in tool_reported_bugs:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                if dbug['bugType'].strip() in tool_bug_codes[0]['codes']:
-                                    detected = True                                   
-                                else: 
-                                    misclassified = True
-                        if detected == False:
-                            false_negatives.append(ibug) 
-                        if misclassified == True and detected == False:
-                            misclassifications.append(ibug)
-                    
-                    manticore_ibugs +=(len(bug_log_list)-1)
-                    manticore_bug_fn +=len(false_negatives)
-                    manticore_misclas +=len(misclassifications)
-                    
-                    #Inspect flase positives
-                    false_positives = []
-                    for dbug in tool_reported_bugs:
-                        injected = False
-                        for ibug in bug_log_list[1:len(bug_log_list)]:
-                            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
-                                injected = True
-                        if injected == False:
-                            reported_non_injected.append(dbug)
-                        
-            if tool == "Oyente":
-                oyente_FNs.append({'BugType':bug_type,'InjectedBugs':oyente_ibugs,'FalseNegatives':oyente_bug_fn,'MisClassified':oyente_misclas,'UnDetected':(oyente_bug_fn-oyente_misclas)})
-            elif tool == "Securify":
-                securify_FNs.append({'BugType':bug_type,'InjectedBugs':securify_ibugs,'FalseNegatives':securify_bug_fn,'MisClassified':securify_misclas,'UnDetected':(securify_bug_fn-securify_misclas)})
-            elif tool == "Mythril":
-                mythril_FNs.append({'BugType':bug_type,'InjectedBugs':mythril_ibugs,'FalseNegatives':mythril_bug_fn,'MisClassified':mythril_misclas,'UnDetected':(mythril_bug_fn-mythril_misclas)})
-            elif tool == "Smartcheck":
-                smartcheck_FNs.append({'BugType':bug_type,'InjectedBugs':smartcheck_ibugs,'FalseNegatives':smartcheck_bug_fn,'MisClassified':smartcheck_misclas,'UnDetected':(smartcheck_bug_fn-smartcheck_misclas)})
-            elif tool =="Slither":
-                slither_FNs.append({'BugType':bug_type,'InjectedBugs':slither_ibugs,'FalseNegatives':slither_bug_fn,'MisClassified':slither_misclas,'UnDetected':(slither_bug_fn-slither_misclas)})
-            elif tool =="Manticore":
-                manticore_FNs.append({'BugType':bug_type,'InjectedBugs':manticore_ibugs,'FalseNegatives':manticore_bug_fn,'MisClassified':manticore_misclas,'UnDetected':(manticore_bug_fn-manticore_misclas)})
+                #false positives of a combined contract are counted once, with its first bug type
+                score = inspector.inspect(read_file(bug_log), get_reports(tool, injected_scs, cs), bug_type, cs,
+                                          get_line_map(injected_scs, cs), combined)
+                ibugs +=score['ibugs']
+                bug_fn +=len(score['false_negatives'])
+                misclas +=len(score['misclassifications'])
+                if not combined or bug_type == inspector.bug_types[0]:
+                    reported_non_injected.extend(score['non_injected'])
+
+                #a combined contract is analyzed and injected once for all the bug types of the tool
+                usage = get_usage(tool, injected_scs, cs)
+                if usage is not None:
+                    runs +=1
+                    detected +=score['ibugs']-len(score['false_negatives'])
+                    resources.add(run_usage, resources.share(usage, len(inspector.bug_types) if combined else 1))
+                    if file_exists(resources.usage_file(bug_log)):
+                        usage = json.loads(read_file(resources.usage_file(bug_log)).decode())
+                        resources.add(injection_usage, resources.share(usage, len(inspector.bug_types) if combined else 1))
+
+            tools_FNs[tool].append({'BugType':bug_type,'InjectedBugs':ibugs,'FalseNegatives':bug_fn,'MisClassified':misclas,'UnDetected':(bug_fn-misclas)})
+            tools_costs[tool].append(get_costs(bug_type, runs, detected, run_usage, injection_usage))
    
+    inject_file.release_views()
+
     #Export False negative results 
     csv_columns =  ['BugType','InjectedBugs','FalseNegatives','MisClassified','UnDetected']
     for tool in tools:
@@ -473,152 +158,9 @@ def Inspect_results(_tools = []):
             print("I/O error")
     
     #Print to console
-    #remove duplicates
-    tempList = []
-    for bug in reported_non_injected:
-        if bug not in tempList:
-            tempList.append(bug)
-    _reported_non_injected = tempList
-    coded_reported_non_injected = []
-
-    #Check majority
-    for bug in _reported_non_injected:
-        coded_bugType =get_bug_type(bug)
-        coded_reported_non_injected.append({'lines':bug['lines'],'tool':bug['tool'],'bugType':coded_bugType,'contract':bug['contract']})
-    
+    coded_reported_non_injected = get_coded_non_injected(reported_non_injected)
     for tool in tools:
-        if tool == "Oyente":
-            tool_bugs = [bugs['bug'] for bugs in oyente_bug_codes]
-            for bug in tool_bugs:
-                fp_count = 0
-                excluded = 0
-                other_count = 0
-                bug_type_threshold = [thr['threshold'] for thr in thresholds if thr['bug']==bug][0]
-                for sc in x:
-                    type_specific_bugs = [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] == bug and bugs['contract']==sc]
-                    other_bugs= [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] not in tool_bugs and bugs['contract']==sc]
-                    other_count += len(other_bugs)
-                                    
-                    for sbugs in type_specific_bugs:
-                        tools_deteced_bug = [bugs for bugs in coded_reported_non_injected  if  bugs['lines'] == sbugs['lines'] and bugs['bugType']== bug and bugs['contract']==sc] 
-                        if not len(tools_deteced_bug) >= bug_type_threshold:
-                            fp_count +=1
-                        else:
-                            excluded +=1
-                      
-                oyente_FPs.append({'BugType':bug,'FalsePositives':fp_count,'ExcludedByMajority':excluded,'Total':(fp_count+excluded)})
-            oyente_FPs.append({'BugType':'Other','FalsePositives':other_count,'ExcludedByMajority':0,'Total':other_count})
-            
-        elif tool == "Securify":
-            tool_bugs = [bugs['bug'] for bugs in securify_bug_codes]
-            for bug in tool_bugs:
-                fp_count = 0
-                excluded = 0
-                other_count = 0
-
-                bug_type_threshold = [thr['threshold'] for thr in thresholds if thr['bug']==bug][0]
-                for sc in x:
-                    type_specific_bugs = [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] == bug and bugs['contract']==sc]
-                    other_bugs= [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] not in tool_bugs and bugs['contract']==sc]
-                    other_count += len(other_bugs)
-                    
-                    for sbugs in type_specific_bugs:
-                        tools_deteced_bug = [bugs for bugs in coded_reported_non_injected  if  bugs['lines'] == sbugs['lines'] and bugs['bugType']== bug and bugs['contract']==sc] 
-                        if not len(tools_deteced_bug) >= bug_type_threshold:                            
-                            fp_count +=1
-                        else:
-                            excluded +=1
-                
-                securify_FPs.append({'BugType':bug,'FalsePositives':fp_count,'ExcludedByMajority':excluded,'Total':(fp_count+excluded)})
-            securify_FPs.append({'BugType':'Other','FalsePositives':other_count,'ExcludedByMajority':0,'Total':other_count})
-
-        elif tool == "Mythril":
-            tool_bugs = [bugs['bug'] for bugs in mythril_bug_codes]
-            for bug in tool_bugs:
-                fp_count = 0
-                excluded = 0
-                other_count = 0
-                bug_type_threshold = [thr['threshold'] for thr in thresholds if thr['bug']==bug][0]
-                for sc in x:
-                    type_specific_bugs = [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] == bug and bugs['contract']==sc]
-                    other_bugs= [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] not in tool_bugs and bugs['contract']==sc]
-                    other_count += len(other_bugs)
-                    
-                    for sbugs in type_specific_bugs:
-                        tools_deteced_bug = [bugs for bugs in coded_reported_non_injected  if  bugs['lines'] == sbugs['lines'] and bugs['bugType']== bug] 
-                        if not len(tools_deteced_bug) >= bug_type_threshold:
-                            fp_count +=1    
-                        else:
-                            excluded +=1
-                
-                mythril_FPs.append({'BugType':bug,'FalsePositives':fp_count,'ExcludedByMajority':excluded,'Total':(fp_count+excluded)})
-            mythril_FPs.append({'BugType':'Other','FalsePositives':other_count,'ExcludedByMajority':0,'Total':other_count})
-
-        elif tool == "Smartcheck":
-            tool_bugs = [bugs['bug'] for bugs in smartcheck_bug_codes]
-            for bug in tool_bugs:
-                fp_count = 0
-                excluded = 0
-                other_count = 0
-                bug_type_threshold = [thr['threshold'] for thr in thresholds if thr['bug']==bug][0]
-                for sc in x:
-                    type_specific_bugs = [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] == bug and bugs['contract']==sc]
-                    other_bugs= [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] not in tool_bugs and bugs['contract']==sc]
-                    other_count += len(other_bugs)
-                    
-                    for sbugs in type_specific_bugs:
-                        tools_deteced_bug = [bugs for bugs in coded_reported_non_injected  if  bugs['lines'] == sbugs['lines'] and bugs['bugType']== bug and bugs['contract']==sc] 
-                        if not len(tools_deteced_bug) >= bug_type_threshold:
-                            fp_count +=1                            
-                        else:
-                            excluded +=1
-                
-                smartcheck_FPs.append({'BugType':bug,'FalsePositives':fp_count,'ExcludedByMajority':excluded,'Total':(fp_count+excluded)})
-            smartcheck_FPs.append({'BugType':'Other','FalsePositives':other_count,'ExcludedByMajority':0,'Total':other_count})
-
-        elif tool == "Slither":
-            tool_bugs = [bugs['bug'] for bugs in slither_bug_codes]
-            for bug in tool_bugs:
-                fp_count = 0
-                excluded = 0
-                other_count = 0
-                bug_type_threshold = [thr['threshold'] for thr in thresholds if thr['bug']==bug][0]
-                for sc in x:
-                    type_specific_bugs = [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] == bug and bugs['contract']==sc]
-                    other_bugs= [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] not in tool_bugs and bugs['contract']==sc]
-                    other_count += len(other_bugs)
-                    
-                    for sbugs in type_specific_bugs:
-                        tools_deteced_bug = [bugs for bugs in coded_reported_non_injected  if  bugs['lines'] == sbugs['lines'] and bugs['bugType']== bug and bugs['contract']==sc] 
-                        if not len(tools_deteced_bug) >= bug_type_threshold:
-                            fp_count +=1                            
-                        else:
-                            excluded +=1
-                
-                slither_FPs.append({'BugType':bug,'FalsePositives':fp_count,'ExcludedByMajority':excluded,'Total':(fp_count+excluded)})
-            slither_FPs.append({'BugType':'Other','FalsePositives':other_count,'ExcludedByMajority':0,'Total':other_count})
-
-        if tool == "Manticore":
-            tool_bugs = [bugs['bug'] for bugs in manticore_bug_codes]
-            for bug in tool_bugs:
-                fp_count = 0
-                excluded = 0
-                other_count = 0
-                bug_type_threshold = [thr['threshold'] for thr in thresholds if thr['bug']==bug][0]
-                for sc in x:
-                    type_specific_bugs = [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] == bug and bugs['contract']==sc]
-                    other_bugs= [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] not in tool_bugs and bugs['contract']==sc]
-                    other_count += len(other_bugs)
-                    
-                    for sbugs in type_specific_bugs:
-                        tools_deteced_bug = [bugs for bugs in coded_reported_non_injected  if  bugs['lines'] == sbugs['lines'] and bugs['bugType']== bug and bugs['contract']==sc] 
-                        if not len(tools_deteced_bug) >= bug_type_threshold:
-                            fp_count +=1                            
-                        else:
-                            excluded +=1
-                      
-                manticore_FPs.append({'BugType':bug,'FalsePositives':fp_count,'ExcludedByMajority':excluded,'Total':(fp_count+excluded)})
-            manticore_FPs.append({'BugType':'Other','FalsePositives':other_count,'ExcludedByMajority':0,'Total':other_count})
+        tools_FPs[tool].extend(get_fps(tool, coded_reported_non_injected, x))
 
     #Export False positive results 
     csv_columns =  ['BugType','FalsePositives','ExcludedByMajority','Total']
@@ -652,7 +194,333 @@ def Inspect_results(_tools = []):
         except IOError:
             print("I/O error")
 
+    #Export the analyzer cost per detected bug
+    csv_columns = ['BugType','Runs','Detected','WallHours','CPUHours','PeakRSSMB','IOMB','CPUSecondsPerDetected','InjectionCPUSeconds']
+    os.makedirs("Costs", exist_ok=True)
+    for tool in tools:
+        if sum(row['Runs'] for row in tools_costs[tool]) == 0:
+            continue
+        csv_file = os.path.join("Costs/"+tool+"_Costs.csv")
+        try:
+            with open(csv_file, 'w') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
+                writer.writeheader()
+                for data in tools_costs[tool]:
+                    writer.writerow(data)
+            print ("\n************************** "+tool +" Cost per detected bug *******************\n")
+            df = pandas.read_csv(csv_file)
+            print(df)
+        except IOError:
+            print("I/O error")
+
+    #Store the results of the campaign
+    if db_path is not None:
+        tool_results = {'Oyente':(oyente_FNs, oyente_FPs), 'Securify':(securify_FNs, securify_FPs), 'Mythril':(mythril_FNs, mythril_FPs),
+                        'Smartcheck':(smartcheck_FNs, smartcheck_FPs), 'Slither':(slither_FNs, slither_FPs), 'Manticore':(manticore_FNs, manticore_FPs)}
+        conn = campaign_db.connect(db_path)
+        campaign_id = campaign_db.get_campaign(conn, campaign)
+        for tool in tools:
+            campaign_db.record_metrics(conn, campaign_id, tool, tool_results[tool][0], tool_results[tool][1])
+        conn.close()
+
+
+
+def get_result_files(tool, injected_scs, cs):
+    """Reports of a tool on one buggy contract; Oyente and Manticore write one report per contract of the file"""
+    buggy_sc =injected_scs+"/buggy_"+str(cs)+".sol"
+    if tool == 'Oyente':
+        return [injected_scs+"/results/buggy_"+str(cs)+".sol:"+cs_name+".json" for cs_name in get_contract_names(buggy_sc, cs)]
+    elif tool == 'Manticore':
+        return [injected_scs+"/results/buggy_"+str(cs)+"."+cs_name+".txt" for cs_name in get_contract_names(buggy_sc, cs)]
+    elif tool == "Slither":
+        return [injected_scs+"/results/buggy_"+str(cs)+".sol.json"]
+    return [injected_scs+"/results/buggy_"+str(cs)+".sol.txt"]
+
+def get_reports(tool, injected_scs, cs):
+    """Contents of the reports of a tool on one buggy contract, leaving out the missing per-contract reports of Oyente and Manticore"""
+    result_files = get_result_files(tool, injected_scs, cs)
+    if tool in ('Oyente', 'Manticore'):
+        result_files = [result_file for result_file in result_files if report_exists(result_file)]
+    return [read_report(result_file) for result_file in result_files]
+
+def get_line_map(injected_scs, cs):
+    """Lines of the full buggy contract of each line of its sliced version, None when the contract was not sliced"""
+    buggy_sc =injected_scs+"/buggy_"+str(cs)+".sol"
+    if file_exists(slicer.map_file(buggy_sc)):
+        return json.loads(read_file(slicer.map_file(buggy_sc)).decode())
+    return None
+
+def get_reported_bugs(tool, injected_scs, cs):
+    """Bugs a tool reported on one buggy contract
+
+    The lines of bugs reported on a sliced contract are translated to the lines of the full buggy contract.
+    """
+    return Inspector(tool).get_reported_bugs(get_reports(tool, injected_scs, cs), cs, get_line_map(injected_scs, cs))
+
+def get_usage(tool, injected_scs, cs):
+    """Resources the tool runs on one buggy contract took, None when none of them was recorded (e.g. cached reports)"""
+    total = None
+    for result_file in get_result_files(tool, injected_scs, cs):
+        if file_exists(resources.usage_file(result_file)):
+            total = resources.add(total or {}, json.loads(read_file(resources.usage_file(result_file)).decode()))
+    return total
+
+def get_costs(bug_type, runs, detected, run_usage, injection_usage):
+    """Row of the cost table: analyzer time, memory and I/O of the measured runs of a bug type, and CPU seconds per bug they detected"""
+    cpu = run_usage.get('user', 0)+run_usage.get('sys', 0)
+    return {'BugType':bug_type, 'Runs':runs, 'Detected':detected, 'WallHours':round(run_usage.get('wall', 0)/3600, 3),
+            'CPUHours':round(cpu/3600, 3), 'PeakRSSMB':round(run_usage.get('max_rss', 0)/1024.0**2),
+            'IOMB':round((run_usage.get('read_bytes', 0)+run_usage.get('write_bytes', 0))/1024.0**2, 1),
+            'CPUSecondsPerDetected':round(cpu/detected, 2) if detected > 0 else None,
+            'InjectionCPUSeconds':round(injection_usage.get('user', 0)+injection_usage.get('sys', 0), 1)}
+
+def score_contract(tool, bug_type, cs, reported_bugs, bug_log_list, all_bug_log_list=None):
+    """Match the bugs a tool reported on one contract against the rows of its bug log (header row included)
+
+    Returns the number of injected bugs, the false negatives, the misclassified ones among them and the
+    reported bugs that fall outside every injected snippet of all_bug_log_list (bug_log_list by default).
+    """
+    if all_bug_log_list is None:
+        all_bug_log_list = bug_log_list
+
+    #Inspect flase negatives
+    false_negatives = []
+    misclassifications = []
+    tool_reported_bugs = [bugs for bugs in reported_bugs if  bugs['tool'] == tool and bugs['contract'] ==cs]
+    tool_bug_codes = [codes for codes in bug_codes[tool] if  codes['bug'] == bug_type]
+    for ibug in bug_log_list[1:len(bug_log_list)]:
+        detected = False
+        misclassified = False
+        for dbug in tool_reported_bugs:
+            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
+                if dbug['bugType'].strip() in tool_bug_codes[0]['codes']:
+                    detected = True
+                else: 
+                    misclassified = True
+        if detected == False:
+            false_negatives.append(ibug) 
+        if misclassified == True and detected == False:
+            misclassifications.append(ibug)
+
+    #Inspect flase positives
+    non_injected = []
+    for dbug in tool_reported_bugs:
+        injected = False
+        for ibug in all_bug_log_list[1:len(all_bug_log_list)]:
+            if int(dbug['lines']) >= int(ibug[0]) and int(dbug['lines']) < (int(ibug[0])+int(ibug[1])):
+                injected = True
+        if injected == False:
+            non_injected.append(dbug)
+    return {'ibugs':len(bug_log_list)-1, 'false_negatives':false_negatives, 'misclassifications':misclassifications, 'non_injected':non_injected}
+
+def get_coded_non_injected(reported_non_injected):
+    """Reported bugs outside injected code, without duplicates and with their tool codes mapped to bug types"""
+    #remove duplicates
+    tempList = []
+    for bug in reported_non_injected:
+        if bug not in tempList:
+            tempList.append(bug)
+    coded_reported_non_injected = []
 
+    #Check majority
+    for bug in tempList:
+        coded_bugType =get_bug_type(bug)
+        coded_reported_non_injected.append({'lines':bug['lines'],'tool':bug['tool'],'bugType':coded_bugType,'contract':bug['contract']})
+    return coded_reported_non_injected
+
+def get_fps(tool, coded_reported_non_injected, contracts):
+    """False positives of a tool per bug type, leaving out the reports at a line flagged by at least the bug type's threshold of reports"""
+    tool_bugs = [bugs['bug'] for bugs in bug_codes[tool]]
+    FPs = []
+    for bug in tool_bugs:
+        fp_count = 0
+        excluded = 0
+        other_count = 0
+        bug_type_threshold = [thr['threshold'] for thr in thresholds if thr['bug']==bug][0]
+        for sc in contracts:
+            type_specific_bugs = [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] == bug and bugs['contract']==sc]
+            other_bugs= [bugs for bugs in coded_reported_non_injected  if  bugs['tool'] == tool and bugs['bugType'] not in tool_bugs and bugs['contract']==sc]
+            other_count += len(other_bugs)
+
+            for sbugs in type_specific_bugs:
+                #Mythril reports have always been matched against the same line in any contract
+                tools_deteced_bug = [bugs for bugs in coded_reported_non_injected  if  bugs['lines'] == sbugs['lines'] and bugs['bugType']== bug and (tool == "Mythril" or bugs['contract']==sc)]
+                if not len(tools_deteced_bug) >= bug_type_threshold:
+                    fp_count +=1
+                else:
+                    excluded +=1
+
+        FPs.append({'BugType':bug,'FalsePositives':fp_count,'ExcludedByMajority':excluded,'Total':(fp_count+excluded)})
+    FPs.append({'BugType':'Other','FalsePositives':other_count,'ExcludedByMajority':0,'Total':other_count})
+    return FPs
+
+class Inspector:
+    """Scores the reports of one tool on buggy contracts, from memory and without global state
+
+    Bug logs and reports are given as bytes or as paths of files, which are only read, so one Inspector
+    can score contracts from several threads or worker processes at once.
+    """
+
+    def __init__(self, tool):
+        if tool not in bug_codes:
+            raise ValueError("Unknown tool: "+tool)
+        self.tool = tool
+        self.bug_types = [bugs['bugs'] for bugs in bug_types if bugs['tool'] == tool][0]
+
+    def read(self, source):
+        """Contents of a bug log or report given as bytes or as a path, stored as is or gzip-compressed"""
+        if isinstance(source, (bytes, bytearray)):
+            return bytes(source)
+        source = str(source)
+        if not os.path.isfile(source) and os.path.isfile(source+".gz"):
+            source += ".gz"
+        with open(source, 'rb') as fh:
+            data = fh.read()
+        if source.endswith(".gz"):
+            return gzip.decompress(data)
+        return data
+
+    def get_bug_log(self, bug_log):
+        """Rows of a bug log, header row included"""
+        if isinstance(bug_log, list):
+            return bug_log
+        return list(csv.reader(io.StringIO(self.read(bug_log).decode())))
+
+    def get_reported_bugs(self, report, contract=None, line_map=None):
+        """Bugs reported on one contract, report being one report or a list of them (Oyente and Manticore write one per contract of the file)
+
+        line_map (a list, or the bytes or path of a slicer line map) translates the lines of a sliced contract back.
+        """
+        reported_bugs = []
+        for data in (report if isinstance(report, list) else [report]):
+            reported_bugs.extend(parse_report(self.tool, self.read(data), contract))
+        if line_map is not None and not isinstance(line_map, list):
+            line_map = json.loads(self.read(line_map).decode())
+        return slicer.translate_lines(reported_bugs, line_map)
+
+    def inspect(self, bug_log, report, bug_type, contract=None, line_map=None, combined=False):
+        """Score the report of the tool on one buggy contract for one bug type
+
+        A combined bug log holds the bugs of every type: false negatives are counted on its rows of bug_type,
+        false positives against all of them. Returns the score_contract dict together with the reported bugs,
+        a detection per injected bug with the reports that fall into it, the FNs row of the bug type and the
+        FPs rows of the contract, in which majority exclusion only sees this report (see false_positives).
+        """
+        all_bug_log_list = self.get_bug_log(bug_log)
+        bug_log_list = all_bug_log_list
+        if combined:
+            bug_log_list = [all_bug_log_list[0]] + [ibug for ibug in all_bug_log_list[1:] if ibug[2] == bug_type]
+        reported_bugs = self.get_reported_bugs(report, contract, line_map)
+        score = score_contract(self.tool, bug_type, contract, reported_bugs, bug_log_list, all_bug_log_list)
+
+        detections = []
+        for ibug in bug_log_list[1:]:
+            reports = [dbug for dbug in reported_bugs if int(ibug[0]) <= int(dbug['lines']) < int(ibug[0])+int(ibug[1])]
+            detections.append({'loc':int(ibug[0]), 'length':int(ibug[1]), 'bug type':ibug[2], 'reports':reports,
+                               'detected':ibug not in score['false_negatives'], 'misclassified':ibug in score['misclassifications']})
+        bug_fn = len(score['false_negatives'])
+        misclas = len(score['misclassifications'])
+        score.update({'tool':self.tool, 'contract':contract, 'bug_type':bug_type, 'reported_bugs':reported_bugs, 'detections':detections,
+                      'FNs':{'BugType':bug_type, 'InjectedBugs':score['ibugs'], 'FalseNegatives':bug_fn, 'MisClassified':misclas, 'UnDetected':bug_fn-misclas},
+                      'FPs':self.false_positives(score['non_injected'], [contract])})
+        return score
+
+    def false_positives(self, non_injected, contracts):
+        """FPs rows of the tool over contracts, non_injected being the reports outside injected code of every tool to take the majority of"""
+        return get_fps(self.tool, get_coded_non_injected(non_injected), contracts)
+
+class Aggregator:
+    """Metrics of a campaign while it runs, updated as each analyzer job completes (see tool_runner.run_jobs on_done)
+
+    A contract is rescored from its reports every time one of its jobs completes. The FN and misclassification
+    counts of every tool and bug type are kept up to date from these scores; FP counts need the reports of
+    every tool at a line and are computed over the contracts scored so far when asked for. Every interval
+    seconds a summary with the throughput, the ETA and these partial metrics is printed.
+    """
+
+    def __init__(self, combined=False, interval=60):
+        self.combined = combined
+        self.interval = interval
+        self.start = time.time()
+        self.last_print = self.start
+        self.expected = 0
+        self.analyzed = set()
+        #(tool, folder, contract) -> {bug type: Inspector.inspect score}
+        self.scores = {}
+        #(tool, bug type) -> FNs row over the scored contracts
+        self.FNs = {}
+        self.inspectors = {}
+
+    def expect(self, n):
+        """Add n contract analyses (a tool on one buggy contract) to the expected total used for the ETA"""
+        self.expected += n
+
+    def on_done(self, job, result):
+        if job.get('batch') is not None:
+            analyzed = [(c['file'], c['contract']) for c in job['batch']]
+        else:
+            analyzed = [(job['file'], job['contract'])]
+        for buggy_sc, cs in analyzed:
+            self.update(job['tool'], os.path.dirname(buggy_sc), cs)
+        if self.interval > 0 and time.time()-self.last_print >= self.interval:
+            self.print_summary()
+
+    def update(self, tool, injected_scs, cs):
+        """Rescore one contract analyzed by a tool, replacing its previous score"""
+        key = (tool, injected_scs, cs)
+        self.analyzed.add(key)
+        try:
+            inspector = self.inspectors.setdefault(tool, Inspector(tool))
+            bug_log = inspector.read(os.path.join(injected_scs, "BugLog_"+str(cs)+".csv"))
+            reports = get_reports(tool, injected_scs, cs)
+            line_map = get_line_map(injected_scs, cs)
+            bug_types = inspector.bug_types if self.combined else [os.path.basename(injected_scs)]
+            scores = dict((bug_type, inspector.inspect(bug_log, reports, bug_type, cs, line_map, self.combined)) for bug_type in bug_types)
+        except (OSError, ValueError):
+            """No bug log, or a run that left no report"""
+            return
+        for sign, old_scores in ((-1, self.scores.get(key, {})), (1, scores)):
+            for bug_type, score in old_scores.items():
+                row = self.FNs.setdefault((tool, bug_type), {'BugType':bug_type, 'InjectedBugs':0, 'FalseNegatives':0, 'MisClassified':0, 'UnDetected':0})
+                for column in ('InjectedBugs', 'FalseNegatives', 'MisClassified', 'UnDetected'):
+                    row[column] += sign*score['FNs'][column]
+        self.scores[key] = scores
+
+    def get_FPs(self):
+        """FPs rows of each tool over the contracts scored so far, excluding the reports of a majority of tools"""
+        non_injected = []
+        for scores in self.scores.values():
+            #the false positives of a contract are the same for all the bug types of a combined folder
+            for score in list(scores.values())[:1]:
+                non_injected.extend(score['non_injected'])
+        contracts = sorted(set(cs for (tool, injected_scs, cs) in self.scores), key=str)
+        return dict((tool, inspector.false_positives(non_injected, contracts)) for tool, inspector in self.inspectors.items())
+
+    def get_summary(self):
+        """Contract analyses done and expected, analyses per hour, seconds left and the partial FNs and FPs rows of each tool"""
+        elapsed = time.time()-self.start
+        done = len(self.analyzed)
+        rate = done/elapsed if elapsed > 0 else 0.0
+        eta = max(self.expected-done, 0)/rate if rate > 0 else None
+        FNs = {}
+        for (tool, bug_type), row in sorted(self.FNs.items()):
+            FNs.setdefault(tool, []).append(dict(row))
+        return {'done':done, 'expected':self.expected, 'per_hour':rate*3600, 'eta':eta, 'FNs':FNs, 'FPs':self.get_FPs()}
+
+    def print_summary(self):
+        self.last_print = time.time()
+        summary = self.get_summary()
+        eta = "unknown" if summary['eta'] is None else "{0:.1f}h".format(summary['eta']/3600)
+        print("\n************************** Progress: {0}/{1} contract analyses, {2:.1f}/h, ETA {3} *******************".format(
+            summary['done'], summary['expected'], summary['per_hour'], eta))
+        for tool in sorted(summary['FNs']):
+            fps = dict((fp['BugType'], fp) for fp in summary['FPs'].get(tool, []))
+            for row in summary['FNs'][tool]:
+                fp = fps.get(row['BugType'], {'FalsePositives':0, 'ExcludedByMajority':0})
+                rate = 100.0*row['FalseNegatives']/row['InjectedBugs'] if row['InjectedBugs'] > 0 else 0.0
+                print("{0} {1}: {2}/{3} false negatives ({4:.1f}%), {5} misclassified, {6} false positives, {7} excluded by majority".format(
+                    tool, row['BugType'], row['FalseNegatives'], row['InjectedBugs'], rate, row['MisClassified'],
+                    fp['FalsePositives'], fp['ExcludedByMajority']))
 
 def get_bug_type(bug_info):
     if bug_info['tool'] == "Oyente":
@@ -709,43 +577,127 @@ def get_bug_type(bug_info):
             
         return bug_info['bugType'] 
 
-def extract_detected_bug(result_file, bug_info, tool, contract):
-    global reported_bugs
-
+"""Regular expressions delimiting one reported bug in each tool's text report"""
+violation_patterns = {'Securify':"Violation((.+)\s)+at\s", 'Mythril':"===((.+)\s)+--", 'Smartcheck':"ruleId((.+)\s)+line:\s[0-9]*",
+'Oyente':"(?<=sol:)(.*)(?=\.\\\)", 'Manticore':"\-((.+)\s)+[0-9]+"}
+
+class ReportParser:
+    """Incremental parser of a tool report, fed with chunks of the report as the tool produces them"""
+
+    def __init__(self, tool, contract):
+        self.tool = tool
+        self.contract = contract
+        self.buffer = bytearray()
+        self.reported_bugs = []
+        self.last_line = None
+        if tool in violation_patterns:
+            self.pattern = re.compile(violation_patterns[tool].encode(), re.MULTILINE)
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.tool in violation_patterns:
+            #""A reported bug never spans an empty line, so everything before the last one can be scanned now""
+            end = self.buffer.rfind(b'\n\n')
+            if end >= 0:
+                self.scan(bytes(self.buffer[:end+2]))
+                del self.buffer[:end+2]
+        return self.reported_bugs
+
+    def close(self):
+        if self.tool == 'Slither':
+            if len(self.buffer.strip()) > 0:
+                self.scan_slither(json.loads(self.buffer.decode()))
+        elif self.tool in violation_patterns:
+            self.scan(bytes(self.buffer))
+        self.buffer = bytearray()
+        return self.reported_bugs
+
+    def scan(self, data):
+        lines = data.split(b'\n')
+        line_starts = [0]
+        for line in lines[:-1]:
+            line_starts.append(line_starts[-1]+len(line)+1)
+
+        def line_at(offset):
+            return bisect.bisect_right(line_starts, offset)
+
+        def snippet_at(lineno):
+            if 0 < lineno <= len(lines):
+                return lines[lineno-1].decode(errors='ignore') + ('\n' if lineno < len(lines) else '')
+            return ''
+
+        tracing.count("regex_scans")
+        for item in self.pattern.finditer(data):
+            try:
+                self.reported_bugs.append(extract_bug(self.tool, snippet_at(line_at(item.start())), snippet_at, line_at(item.end()), self.contract))
+            except IndexError:
+                continue
+
+    def scan_slither(self, result_file_data):
+        for viol in get_all_childs(result_file_data):
+            line = re.findall(r'(?<=sol#)[0-9]*(?=\))',viol['desc'])
+            if len(line)>0:
+                self.last_line = int (line[0])
+            if self.last_line is None:
+                continue
+            self.reported_bugs.append({'tool':self.tool,'lines':self.last_line,'bugType':viol['type'],'contract':self.contract})
+
+def extract_bug(tool, first_line, snippet_at, end_line, contract):
+    """The line and code of one reported bug, from the lines of an in-memory report"""
     if tool == "Securify":
-        bugLine =int(re.findall(r'\(([^()]+)\)',inject_file.get_snippet_at_line(result_file,inject_file.get_line_at_offset(result_file,bug_info['eoffset'])))[0])
-        bugType = re.findall(r'(?<= for )(.*)(?= in )',inject_file.get_snippet_at_line(result_file,bug_info['line']))[0]
-        
-        reported_bugs.append({'tool':tool,'lines':bugLine,'bugType':bugType,'contract':contract})
-
-
+        bugLine =int(re.findall(r'\(([^()]+)\)',snippet_at(end_line))[0])
+        bugType = re.findall(r'(?<= for )(.*)(?= in )',first_line)[0]
     elif tool == "Mythril":
-        try:
-            bugLine =int(re.findall(r'sol:(\d+)',inject_file.get_snippet_at_line(result_file,inject_file.get_line_at_offset(result_file,bug_info['eoffset'])+1))[0])
-            bugType = re.findall(r'(?<== )(.*)(?= =)',inject_file.get_snippet_at_line(result_file,int(bug_info['line'])))[0]
-            reported_bugs.append({'tool':tool,'lines':bugLine,'bugType':bugType,'contract':contract})
-        except IndexError:
-            return
-
-
+        bugLine =int(re.findall(r'sol:(\d+)',snippet_at(end_line+1))[0])
+        bugType = re.findall(r'(?<== )(.*)(?= =)',first_line)[0]
     elif tool == "Smartcheck":
-        bugLine =int(re.findall(r'line:\s(\d+)',inject_file.get_snippet_at_line(result_file,inject_file.get_line_at_offset(result_file,bug_info['eoffset'])))[0])
-        bugType = re.findall(r'(?<=ruleId:\s)(.*)',inject_file.get_snippet_at_line(result_file,int(bug_info['line'])))[0]
-        reported_bugs.append({'tool':tool,'lines':bugLine,'bugType':bugType,'contract':contract})
-
+        bugLine =int(re.findall(r'line:\s(\d+)',snippet_at(end_line))[0])
+        bugType = re.findall(r'(?<=ruleId:\s)(.*)',first_line)[0]
     elif tool == "Oyente":
-        bugLine =int(re.findall(r'sol:(\d+)',inject_file.get_snippet_at_line(result_file,inject_file.get_line_at_offset(result_file,bug_info['eoffset'])))[0])
-
-        s= inject_file.get_snippet_at_line(result_file,int(bug_info['line']))[0:85]
-        bugType = re.findall(r'(?<=Warning: )(.*)(?=\.\\)',s)[0]
-        reported_bugs.append({'tool':tool,'lines':bugLine,'bugType':bugType,'contract':contract})
-    
+        bugLine =int(re.findall(r'sol:(\d+)',snippet_at(end_line))[0])
+        bugType = re.findall(r'(?<=Warning: )(.*)(?=\.\\)',first_line[0:85])[0]
     elif tool == "Manticore":
-        bugLine =int(re.findall(r'[0-9]*\s\s\s*',inject_file.get_snippet_at_line(result_file,inject_file.get_line_at_offset(result_file,bug_info['eoffset'])))[1])
-        bugType = re.findall(r'(?<=-)(.*)(?= -)',inject_file.get_snippet_at_line(result_file,int(bug_info['line'])))[0].strip()
-        reported_bugs.append({'tool':tool,'lines':bugLine,'bugType':bugType,'contract':contract})
+        bugLine =int(re.findall(r'[0-9]*\s\s\s*',snippet_at(end_line))[1])
+        bugType = re.findall(r'(?<=-)(.*)(?= -)',first_line)[0].strip()
+    return {'tool':tool,'lines':bugLine,'bugType':bugType,'contract':contract}
+
+@tracing.traced()
+def parse_report(tool, data, contract):
+    """Extract the bugs reported by a tool from the contents of its report"""
+    parser = ReportParser(tool, contract)
+    parser.feed(data)
+    return parser.close()
+
+def get_contract_names(buggy_sc, cs):
+    """Contracts of a buggy file that got a report of their own, from the AST of the original contract or the buggy source"""
+    if archive is not None or file_exists(slicer.map_file(buggy_sc)):
+        return solidifi.contract_names_from_source(read_file(buggy_sc))
+    return solidifi.get_contract_names(buggy_sc, os.path.join("ast", str(cs)+".json"))
+
+def file_exists(path):
+    if archive is not None:
+        return archive.exists(os.path.relpath(path, main_dir))
+    return os.path.isfile(path)
+
+def read_file(path):
+    """Contents of a file under main_dir, from the results archive when there is one"""
+    tracing.count("file_opens")
+    if archive is not None:
+        data = archive.read(os.path.relpath(path, main_dir))
+    else:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+    tracing.count("bytes_read", len(data))
+    return data
 
-    
+def report_exists(result_file):
+    return file_exists(result_file) or file_exists(result_file+".gz")
+
+def read_report(result_file):
+    """Read a tool report, stored either as is or gzip-compressed by the tool runner"""
+    if not file_exists(result_file) and file_exists(result_file+".gz"):
+        return gzip.decompress(read_file(result_file+".gz"))
+    return read_file(result_file)
 
 def get_all_childs(file):
     all_childs = []
@@ -779,15 +731,23 @@ def extract(obj, arr, key):
             extract(item, arr, key)
     return arr
 
+def printUsage(prog):
+    print("%s <tool1,tool2,...> [<tool results dir or .zip archive>] [--combined]" % prog)
+
 if __name__ == "__main__":
-    if 1 != len(sys.argv):
-        if sys.argv[1] in ('--help', '-h'):
-            printUsage(sys.argv[0])
+    combined = '--combined' in sys.argv
+    args = [arg for arg in sys.argv if arg != '--combined']
+    if 1 != len(args):
+        if args[1] in ('--help', '-h'):
+            printUsage(args[0])
+            sys.exit()
                 
-        tools= sys.argv[1].split(',')
-        if 3 == len(sys.argv):
-            main_dir = sys.argv[2]
-        Inspect_results(tools)
+        tools= args[1].split(',')
+        if 3 == len(args):
+            main_dir = args[2]
+            if not os.path.isdir(main_dir):
+                archive = corpus_io.ArchiveReader(main_dir)
+        Inspect_results(tools, combined = combined)
 
     else:
         print("wrong number of parameters")
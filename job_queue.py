@@ -0,0 +1,275 @@
+#!/usr/bin/python3
+
+import os, sys
+import json
+import time
+import socket
+import getopt
+import shutil
+import sqlite3
+import tempfile
+import threading
+import subprocess
+import campaign_db
+
+"""Pull-based queue of campaign tasks in a SQLite file, shared by workers on one or several hosts
+
+Workers lease a task, renew the lease with heartbeats while it runs and mark it done or failed.
+A task whose lease expires (its worker crashed or lost the filesystem) goes back to the queue.
+Tasks of a stage (inject, analyze, inspect) only start once the earlier stages of their campaign are over.
+"""
+
+schema = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    campaign TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    stage INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    created REAL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (state, campaign, stage);
+"""
+
+stages = {'inject':0, 'analyze':1, 'inspect':2, 'command':1}
+lease_seconds = 300
+max_attempts = 3
+poll_interval = 5
+
+def connect(db_path):
+    """Open the queue; the rollback journal is used because WAL does not work on network filesystems"""
+    conn = sqlite3.connect(db_path, timeout=120, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.executescript(schema)
+    return conn
+
+def submit(conn, campaign, kind, payload):
+    now = time.time()
+    cur = conn.execute("INSERT INTO tasks (campaign, kind, stage, payload, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                       (campaign, kind, stages[kind], json.dumps(payload), now, now))
+    return cur.lastrowid
+
+def acquire(conn, worker):
+    """Lease the next runnable task, or return None"""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        """Expired leases go back to the queue, or fail after max_attempts"""
+        conn.execute("UPDATE tasks SET state = 'failed', result = ?, updated = ? WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                     (json.dumps({'error':'lease expired {0} times'.format(max_attempts)}), now, now, max_attempts))
+        conn.execute("UPDATE tasks SET state = 'queued', worker = NULL, updated = ? WHERE state = 'leased' AND lease_until < ?", (now, now))
+        row = conn.execute("SELECT id, kind, payload, campaign FROM tasks t WHERE state = 'queued' AND NOT EXISTS "
+                           "(SELECT 1 FROM tasks e WHERE e.campaign = t.campaign AND e.stage < t.stage AND e.state IN ('queued', 'leased')) "
+                           "ORDER BY stage, id LIMIT 1").fetchone()
+        if row is not None:
+            conn.execute("UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                         (worker, now+lease_seconds, now, row[0]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    if row is None:
+        return None
+    return {'id':row[0], 'kind':row[1], 'payload':json.loads(row[2]), 'campaign':row[3]}
+
+def heartbeat(conn, task_id, worker):
+    """Extend a lease, returns False if the task was taken away from this worker"""
+    now = time.time()
+    cur = conn.execute("UPDATE tasks SET lease_until = ?, updated = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                       (now+lease_seconds, now, task_id, worker))
+    return cur.rowcount == 1
+
+def finish(conn, task_id, worker, state, result):
+    conn.execute("UPDATE tasks SET state = ?, result = ?, lease_until = NULL, updated = ? WHERE id = ? AND worker = ?",
+                 (state, json.dumps(result), time.time(), task_id, worker))
+
+def release(conn, task_id, worker):
+    """Give a task back without counting the attempt (the worker is shutting down)"""
+    conn.execute("UPDATE tasks SET state = 'queued', worker = NULL, lease_until = NULL, attempts = attempts - 1, updated = ? "
+                 "WHERE id = ? AND worker = ? AND state = 'leased'", (time.time(), task_id, worker))
+
+def pending(conn):
+    return conn.execute("SELECT COUNT(*) FROM tasks WHERE state IN ('queued', 'leased')").fetchone()[0]
+
+def get_status(conn):
+    return conn.execute("SELECT campaign, kind, state, COUNT(*) FROM tasks GROUP BY campaign, kind, state ORDER BY campaign, MIN(stage), state").fetchall()
+
+class Heartbeat(threading.Thread):
+    """Renews the lease of the running task from its own connection"""
+    def __init__(self, db_path, task_id, worker):
+        threading.Thread.__init__(self, daemon=True)
+        self.db_path = db_path
+        self.task_id = task_id
+        self.worker = worker
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        conn = connect(self.db_path)
+        while not self.stopped.wait(lease_seconds/3.0):
+            try:
+                if not heartbeat(conn, self.task_id, self.worker):
+                    self.lost = True
+            except sqlite3.OperationalError:
+                continue
+        conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def run_inject(payload):
+    import solidifi
+    contract_file = payload['contract']
+    if len(solidifi.compile_check([contract_file])) > 0:
+        return 'failed', {'error':'Contract file contains compilation errors'}
+    solidifi.clear_globals()
+    """Each worker keeps its ASTs apart, workers of one host share the working directory"""
+    with tempfile.TemporaryDirectory(prefix="solidifi_ast_") as ast_dir:
+        buggy_file = solidifi.inject_contract(contract_file, payload['bug_type'], payload['buggy_dir'], ast_dir)
+    if buggy_file is None:
+        return 'failed', {'error':'unable to generate AST'}
+    if payload.get('db') is not None:
+        conn = campaign_db.connect(payload['db'], "DELETE")
+        campaign_db.record_injections(conn, campaign_db.get_campaign(conn, payload['campaign']),
+                                      [{'contract':payload['id'], 'bug_type':payload['bug_type'], 'buggy_file':buggy_file, 'bug_log':solidifi.BugLog}])
+        conn.close()
+    return 'done', {'buggy_file':buggy_file, 'injected_bugs':len(solidifi.BugLog)}
+
+def run_analyze(payload):
+    import evaluator
+    import tool_runner
+    tool = payload['tool']
+    injected_scs = payload['buggy_dir']
+    buggy_sc = os.path.join(injected_scs, "buggy_"+os.path.basename(payload['contract']))
+    if not os.path.isfile(buggy_sc):
+        return 'failed', {'error':'missing buggy contract {0}'.format(buggy_sc)}
+    result_dir = os.path.join(injected_scs, "results")
+    os.makedirs(result_dir, exist_ok=True)
+    result_file = os.path.join(result_dir, os.path.basename(buggy_sc)+(".json" if tool in ("Slither","Oyente") else ".txt"))
+    jobs = evaluator.get_tool_jobs(tool, buggy_sc, injected_scs, result_file)
+    results = tool_runner.run_jobs(jobs)
+    if payload.get('db') is not None:
+        conn = campaign_db.connect(payload['db'], "DELETE")
+        campaign_db.record_tool_runs(conn, campaign_db.get_campaign(conn, payload['campaign']),
+                                     evaluator.get_tool_runs(tool, payload['bug_type'], jobs, results))
+        conn.close()
+    return 'done', {'runs':[{'report':r['report'], 'status':r['status'], 'time':round(r['time'], 3), 'bugs':len(r['bugs'])} for r in results]}
+
+def run_inspect(payload):
+    import inspection
+    inspection.Inspect_results(payload['tools'], payload.get('db'), payload.get('campaign'), payload.get('combined', False))
+    return 'done', {}
+
+def run_command(payload):
+    """A plain command, for custom stages and for testing the queue"""
+    proc = subprocess.run(payload['argv'], cwd=payload.get('cwd'))
+    return ('done' if proc.returncode == 0 else 'failed'), {'returncode':proc.returncode}
+
+runners = {'inject':run_inject, 'analyze':run_analyze, 'inspect':run_inspect, 'command':run_command}
+
+def work(db_path, worker=None, once=False):
+    """Run tasks until the queue is drained (or after one task with once)"""
+    worker = worker or "{0}:{1}".format(socket.gethostname(), os.getpid())
+    """Workers of several hosts share the campaign store too, inspection included"""
+    campaign_db.journal_mode = "DELETE"
+    conn = connect(db_path)
+    done = 0
+    while True:
+        task = acquire(conn, worker)
+        if task is None:
+            if once or pending(conn) == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        beat = Heartbeat(db_path, task['id'], worker)
+        beat.start()
+        try:
+            state, result = runners[task['kind']](task['payload'])
+        except KeyboardInterrupt:
+            beat.stop()
+            release(conn, task['id'], worker)
+            raise
+        except Exception as err:
+            state, result = 'failed', {'error':repr(err)}
+        beat.stop()
+        if beat.lost:
+            print("{0}: lease of task {1} was lost, its result is dropped".format(worker, task['id']))
+        else:
+            finish(conn, task['id'], worker, state, result)
+        print("{0}: task {1} ({2}) {3}".format(worker, task['id'], task['kind'], state))
+        done += 1
+        if once:
+            break
+    conn.close()
+    return done
+
+def submit_campaign(conn, campaign, tools, contracts, db=None):
+    """Queue the injection, analysis and inspection tasks of an evaluator run"""
+    import evaluator
+    conn.execute("BEGIN")
+    for tool in tools:
+        tool_buggy_sc = os.path.join("tool_results",tool,"analyzed_buggy_contracts")
+        shutil.rmtree(tool_buggy_sc, ignore_errors=True)
+        tool_bugs = [bugs['bugs'] for bugs in evaluator.bug_types if bugs['tool'] == tool]
+        for bug_type in tool_bugs[0]:
+            for cs in contracts:
+                payload = {'contract':"contracts/"+str(cs)+".sol", 'id':cs, 'tool':tool, 'bug_type':bug_type,
+                           'buggy_dir':os.path.join(tool_buggy_sc,bug_type), 'db':db, 'campaign':campaign}
+                submit(conn, campaign, 'inject', payload)
+                submit(conn, campaign, 'analyze', payload)
+    submit(conn, campaign, 'inspect', {'tools':tools, 'db':db, 'campaign':campaign})
+    conn.execute("COMMIT")
+
+def parse_range(spec):
+    contracts = []
+    for part in spec.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            contracts.extend(range(int(first), int(last)+1))
+        else:
+            contracts.append(int(part))
+    return contracts
+
+def printUsage(prog):
+    print("%s <queue.db> submit <tool1,tool2,...> [--contracts 1-50] [--campaign <name>] [--db <campaign.db>]" % prog)
+    print("%s <queue.db> worker [--name <worker>] [--lease <seconds>] [--once]" % prog)
+    print("%s <queue.db> status" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    db_path, command = sys.argv[1], sys.argv[2]
+    try:
+        opts, args = getopt.getopt(sys.argv[3:], "", ["contracts=", "campaign=", "db=", "name=", "lease=", "once"])
+    except getopt.GetoptError:
+        printUsage(sys.argv[0])
+        sys.exit(2)
+    opts = dict(opts)
+    if '--lease' in opts:
+        lease_seconds = int(opts['--lease'])
+
+    conn = connect(db_path)
+    if command == 'submit' and len(args) == 1:
+        campaign = opts.get('--campaign', time.strftime("campaign-%Y%m%d-%H%M%S"))
+        submit_campaign(conn, campaign, args[0].split(','), parse_range(opts.get('--contracts', '1-50')), opts.get('--db'))
+        print("submitted campaign {0}".format(campaign))
+    elif command == 'worker':
+        conn.close()
+        try:
+            work(db_path, opts.get('--name'), '--once' in opts)
+        except KeyboardInterrupt:
+            pass
+    elif command == 'status':
+        for campaign, kind, state, count in get_status(conn):
+            print("{0:30} {1:8} {2:8} {3}".format(campaign, kind, state, count))
+    else:
+        printUsage(sys.argv[0])
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+
+import os, sys
+import getopt
+import campaign_db
+import inspection
+
+"""Corpus minimization: the smallest set of contracts that keeps the FN results of a stored campaign
+
+The false negatives of every tool on every contract are recomputed from the bug logs and findings of a
+campaign store (see campaign_db.py). Contracts are then added greedily, each time the one that brings the
+FN rates of the subset closest to those of the whole campaign, until every tool and bug type has injected
+bugs in the subset, its FN rate is within tolerance of the full one and the tools keep their FN ranking
+on each bug type. Contracts the final subset does not need are dropped again. Pass the subset to
+evaluator.py with --contracts for a smoke campaign.
+"""
+
+tolerance = 0.05
+
+def get_campaign_id(conn, name=None):
+    """Id of the named campaign, or of the latest one"""
+    if name is not None:
+        row = conn.execute("SELECT id FROM campaigns WHERE name = ?", (name,)).fetchone()
+    else:
+        row = conn.execute("SELECT id FROM campaigns ORDER BY started DESC LIMIT 1").fetchone()
+    if row is None:
+        raise ValueError("No such campaign: {0}".format(name))
+    return row[0]
+
+def get_contract_id(contract):
+    return int(contract) if contract.isdigit() else contract
+
+def load_results(conn, campaign_id):
+    """Injected bugs and false negatives of each tool and bug type per contract, and the analyzer seconds of each contract"""
+    bug_logs = {}
+    for contract_id, loc, length, bug_type, approach in conn.execute(
+            "SELECT b.contract_id, b.loc, b.length, b.bug_type, b.approach FROM injected_bugs b "
+            "JOIN contracts c ON c.id = b.contract_id WHERE c.campaign = ? ORDER BY b.id", (campaign_id,)):
+        bug_logs.setdefault(contract_id, [['loc', 'length', 'bug type', 'approach']]).append([loc, length, bug_type, approach])
+
+    runs = {}
+    costs = {}
+    contracts = {}
+    for contract_id, contract, tool, run_time in conn.execute(
+            "SELECT c.id, c.contract, r.tool, r.time FROM tool_runs r JOIN contracts c ON c.id = r.contract_id WHERE c.campaign = ?", (campaign_id,)):
+        runs.setdefault((contract_id, tool), [])
+        contracts[contract_id] = get_contract_id(contract)
+        costs[contracts[contract_id]] = costs.get(contracts[contract_id], 0.0)+(run_time or 0.0)
+    for contract_id, tool, line, code in conn.execute(
+            "SELECT r.contract_id, r.tool, f.line, f.code FROM findings f JOIN tool_runs r ON r.id = f.run_id "
+            "JOIN contracts c ON c.id = r.contract_id WHERE c.campaign = ?", (campaign_id,)):
+        runs[(contract_id, tool)].append({'tool':tool, 'lines':line, 'bugType':code, 'contract':contract_id})
+
+    results = {}
+    for (contract_id, tool), reported_bugs in runs.items():
+        if contract_id not in bug_logs or tool not in inspection.bug_codes:
+            continue
+        contract = contracts[contract_id]
+        tool_bugs = [bugs['bugs'] for bugs in inspection.bug_types if bugs['tool'] == tool][0]
+        for bug_type in set(ibug[2] for ibug in bug_logs[contract_id][1:]) & set(tool_bugs):
+            bug_log_list = [bug_logs[contract_id][0]] + [ibug for ibug in bug_logs[contract_id][1:] if ibug[2] == bug_type]
+            score = inspection.score_contract(tool, bug_type, contract_id, reported_bugs, bug_log_list)
+            counts = results.setdefault((tool, bug_type), {}).setdefault(contract, [0, 0])
+            counts[0] += score['ibugs']
+            counts[1] += len(score['false_negatives'])
+    return results, costs
+
+def get_rates(results, subset):
+    """FN rate of each tool and bug type over the contracts of subset, None where they hold no injected bug"""
+    rates = {}
+    for pair, counts in results.items():
+        ibugs = sum(counts[cs][0] for cs in subset if cs in counts)
+        fns = sum(counts[cs][1] for cs in subset if cs in counts)
+        rates[pair] = float(fns)/ibugs if ibugs > 0 else None
+    return rates
+
+def get_error(full_rates, rates):
+    """How far the FN rates of a subset are from the full ones: the uncovered pairs, the deviations beyond
+    tolerance and the pairs of tools ranked differently on a bug type, 0 when the subset preserves the results"""
+    error = 0.0
+    for pair, full_rate in full_rates.items():
+        if full_rate is None:
+            continue
+        if rates[pair] is None:
+            error += 1
+        else:
+            error += max(0.0, abs(rates[pair]-full_rate)-tolerance)
+    for (tool1, bug_type), rate1 in full_rates.items():
+        for (tool2, bug_type2), rate2 in full_rates.items():
+            if bug_type2 != bug_type or rate1 is None or rate2 is None or not rate1+tolerance < rate2:
+                continue
+            if rates[(tool1, bug_type)] is not None and rates[(tool2, bug_type)] is not None and not rates[(tool1, bug_type)] < rates[(tool2, bug_type)]:
+                error += 1
+    return error
+
+def minimize(results, costs):
+    """Greedy subset of the contracts preserving the FN results, cheaper contracts first on ties"""
+    contracts = sorted(set(cs for counts in results.values() for cs in counts), key=str)
+    full_rates = get_rates(results, contracts)
+    subset = []
+    error = get_error(full_rates, get_rates(results, subset))
+    while error > 0 and len(subset) < len(contracts):
+        best = min((cs for cs in contracts if cs not in subset),
+                   key=lambda cs: (get_error(full_rates, get_rates(results, subset+[cs])), costs.get(cs, 0.0), str(cs)))
+        subset.append(best)
+        error = get_error(full_rates, get_rates(results, subset))
+
+    """A contract picked early may be redundant once later ones are in"""
+    for cs in list(subset):
+        rest = [c for c in subset if c != cs]
+        if get_error(full_rates, get_rates(results, rest)) == 0:
+            subset = rest
+    return sorted(subset, key=str)
+
+def print_report(results, costs, subset):
+    contracts = sorted(set(cs for counts in results.values() for cs in counts), key=str)
+    full_rates = get_rates(results, contracts)
+    rates = get_rates(results, subset)
+    total = sum(costs.get(cs, 0.0) for cs in contracts)
+    cost = sum(costs.get(cs, 0.0) for cs in subset)
+    print("{0} of {1} contracts: {2}".format(len(subset), len(contracts), ",".join(str(cs) for cs in subset)))
+    print("Analyzer time: {0:.1f}h of {1:.1f}h ({2:.0f}%)".format(cost/3600, total/3600, 100.0*cost/total if total > 0 else 0.0))
+    for tool, bug_type in sorted(results):
+        if full_rates[(tool, bug_type)] is None:
+            continue
+        print("{0} {1}: FN rate {2:.3f} on all contracts, {3:.3f} on the subset".format(tool, bug_type, full_rates[(tool, bug_type)], rates[(tool, bug_type)]))
+
+def printUsage(prog):
+    print("%s [--campaign <name>] [--tolerance <t>] [--output <file>] <campaign.db>" % prog)
+    print("--campaign <name>: campaign to minimize, the latest one by default")
+    print("--tolerance <t>: largest difference allowed between the FN rates of the subset and of all contracts ({0} by default)".format(tolerance))
+    print("--output <file>: write the subset to file, to be passed to evaluator.py --contracts")
+
+if __name__ == "__main__":
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hc:t:o:", ["help", "campaign=", "tolerance=", "output="])
+    except getopt.GetoptError:
+        printUsage(sys.argv[0])
+        sys.exit(2)
+    campaign = None
+    output = None
+    for opt, val in opts:
+        if opt in ('-h', '--help'):
+            printUsage(sys.argv[0])
+            sys.exit()
+        elif opt in ('-c', '--campaign'):
+            campaign = val
+        elif opt in ('-t', '--tolerance'):
+            tolerance = float(val)
+        elif opt in ('-o', '--output'):
+            output = val
+    if len(args) != 1 or not os.path.isfile(args[0]):
+        printUsage(sys.argv[0])
+        sys.exit(2)
+
+    conn = campaign_db.connect(args[0])
+    results, costs = load_results(conn, get_campaign_id(conn, campaign))
+    conn.close()
+    subset = minimize(results, costs)
+    print_report(results, costs, subset)
+    if output is not None:
+        with open(output, 'w') as fh:
+            fh.write(",".join(str(cs) for cs in subset)+"\n")
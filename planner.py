@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+
+import os, sys
+import random
+import configparser
+
+"""Injection planning under an analyzer budget: which bug injection locations to fill and what the analysis will cost"""
+
+conf_file = "planner.conf"
+max_bugs = None
+seed = None
+cost_model = None
+
+def load_conf():
+    """Read budget and cost model defaults from planner.conf; options set by the caller take precedence"""
+    global max_bugs, seed, cost_model
+    if cost_model is not None:
+        return
+    configs = configparser.RawConfigParser(allow_no_value=True)
+    configs.read(conf_file)
+    if max_bugs is None and configs.has_option('budget', 'max_bugs_per_contract'):
+        max_bugs = configs.getint('budget', 'max_bugs_per_contract')
+    if seed is None:
+        seed = configs.getint('budget', 'seed') if configs.has_option('budget', 'seed') else 0
+    cost_model = {}
+    for section in configs.sections():
+        if section == 'budget':
+            continue
+        cost_model[section] = dict((k, float(v)) for k, v in configs.items(section))
+
+def get_budget():
+    """Maximum number of bugs injected per contract, None when every location is filled"""
+    load_conf()
+    if max_bugs is None or max_bugs <= 0:
+        return None
+    return max_bugs
+
+def get_src_range(src):
+    parts = src.split(":")
+    return int(parts[0]), int(parts[0])+int(parts[1])
+
+def enclosing_function(loc, functions):
+    """src of the innermost function or modifier containing loc, None at contract level"""
+    soffset, eoffset = get_src_range(loc['src'])
+    enclosing = None
+    for func in functions:
+        fs, fe = get_src_range(func['src'])
+        if fs <= soffset and eoffset <= fe and (fs, fe) != (soffset, eoffset):
+            if enclosing is None or fe-fs < enclosing[1]-enclosing[0]:
+                enclosing = (fs, fe)
+    return enclosing
+
+def plan_injection(BIP, functions, plan_seed):
+    """Order bug injection locations so that the first ones spread over node kinds and functions
+
+    Locations are grouped into strata by (node kind, enclosing function) and taken round-robin,
+    each stratum in a random order drawn from plan_seed. The injector fills locations in the
+    returned order, skipping those it cannot use, and stops at its budget, so the same seed
+    always yields the same buggy contract.
+    """
+    rng = random.Random(plan_seed)
+    strata = {}
+    for loc in BIP:
+        strata.setdefault((loc['name'], enclosing_function(loc, functions)), []).append(loc)
+    keys = sorted(strata, key=lambda k: (k[0], k[1] or (-1, -1)))
+    rng.shuffle(keys)
+    for k in keys:
+        rng.shuffle(strata[k])
+
+    plan = []
+    depth = 0
+    while len(plan) < len(BIP):
+        for k in keys:
+            if depth < len(strata[k]):
+                plan.append(strata[k][depth])
+        depth += 1
+    return plan
+
+def form_quota(remaining, forms_left):
+    """Share of the remaining budget given to one bug form (statement or function snippets)"""
+    return -(-remaining // forms_left)
+
+def count_lines(contract_file):
+    with open(contract_file, 'rb') as fh:
+        return fh.read().count(b'\n')+1
+
+def estimate_cost(contract_file, bugs, tool=None):
+    """Rough analyzer seconds for a buggy contract: base + per_line*lines + per_bug*bugs, capped at the timeout"""
+    load_conf()
+    model = dict(cost_model.get('cost', {}))
+    model.update(cost_model.get(tool, {}))
+    seconds = model.get('base', 0.0) + model.get('per_line', 0.0)*count_lines(contract_file) + model.get('per_bug', 0.0)*bugs
+    if model.get('timeout', 0) > 0:
+        seconds = min(seconds, model['timeout'])
+    return seconds
+
+def printUsage(prog):
+    print("%s <tool> <buggy-contract.sol> <injected bugs> [<buggy-contract.sol> <injected bugs> ...]" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or len(sys.argv) % 2 != 0 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    total = 0.0
+    for contract_file, bugs in zip(sys.argv[2::2], sys.argv[3::2]):
+        seconds = estimate_cost(contract_file, int(bugs), sys.argv[1])
+        total += seconds
+        print("{0}: {1:.0f}s".format(contract_file, seconds))
+    print("total: {0:.0f}s".format(total))
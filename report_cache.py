@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+
+import os, sys
+import hashlib
+import shutil
+import subprocess
+import tracing
+
+"""Content-addressed cache of analyzer reports, keyed by buggy contract source, tool, tool version and options"""
+
+enabled = True
+cache_dir = ".report_cache"
+max_bytes = 2*1024**3
+stats = {'hits':0, 'misses':0, 'stored':0, 'evicted':0}
+total_bytes = None
+
+"""How to identify the installed version of each analyzer; a file is hashed, a command's output is used as is"""
+version_commands = {
+    'Oyente':["docker", "image", "inspect", "-f", "{{.Id}}", "luongnguyen/oyente"],
+    'Securify':"/securify/build/libs/securify.jar",
+    'Mythril':["myth", "version"],
+    'Smartcheck':["smartcheck", "--version"],
+    'Manticore':["manticore", "--version"],
+    'Slither':["slither", "--version"]}
+tool_versions = {}
+
+def get_tool_version(tool):
+    """Version string of an analyzer, None when it cannot be determined (the tool's reports are then not cached)"""
+    if tool not in tool_versions:
+        version = None
+        cmd = version_commands.get(tool)
+        if isinstance(cmd, str):
+            if os.path.isfile(cmd):
+                with open(cmd, 'rb') as fh:
+                    version = hashlib.sha256(fh.read()).hexdigest()
+        elif cmd is not None:
+            try:
+                version = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode(errors="ignore").strip() or None
+            except (OSError, subprocess.CalledProcessError):
+                version = None
+        tool_versions[tool] = version
+    return tool_versions[tool]
+
+def normalize_argv(argv, contract_file, workspace=None):
+    """The analyzer options of a job, with the location of the contract (and of the analyzer's workspace) replaced so copies in other folders share a key"""
+    contract_dir = os.path.dirname(contract_file)
+    names = [(os.path.abspath(contract_file), "<file>"), (contract_file, "<file>"),
+             (os.path.abspath(contract_dir), "<dir>")]
+    if workspace:
+        names.insert(0, (workspace, "<workspace>"))
+    if contract_dir:
+        names.append((contract_dir, "<dir>"))
+    options = []
+    for arg in argv:
+        for name, placeholder in names:
+            arg = arg.replace(name, placeholder)
+        options.append(arg)
+    return options
+
+def get_key(job):
+    """Cache key of a single-contract job, None when the job cannot be cached"""
+    if job.get('file') is None or job.get('batch') is not None:
+        return None
+    version = get_tool_version(job['tool'])
+    if version is None:
+        return None
+    h = hashlib.sha256()
+    with open(job['file'], 'rb') as fh:
+        h.update(fh.read())
+    for part in [job['tool'], version] + normalize_argv(job['argv'], job['file'], job.get('workspace')):
+        h.update(b'\0' + part.encode())
+    return h.hexdigest()
+
+def entry_path(key):
+    return os.path.join(cache_dir, key[0:2], key+".gz")
+
+def get_total_bytes():
+    global total_bytes
+    if total_bytes is None:
+        total_bytes = sum(os.path.getsize(path) for path, mtime in list_entries())
+    return total_bytes
+
+def list_entries():
+    entries = []
+    if os.path.isdir(cache_dir):
+        for root, dirs, files in os.walk(cache_dir):
+            for f in files:
+                path = os.path.join(root, f)
+                entries.append((path, os.path.getmtime(path)))
+    return entries
+
+def get(key, report_gz):
+    """Copy a cached report to report_gz, returns False on a miss"""
+    path = entry_path(key)
+    if not os.path.isfile(path):
+        stats['misses'] += 1
+        tracing.count("report_cache_misses")
+        return False
+    shutil.copyfile(path, report_gz)
+    """The modification time orders entries for LRU eviction"""
+    os.utime(path)
+    stats['hits'] += 1
+    tracing.count("report_cache_hits")
+    return True
+
+def put(key, report_gz):
+    """Store the compressed report of a finished run and evict the least recently used entries above max_bytes"""
+    global total_bytes
+    path = entry_path(key)
+    get_total_bytes()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.isfile(path):
+        total_bytes -= os.path.getsize(path)
+    tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+    shutil.copyfile(report_gz, tmp_path)
+    os.replace(tmp_path, path)
+    total_bytes += os.path.getsize(path)
+    stats['stored'] += 1
+    if total_bytes > max_bytes:
+        evict()
+
+def evict():
+    global total_bytes
+    for path, mtime in sorted(list_entries(), key=lambda entry: entry[1]):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        stats['evicted'] += 1
+
+def clear():
+    global total_bytes
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    total_bytes = 0
+
+def print_stats():
+    lookups = stats['hits'] + stats['misses']
+    print("Report cache: {0} hits, {1} misses ({2:.0%} hit rate), {3} stored, {4} evicted, {5:.1f} MB in {6}".format(
+        stats['hits'], stats['misses'], stats['hits']/lookups if lookups else 0, stats['stored'], stats['evicted'],
+        get_total_bytes()/1024.0**2, cache_dir))
+
+def printUsage(prog):
+    print("%s [stats | clear] [<cache dir>]" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'clear'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    if len(sys.argv) > 2:
+        cache_dir = sys.argv[2]
+    if sys.argv[1] == 'clear':
+        clear()
+    else:
+        print("{0} reports, {1:.1f} MB in {2}".format(len(list_entries()), get_total_bytes()/1024.0**2, cache_dir))
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+
+import os, sys
+import json
+import time
+import shutil
+import signal
+import resource
+
+"""Resource usage of jobs: wall time, user and sys CPU time, peak RSS and bytes read from and written to storage
+
+Analyzer commands are started through this script (see wrap). It waits for the command with wait4, reads its
+/proc/<pid>/io before reaping it and writes its usage to a JSON file next to the job's output, named
+<output>.usage.json. Both include the processes the command started and waited for. Jobs run inside SolidiFI,
+such as injections, are measured with getrusage and /proc/self (see measure).
+"""
+
+enabled = True
+suffix = ".usage.json"
+fields = ('wall', 'user', 'sys', 'max_rss', 'read_bytes', 'write_bytes')
+
+def usage_file(output):
+    return output+suffix
+
+def read_io(pid="self"):
+    """Bytes a process read from and wrote to storage, 0 where /proc/<pid>/io cannot be read"""
+    io = {'read_bytes':0, 'write_bytes':0}
+    try:
+        with open("/proc/{0}/io".format(pid)) as fh:
+            for line in fh:
+                key, value = line.split(":")
+                if key in io:
+                    io[key] = int(value)
+    except (OSError, ValueError):
+        pass
+    return io
+
+def get_peak_rss():
+    """Peak RSS of this process in bytes, since the last reset_peak_rss where the kernel supports it"""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])*1024
+    except (OSError, ValueError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", 'w') as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+class measure:
+    """Usage of the code run in a with block by this process and the child processes it waited for
+
+    The dict returned by the with statement is filled in when the block ends.
+    """
+    def __enter__(self):
+        self.usage = {}
+        reset_peak_rss()
+        self.start = time.time()
+        self.self_ru = resource.getrusage(resource.RUSAGE_SELF)
+        self.children_ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.io = read_io()
+        return self.usage
+
+    def __exit__(self, exc_type, exc, tb):
+        self_ru = resource.getrusage(resource.RUSAGE_SELF)
+        children_ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+        io = read_io()
+        max_rss = get_peak_rss()
+        if children_ru.ru_maxrss > self.children_ru.ru_maxrss:
+            max_rss = max(max_rss, children_ru.ru_maxrss*1024)
+        self.usage.update({'wall':time.time()-self.start,
+                           'user':self_ru.ru_utime-self.self_ru.ru_utime+children_ru.ru_utime-self.children_ru.ru_utime,
+                           'sys':self_ru.ru_stime-self.self_ru.ru_stime+children_ru.ru_stime-self.children_ru.ru_stime,
+                           'max_rss':max_rss, 'read_bytes':io['read_bytes']-self.io['read_bytes'],
+                           'write_bytes':io['write_bytes']-self.io['write_bytes']})
+        return False
+
+def wrap(argv, usage_path):
+    """Command line running argv through this script, which writes its usage to usage_path"""
+    return [sys.executable, os.path.abspath(__file__), os.path.abspath(usage_path), "--"] + list(argv)
+
+def save(usage, usage_path):
+    with open(usage_path, 'w') as fh:
+        json.dump(usage, fh)
+
+def load(usage_path):
+    """Usage written by a wrapped command, None when it was killed before writing it"""
+    try:
+        with open(usage_path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+def share(usage, n):
+    """Part of the usage of a job done for n contracts: times and I/O are divided, the peak RSS is the job's"""
+    if usage is None or n <= 1:
+        return usage
+    part = dict(usage)
+    for key in ('wall', 'user', 'sys', 'read_bytes', 'write_bytes'):
+        if key in part:
+            part[key] = part[key]/float(n)
+    return part
+
+def add(total, usage):
+    """Add usage to a running total, keeping the largest peak RSS"""
+    for key in fields:
+        if key == 'max_rss':
+            total[key] = max(total.get(key, 0), usage.get(key, 0))
+        else:
+            total[key] = total.get(key, 0)+usage.get(key, 0)
+    return total
+
+def format_usage(usage):
+    return "{0:.1f}s wall, {1:.1f}s user, {2:.1f}s sys, {3:.0f}MB peak RSS, {4:.1f}MB read, {5:.1f}MB written".format(
+        usage['wall'], usage['user'], usage['sys'], usage['max_rss']/1024.0**2, usage['read_bytes']/1024.0**2, usage['write_bytes']/1024.0**2)
+
+def run(argv, usage_path):
+    """Run a command, write its usage and exit as it did
+
+    A SIGTERM sent to the process group (see tool_runner.terminate) stops the command but not this script,
+    so the usage of timed out runs is recorded too.
+    """
+    start = time.time()
+    if shutil.which(argv[0]) is None:
+        save({'error':"No such file or directory: '{0}'".format(argv[0])}, usage_path)
+        return 127
+    signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.execvp(argv[0], argv)
+        finally:
+            os._exit(127)
+    """Read the I/O counters of the exited command before reaping it, they include its reaped children"""
+    os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+    io = read_io(pid)
+    pid, status, ru = os.wait4(pid, 0)
+    save({'wall':time.time()-start, 'user':ru.ru_utime, 'sys':ru.ru_stime, 'max_rss':ru.ru_maxrss*1024,
+          'read_bytes':io['read_bytes'], 'write_bytes':io['write_bytes']}, usage_path)
+    if os.WIFSIGNALED(status):
+        signal.signal(os.WTERMSIG(status), signal.SIG_DFL)
+        os.kill(os.getpid(), os.WTERMSIG(status))
+    return os.WEXITSTATUS(status)
+
+def printUsage(prog):
+    print("%s <usage.json> -- <command> [<args> ...]" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[2] != "--":
+        printUsage(sys.argv[0])
+        sys.exit(2)
+    sys.exit(run(sys.argv[3:], sys.argv[1]))
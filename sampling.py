@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+
+import math
+
+"""Sequential sampling of a campaign: Wilson intervals on the FN and FP rates of each tool and bug type
+
+The FN rate of a pair is the share of its injected bugs the tool missed. Its FP rate is the share of the
+analyzed contracts on which the tool reported at least one false positive of the bug type, counted as
+inspection counts them (reports at a line flagged by the bug type's threshold of reports are excluded).
+A pair is settled once both intervals are narrower than width, after at least min_contracts contracts.
+"""
+
+width = 0.2
+min_contracts = 5
+"""Contracts given to every unsettled pair per round"""
+step = 5
+"""Normal quantile of the confidence level, 95%"""
+z = 1.96
+
+def wilson_interval(k, n):
+    """Wilson score interval of a proportion of k successes out of n trials"""
+    if n == 0:
+        return 0.0, 1.0
+    p = float(k)/n
+    denom = 1+z*z/n
+    centre = (p+z*z/(2*n))/denom
+    half = z*math.sqrt(p*(1-p)/n+z*z/(4*n*n))/denom
+    return max(0.0, centre-half), min(1.0, centre+half)
+
+def new_stats():
+    return {'contracts':0, 'ibugs':0, 'fns':0, 'fp_contracts':0, 'settled_at':None, 'saved':0.0}
+
+def add_score(stats, score):
+    """Count the injected bugs and false negatives of one contract, as returned by inspection.score_contract"""
+    stats['contracts'] += 1
+    stats['ibugs'] += score['ibugs']
+    stats['fns'] += len(score['false_negatives'])
+
+def add_fps(stats, false_positives):
+    if false_positives > 0:
+        stats['fp_contracts'] += 1
+
+def get_intervals(stats):
+    return wilson_interval(stats['fns'], stats['ibugs']), wilson_interval(stats['fp_contracts'], stats['contracts'])
+
+def is_settled(stats):
+    if stats['contracts'] < min_contracts:
+        return False
+    fn, fp = get_intervals(stats)
+    return fn[1]-fn[0] <= width and fp[1]-fp[0] <= width
+
+def format_rate(k, n, interval):
+    if n == 0:
+        return "-"
+    return "{0:.2f} [{1:.2f}, {2:.2f}]".format(float(k)/n, interval[0], interval[1])
+
+def print_report(stats, total_contracts):
+    """Rates and intervals of every pair, when it settled and the analyzer time its skipped contracts would have taken"""
+    print("\n************************** Sequential sampling (interval width {0}) *******************\n".format(width))
+    print("{0:<12}{1:<22}{2:>10}  {3:<20}{4:<20}{5:>10}".format("Tool", "BugType", "Contracts", "FN rate", "FP rate", "Saved (h)"))
+    saved = 0.0
+    for (tool, bug_type), s in sorted(stats.items()):
+        fn, fp = get_intervals(s)
+        print("{0:<12}{1:<22}{2:>10}  {3:<20}{4:<20}{5:>10.2f}".format(tool, bug_type, "{0}/{1}".format(s['contracts'], total_contracts),
+              format_rate(s['fns'], s['ibugs'], fn), format_rate(s['fp_contracts'], s['contracts'], fp), s['saved']/3600))
+        saved += s['saved']
+    print("Analyzer time saved: {0:.2f}h (predicted from the run history)".format(saved/3600))
@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+
+import os, sys, re
+import json
+import time
+import heapq
+import planner
+
+"""Analyzer run history: longest-job-first ordering and adaptive timeouts learned from past runs"""
+
+history_file = ".run_history.jsonl"
+fixed_timeout = 900
+percentile = 95
+margin = 1.5
+min_timeout = 60
+min_samples = 10
+neighbours = 10
+"""Analyzers with a timeout option of their own, which is lowered together with the runner timeout"""
+timeout_options = {'Mythril':'--execution-timeout', 'Manticore':'--core.timeout'}
+timeout_grace = 60
+
+def get_features(contract_file, ast_file=None):
+    """Size and function count of a contract, the function count coming from its AST when there is one"""
+    with open(contract_file, 'rb') as fh:
+        data = fh.read()
+    features = {'lines':data.count(b'\n')+1}
+    if ast_file is not None and os.path.isfile(ast_file):
+        with open(ast_file) as fh:
+            features['functions'] = len(re.findall(r'"name"\s*:\s*"FunctionDefinition"', fh.read()))
+    else:
+        features['functions'] = len(re.findall(rb'\bfunction\b', data))
+    return features
+
+def load_history(path=None):
+    history = []
+    path = path or history_file
+    if os.path.isfile(path):
+        with open(path) as fh:
+            for line in fh:
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    continue
+    return history
+
+def record_runs(jobs, results, path=None):
+    """Append the runtime and outcome of finished single-contract jobs to the history"""
+    with open(path or history_file, 'a') as fh:
+        for job, result in zip(jobs, results):
+            if job.get('features') is None or result['status'] == 'error' or result.get('cached'):
+                continue
+            fh.write(json.dumps({'tool':job['tool'], 'contract':job.get('file'), 'lines':job['features']['lines'],
+                                 'functions':job['features']['functions'], 'time':round(result['time'], 3),
+                                 'status':result['status'], 'timeout':job.get('timeout'), 'at':time.time()})+"\n")
+
+def similar_runs(history, tool, features):
+    """The past runs of tool on the contracts closest in size and function count"""
+    runs = [run for run in history if run['tool'] == tool]
+    def distance(run):
+        return (abs(run['lines']-features['lines'])/max(features['lines'], 1) +
+                abs(run['functions']-features['functions'])/max(features['functions'], 1))
+    return sorted(runs, key=distance)[0:neighbours]
+
+def get_percentile(values, p):
+    values = sorted(values)
+    k = (len(values)-1)*p/100.0
+    lower = int(k)
+    upper = min(lower+1, len(values)-1)
+    return values[lower] + (values[upper]-values[lower])*(k-lower)
+
+def predict_time(history, tool, features, contract_file=None):
+    """Median runtime of similar past runs, or the planner's size-based estimate without history"""
+    runs = similar_runs(history, tool, features)
+    if len(runs) == 0:
+        if contract_file is None:
+            return 0.0
+        return planner.estimate_cost(contract_file, 0, tool)
+    return get_percentile([run['time'] for run in runs], 50)
+
+def adaptive_timeout(history, tool, features):
+    """A timeout above the historical runtime percentile of similar jobs, None while there is too little history
+
+    Jobs that timed out before count with their time, so tools that often hit the limit keep the fixed timeout.
+    """
+    runs = similar_runs(history, tool, features)
+    if len(runs) < min_samples:
+        return None
+    seconds = get_percentile([run['time'] for run in runs], percentile)*margin
+    return int(min(max(seconds, min_timeout), fixed_timeout))
+
+def set_timeout(job, seconds):
+    """Lower a job's timeout, including the analyzer's own timeout option when it has one"""
+    option = timeout_options.get(job['tool'])
+    if option is not None and option in job['argv']:
+        i = job['argv'].index(option)
+        job['argv'] = job['argv'][0:i+1] + [str(seconds)] + job['argv'][i+2:]
+        job['timeout'] = seconds + timeout_grace
+    else:
+        job['timeout'] = seconds
+
+def schedule(jobs, history, adaptive=False):
+    """Order jobs longest predicted runtime first, optionally with adaptive timeouts
+
+    Jobs (and batch entries) name their contract in 'file' and optionally its AST in 'ast'.
+    Returns the reordered jobs; each gets 'predicted' and, for single-contract jobs, 'features'.
+    """
+    for job in jobs:
+        contracts = job['batch'] if job.get('batch') is not None else [job]
+        job['predicted'] = 0.0
+        for c in contracts:
+            features = get_features(c['file'], c.get('ast'))
+            job['predicted'] += predict_time(history, job['tool'], features, c['file'])
+            if job.get('batch') is None:
+                job['features'] = features
+        if adaptive and job.get('features') is not None and job['tool'] in ('Securify', 'Mythril', 'Manticore'):
+            seconds = adaptive_timeout(history, job['tool'], job['features'])
+            if seconds is not None:
+                set_timeout(job, seconds)
+                job['adaptive_timeout'] = seconds
+    return sorted(jobs, key=lambda job: -job['predicted'])
+
+def simulate_makespan(durations, workers):
+    """Wall time of running durations in the given order on a pool of workers"""
+    finish = [0.0]*max(workers, 1)
+    for d in durations:
+        start = heapq.heappop(finish)
+        heapq.heappush(finish, start+d)
+    return max(finish)
+
+def get_report(jobs, results, workers):
+    """Wall time of the run versus contract order and versus the fixed timeout policy"""
+    times = [result['time'] for result in results]
+    """Jobs were created in contract order, recorded as 'seq' before scheduling"""
+    in_order = [t for seq, t in sorted(zip([job.get('seq', i) for i, job in enumerate(jobs)], times))]
+    cut = [job for job, result in zip(jobs, results) if job.get('adaptive_timeout') is not None and result['status'] == 'timeout']
+    return {'makespan':simulate_makespan(times, workers), 'makespan_in_order':simulate_makespan(in_order, workers),
+            'adaptive_timeouts_hit':len(cut),
+            'timeout_seconds_saved':sum(fixed_timeout-job['adaptive_timeout'] for job in cut)}
+
+def print_report(report):
+    print("Makespan {0:.0f}s (contract order: {1:.0f}s), adaptive timeouts hit: {2}, saved up to {3:.0f}s versus the {4}s timeout".format(
+        report['makespan'], report['makespan_in_order'], report['adaptive_timeouts_hit'], report['timeout_seconds_saved'], fixed_timeout))
+
+def printUsage(prog):
+    print("%s <tool> [<history.jsonl>]" % prog)
+
+if __name__ == "__main__":
+    """Summarize the recorded runtimes of a tool"""
+    if len(sys.argv) < 2 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    runs = [run for run in load_history(sys.argv[2] if len(sys.argv) > 2 else None) if run['tool'] == sys.argv[1]]
+    if len(runs) == 0:
+        print("no runs of {0} recorded".format(sys.argv[1]))
+        sys.exit()
+    times = [run['time'] for run in runs]
+    print("{0} runs, {1} timeouts".format(len(runs), len([run for run in runs if run['status'] == 'timeout'])))
+    for p in (50, 90, 95, 99):
+        print("p{0}: {1:.1f}s".format(p, get_percentile(times, p)))
@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+
+import os, sys
+import json
+import time
+import getopt
+import hashlib
+import asyncio
+import tempfile
+import collections
+import concurrent.futures
+import solidifi
+
+"""Local injection service: keeps snippets, configs and ASTs warm between requests
+
+Each worker process keeps the ASTs of the contracts it injected. Requests are routed to a worker by
+the hash of the contract source, so the same contract always reaches the worker holding its AST and
+only the source travels between processes.
+"""
+
+max_cached_asts = 256
+#per worker process: source hash -> AST
+ast_cache = collections.OrderedDict()
+executors = []
+#number of ASTs cached by each worker, as last reported by it
+cached_asts = []
+
+def warm_worker(ast_parser="solc"):
+    """Load bug type configs and the snippet catalog once per worker process"""
+    solidifi.ast_parser = ast_parser
+    for bug_info in solidifi.get_bug_types():
+        for form in ("ts", "tf"):
+            bug_dir = os.path.join(solidifi.bugs_dir, bug_info['bug_type_dir'], form)
+            if os.path.isdir(bug_dir):
+                solidifi.get_bug_snippets(bug_dir)
+
+def inject_job(name, source, bug_type, key):
+    """Runs in a pool worker: inject bugs into one contract, reusing the AST it cached for key, and return the results in memory"""
+    start = time.time()
+    solidifi.clear_globals()
+    ast_data = ast_cache.get(key)
+    with tempfile.TemporaryDirectory(prefix="solidifi_") as work_dir:
+        contract_file = os.path.join(work_dir, name)
+        with open(contract_file, 'w') as fh:
+            fh.write(source)
+        cached = ast_data is not None
+        if not cached:
+            if len(solidifi.compile_check([contract_file])) > 0:
+                return {'error':'Contract file contains compilation errors', 'cached_asts':len(ast_cache)}
+        buggy_dir = os.path.join(work_dir, "buggy")
+        ast_dir = os.path.join(work_dir, "ast")
+        buggy_file = solidifi.inject_contract(contract_file, bug_type, buggy_dir, ast_dir, ast_data)
+        if buggy_file is None:
+            return {'error':'unable to generate AST', 'cached_asts':len(ast_cache)}
+        with open(buggy_file) as fh:
+            buggy_source = fh.read()
+    ast_cache[key] = solidifi.cur_contr_ast_data
+    ast_cache.move_to_end(key)
+    while len(ast_cache) > max_cached_asts:
+        ast_cache.popitem(last=False)
+    return {'buggy_source':buggy_source, 'bug_log':solidifi.BugLog, 'time':round(time.time()-start, 4), 'ast_cached':cached,
+            'cached_asts':len(ast_cache)}
+
+async def inject(request):
+    source = request['source']
+    bug_type = request['bug_type']
+    name = request.get('name', 'contract.sol')
+    if not isinstance(name, str) or not os.path.basename(name).endswith(".sol") or os.path.basename(name) == ".sol":
+        raise ValueError("Invalid contract name {0!r}, expected a file name ending with .sol".format(name))
+    name = os.path.basename(name)
+    if len(solidifi.get_bug_info(bug_type)) == 0:
+        return {'error':'Unknown bug type {0}'.format(bug_type)}
+
+    key = hashlib.sha256(source.encode()).hexdigest()
+    worker = int(key, 16) % len(executors)
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(executors[worker], inject_job, name, source, bug_type, key)
+    cached_asts[worker] = result.pop('cached_asts')
+    return result
+
+async def handle(reader, writer):
+    """Minimal HTTP/1.1 handler: POST /inject and GET /health"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode().split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                k, v = line.decode().split(':', 1)
+                headers[k.strip().lower()] = v.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            status = "200 OK"
+            try:
+                if method == 'GET' and path == '/health':
+                    response = {'status':'ok', 'cached_asts':sum(cached_asts)}
+                elif method == 'POST' and path == '/inject':
+                    try:
+                        response = await inject(json.loads(body))
+                    except (ValueError, KeyError) as err:
+                        status, response = "400 Bad Request", {'error':str(err)}
+                    if 'error' in response and status == "200 OK":
+                        status = "422 Unprocessable Entity"
+                else:
+                    status, response = "404 Not Found", {'error':'unknown endpoint'}
+            except Exception as err:
+                """Answer the request instead of dropping the connection"""
+                status, response = "500 Internal Server Error", {'error':"{0}: {1}".format(type(err).__name__, err)}
+
+            data = json.dumps(response).encode()
+            writer.write("HTTP/1.1 {0}\r\nContent-Type: application/json\r\nContent-Length: {1}\r\n\r\n".format(status, len(data)).encode() + data)
+            await writer.drain()
+            if headers.get('connection', '').lower() == 'close':
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def run(socket_path=None, host="127.0.0.1", port=8545, workers=None):
+    """One single-process pool per worker, so requests can be routed to the worker caching their AST"""
+    for i in range(workers or os.cpu_count() or 1):
+        executors.append(concurrent.futures.ProcessPoolExecutor(max_workers=1, initializer=warm_worker, initargs=(solidifi.ast_parser,)))
+        cached_asts.append(0)
+    """Start the workers before accepting connections, a worker forked later would inherit the open client socket
+    and keep that connection alive after it is closed here"""
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(executor, os.getpid) for executor in executors])
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(handle, path=socket_path)
+        print("SolidiFI service listening on {0}".format(socket_path))
+    else:
+        server = await asyncio.start_server(handle, host, port)
+        print("SolidiFI service listening on {0}:{1}".format(host, port))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for executor in executors:
+            executor.shutdown()
+
+def printUsage(prog):
+    print("%s serve [--socket <path> | --port <port>] [--workers <n>] [--parser <solc|solparse>]" % prog)
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "hs:p:w:", ["help", "socket=", "port=", "workers=", "parser="])
+    except getopt.GetoptError:
+        printUsage("solidifi.py")
+        return 2
+    socket_path, port, workers = None, 8545, None
+    for opt, val in opts:
+        if opt in ('-h', '--help'):
+            printUsage("solidifi.py")
+            return 0
+        elif opt in ('-s', '--socket'):
+            socket_path = val
+        elif opt in ('-p', '--port'):
+            port = int(val)
+        elif opt in ('-w', '--workers'):
+            workers = int(val)
+        elif opt == '--parser':
+            if val not in ("solc", "solparse"):
+                printUsage("solidifi.py")
+                return 2
+            solidifi.ast_parser = val
+    try:
+        asyncio.run(run(socket_path, port=port, workers=workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,316 @@
+#!/usr/bin/python3
+
+import os, sys
+import json
+import bisect
+import hashlib
+import shutil
+import solc_versions
+import verify
+
+"""Contract slicing: drop the functions, modifiers, events and contracts no injected snippet depends on
+
+Slicing works on the legacy AST of the buggy contract. The members overlapping an injected snippet are kept,
+together with everything they reference, the functions writing the state variables they use, the
+constructors and fallback functions of the kept contracts, their base contracts and the overrides of kept
+functions. State variables, structs, enums and using directives of a kept contract are always kept.
+
+A sliced buggy_<n>.sol replaces the analyzed one; the full contract is kept as buggy_<n>.sol.full and
+buggy_<n>.sol.map.json lists, for each line of the sliced contract, its line in the full one.
+"""
+
+member_kinds = ('FunctionDefinition', 'ModifierDefinition', 'EventDefinition')
+full_suffix = ".full"
+map_suffix = ".map.json"
+"""Sliced contracts and line maps by hash of the buggy contract and its bug log, the same buggy contract is injected once per tool"""
+slice_cache = {}
+
+def map_file(buggy_sc):
+    return buggy_sc+map_suffix
+
+def is_sliced(buggy_sc):
+    return os.path.isfile(map_file(buggy_sc))
+
+def get_span(node):
+    start, length = node['src'].split(':')[0:2]
+    return int(start), int(start)+int(length)
+
+def walk(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(child for child in node.get('children', []) if isinstance(child, dict))
+
+def get_references(node):
+    """Declarations a node reads or calls; the variable a plain assignment overwrites is not read"""
+    refs = set()
+    overwritten = set()
+    for n in walk(node):
+        attributes = n.get('attributes', {})
+        if n.get('name') == 'Assignment' and attributes.get('operator') == '=' and n.get('children'):
+            overwritten.add(id(get_write_root(n['children'][0])))
+        ref = attributes.get('referencedDeclaration')
+        if isinstance(ref, int) and id(n) not in overwritten:
+            refs.add(ref)
+    return refs
+
+def get_write_root(node):
+    """Node at the root of an assigned expression: x, x[i], x.f[i] -> x"""
+    while node.get('name') in ('IndexAccess', 'MemberAccess') and node.get('children'):
+        node = node['children'][0]
+    return node
+
+def get_write_target(node):
+    node = get_write_root(node)
+    if node.get('name') == 'Identifier':
+        return node.get('attributes', {}).get('referencedDeclaration')
+    return None
+
+def get_written(node):
+    """Declarations a member assigns to, increments, deletes or pushes onto"""
+    written = set()
+    for n in walk(node):
+        attributes = n.get('attributes', {})
+        children = n.get('children', [])
+        if len(children) == 0:
+            continue
+        if n['name'] == 'Assignment' or (n['name'] == 'UnaryOperation' and attributes.get('operator') in ('++', '--', 'delete')):
+            written.add(get_write_target(children[0]))
+        elif n['name'] == 'FunctionCall' and children[0].get('name') == 'MemberAccess' and \
+                children[0].get('attributes', {}).get('member_name') in ('push', 'pop'):
+            written.add(get_write_target(children[0]['children'][0]))
+    written.discard(None)
+    return written
+
+def is_root(member, contract):
+    """Constructors and fallback functions stay with their contract"""
+    attributes = member.get('attributes', {})
+    if member['name'] != 'FunctionDefinition':
+        return False
+    return attributes.get('isConstructor') is True or attributes.get('kind') in ('constructor', 'fallback', 'receive') or \
+        attributes.get('name') in ('', contract.get('attributes', {}).get('name'))
+
+def get_kept(ast, seed_spans):
+    """Ids of the contracts and members kept, or None when the AST lacks the attributes slicing needs"""
+    contracts = {}
+    members = {}
+    owners = {}
+    for contract in ast.get('children', []):
+        if contract.get('name') != 'ContractDefinition':
+            continue
+        if 'linearizedBaseContracts' not in contract.get('attributes', {}):
+            return None
+        contracts[contract['id']] = contract
+        for child in contract.get('children', []):
+            member_id = child['id'] if child.get('name') in member_kinds else None
+            if member_id is not None:
+                members[member_id] = (contract['id'], child)
+            for n in walk(child):
+                owners[n['id']] = (contract['id'], member_id)
+        owners[contract['id']] = (contract['id'], None)
+
+    writers = {}
+    for member_id, (contract_id, member) in members.items():
+        for var in get_written(member):
+            writers.setdefault(var, set()).add(member_id)
+
+    kept_contracts = set()
+    kept_members = set()
+    pending = []
+
+    def keep_contract(contract_id):
+        if contract_id in kept_contracts or contract_id not in contracts:
+            return
+        kept_contracts.add(contract_id)
+        contract = contracts[contract_id]
+        for child in contract.get('children', []):
+            if child.get('name') not in member_kinds:
+                pending.append(child)
+            elif is_root(child, contract):
+                keep_member(child['id'])
+        for base in contract['attributes']['linearizedBaseContracts']:
+            keep_contract(base)
+
+    def keep_member(member_id):
+        if member_id in kept_members:
+            return
+        kept_members.add(member_id)
+        keep_contract(members[member_id][0])
+        pending.append(members[member_id][1])
+
+    def keep_declaration(decl):
+        if decl not in owners:
+            return
+        contract_id, member_id = owners[decl]
+        keep_contract(contract_id)
+        if member_id is not None:
+            keep_member(member_id)
+        for writer in writers.get(decl, ()):
+            keep_member(writer)
+
+    for start, end in seed_spans:
+        for member_id, (contract_id, member) in members.items():
+            member_start, member_end = get_span(member)
+            if member_start < end and start < member_end:
+                keep_member(member_id)
+        for contract_id, contract in contracts.items():
+            contract_start, contract_end = get_span(contract)
+            if contract_start < end and start < contract_end:
+                keep_contract(contract_id)
+
+    while pending:
+        while pending:
+            for decl in get_references(pending.pop()):
+                keep_declaration(decl)
+        """A kept function or modifier keeps its overrides in the kept derived contracts"""
+        kept_names = set((members[m][0], members[m][1].get('attributes', {}).get('name')) for m in kept_members)
+        for member_id, (contract_id, member) in members.items():
+            if member_id in kept_members or contract_id not in kept_contracts:
+                continue
+            name = member.get('attributes', {}).get('name')
+            if any((base, name) in kept_names for base in contracts[contract_id]['attributes']['linearizedBaseContracts'] if base != contract_id):
+                keep_member(member_id)
+    return kept_contracts, kept_members
+
+def get_dropped_spans(ast, kept_contracts, kept_members):
+    spans = []
+    for contract in ast.get('children', []):
+        if contract.get('name') != 'ContractDefinition':
+            continue
+        if contract['id'] not in kept_contracts:
+            spans.append(get_span(contract))
+            continue
+        for child in contract.get('children', []):
+            if child.get('name') in member_kinds and child['id'] not in kept_members:
+                spans.append(get_span(child))
+    return sorted(spans)
+
+def slice_source(data, ast, bug_log):
+    """Sliced source and line map of a buggy contract, None when nothing can be dropped"""
+    line_starts = [0]
+    newline = data.find(b'\n')
+    while newline >= 0:
+        line_starts.append(newline+1)
+        newline = data.find(b'\n', newline+1)
+
+    seed_spans = []
+    for bug in bug_log:
+        first = int(bug['loc'])-1
+        last = first+int(bug['length'])
+        if 0 <= first < len(line_starts):
+            seed_spans.append((line_starts[first], line_starts[last] if last < len(line_starts) else len(data)))
+    kept = get_kept(ast, seed_spans)
+    if kept is None:
+        return None
+    spans = get_dropped_spans(ast, *kept)
+    if len(spans) == 0:
+        return None
+
+    """Members taking whole lines are removed with their lines, anything sharing a line with kept code is blanked"""
+    out = bytearray()
+    removed_lines = set()
+    pos = 0
+    for start, end in spans:
+        if start < pos:
+            continue
+        line_start = line_starts[bisect.bisect_right(line_starts, start)-1]
+        line_end = data.find(b'\n', end)
+        line_end = len(data) if line_end < 0 else line_end+1
+        if line_start >= pos and data[line_start:start].strip() == b'' and data[end:line_end].strip() == b'':
+            out += data[pos:line_start]
+            first_line = bisect.bisect_right(line_starts, line_start)
+            last_line = bisect.bisect_right(line_starts, line_end-1)
+            removed_lines.update(range(first_line, last_line+1))
+        else:
+            out += data[pos:start]
+            out += bytes(b if b == 0x0a else 0x20 for b in data[start:end])
+            line_end = end
+        pos = line_end
+    out += data[pos:]
+    line_map = [line for line in range(1, len(line_starts)+1) if line not in removed_lines]
+    return bytes(out), line_map
+
+def slice_files(injections):
+    """Slice buggy contracts in place, given as {'buggy_file', 'bug_log_file'} dicts; returns the ones that were sliced
+
+    Every sliced contract is compiled again and the full one is restored if it fails.
+    """
+    todo = []
+    for inj in injections:
+        with open(inj['buggy_file'], 'rb') as fh:
+            data = fh.read()
+        bug_log = verify.read_bug_log(inj['bug_log_file'])
+        key = hashlib.sha1(data+json.dumps([(b['loc'], b['length']) for b in bug_log]).encode()).hexdigest()
+        todo.append((inj, data, bug_log, key))
+
+    asts = solc_versions.legacy_asts([inj['buggy_file'] for inj, data, bug_log, key in todo if key not in slice_cache])
+    written = []
+    for inj, data, bug_log, key in todo:
+        if key not in slice_cache:
+            ast = asts.get(inj['buggy_file'])
+            slice_cache[key] = None if ast is None else slice_source(data, ast, bug_log)
+        if slice_cache[key] is None:
+            continue
+        sliced, line_map = slice_cache[key]
+        buggy_sc = inj['buggy_file']
+        shutil.copyfile(buggy_sc, buggy_sc+full_suffix)
+        with open(buggy_sc, 'wb') as fh:
+            fh.write(sliced)
+        with open(map_file(buggy_sc), 'w') as fh:
+            json.dump(line_map, fh)
+        written.append((inj, key))
+
+    sliced = []
+    failed = set(solc_versions.compile_check([inj['buggy_file'] for inj, key in written]))
+    for inj, key in written:
+        buggy_sc = inj['buggy_file']
+        if buggy_sc in failed:
+            print("Sliced contract {0} does not compile, the full one is analyzed".format(buggy_sc))
+            restore(buggy_sc)
+            slice_cache[key] = None
+        else:
+            sliced.append(inj)
+    return sliced
+
+def restore(buggy_sc):
+    """Put the full buggy contract back in place of the sliced one"""
+    shutil.move(buggy_sc+full_suffix, buggy_sc)
+    os.remove(map_file(buggy_sc))
+
+def load_line_map(buggy_sc):
+    """Line map of a sliced contract, None when it was not sliced"""
+    if not is_sliced(buggy_sc):
+        return None
+    with open(map_file(buggy_sc)) as fh:
+        return json.load(fh)
+
+def translate_lines(bugs, line_map):
+    """Replace the sliced contract lines of reported bugs by the lines of the full buggy contract"""
+    if line_map is None:
+        return bugs
+    for bug in bugs:
+        line = int(bug['lines'])
+        if 0 < line <= len(line_map):
+            bug['lines'] = line_map[line-1]
+    return bugs
+
+def printUsage(prog):
+    print("%s <buggy contract> <bug log>" % prog)
+    print("%s --restore <buggy contract>" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    if sys.argv[1] == '--restore':
+        restore(sys.argv[2])
+    else:
+        with open(sys.argv[1], 'rb') as fh:
+            before = fh.read().count(b'\n')
+        if len(slice_files([{'buggy_file':sys.argv[1], 'bug_log_file':sys.argv[2]}])) == 0:
+            print("{0} was not sliced".format(sys.argv[1]))
+        else:
+            with open(sys.argv[1], 'rb') as fh:
+                after = fh.read().count(b'\n')
+            print("{0}: {1} -> {2} lines".format(sys.argv[1], before, after))
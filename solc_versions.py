@@ -0,0 +1,287 @@
+#!/usr/bin/python3
+
+import os, sys, re
+import json
+import hashlib
+import subprocess
+
+"""Directories scanned for version-suffixed solc binaries (solc-0.5.12, solc-v0.5.12, ...)"""
+solc_dirs = ["/usr/bin", "/usr/local/bin", os.path.expanduser("~/.solcx"), os.path.expanduser("~/.solc-select/artifacts")]
+cache_file = ".solc_cache.json"
+
+installed_solc = None
+version_cache = None
+verified_contracts = set()
+
+def parse_version(ver):
+    """Turn '0.5.12', 'v0.5.12' or '0.5.12+commit.7709ece9' into a comparable tuple"""
+    m = re.match(r'v?(\d+)(?:\.(\d+))?(?:\.(\d+))?', ver.strip())
+    if m is None:
+        return None
+    return tuple(int(p) if p is not None else 0 for p in m.groups())
+
+def version_str(ver):
+    return "%d.%d.%d" % ver
+
+def get_pragma(data):
+    """Return the version expression of the first 'pragma solidity' directive"""
+    if isinstance(data, str):
+        data = data.encode()
+    m = re.search(rb'pragma\s+solidity\s+([^;]+);', data)
+    if m is None:
+        return None
+    return m.group(1).decode(errors="ignore").strip()
+
+def parse_constraints(expr):
+    """Parse a pragma expression into alternatives ('||') of (operator, version) lists"""
+    alternatives = []
+    for alt in expr.split('||'):
+        constraints = []
+        for op, ver in re.findall(r'(\^|~|>=|<=|>|<|=)?\s*v?(\d+(?:\.\d+){0,2})', alt):
+            v = parse_version(ver)
+            parts = len(ver.split('.'))
+            if op == '^':
+                if v[0] > 0:
+                    upper = (v[0]+1, 0, 0)
+                elif v[1] > 0:
+                    upper = (0, v[1]+1, 0)
+                else:
+                    upper = (0, 0, v[2]+1)
+                constraints.extend([('>=', v), ('<', upper)])
+            elif op == '~':
+                constraints.extend([('>=', v), ('<', (v[0], v[1]+1, 0))])
+            elif op in ('', '=') and parts < 3:
+                """A partial version such as 0.5 matches any 0.5.x"""
+                upper = (v[0]+1, 0, 0) if parts == 1 else (v[0], v[1]+1, 0)
+                constraints.extend([('>=', v), ('<', upper)])
+            else:
+                constraints.append((op or '=', v))
+        alternatives.append(constraints)
+    return alternatives
+
+def breaking_series(ver):
+    return ver[0:1] if ver[0] > 0 else ver[0:2]
+
+def satisfies(ver, alternatives):
+    for constraints in alternatives:
+        ok = True
+        for op, v in constraints:
+            if ((op == '>=' and not ver >= v) or (op == '<=' and not ver <= v) or (op == '>' and not ver > v)
+                    or (op == '<' and not ver < v) or (op == '=' and not ver == v)):
+                ok = False
+                break
+        if ok:
+            return True
+    return False
+
+def get_solc_version(solc):
+    """Ask a solc binary for its version"""
+    try:
+        out = subprocess.check_output([solc, '--version'], stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    m = re.search(rb'Version:\s*(\S+)', out)
+    if m is None:
+        return None
+    return parse_version(m.group(1).decode())
+
+def list_installed_solc():
+    """Map every locally installed solc version to its binary"""
+    global installed_solc
+    if installed_solc is not None:
+        return installed_solc
+
+    installed_solc = {}
+    name_pattern = re.compile(r'^solc-v?(\d+\.\d+\.\d+)(\+.*)?$')
+    for solc_dir in solc_dirs:
+        if not os.path.isdir(solc_dir):
+            continue
+        for root, dirs, files in os.walk(solc_dir):
+            for f in files:
+                m = name_pattern.match(f)
+                path = os.path.join(root, f)
+                if m and os.access(path, os.X_OK):
+                    installed_solc.setdefault(parse_version(m.group(1)), path)
+    """The solc on PATH is used when no versioned binary matches its version"""
+    for path_dir in os.environ.get("PATH", "").split(os.pathsep):
+        path = os.path.join(path_dir, "solc")
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            ver = get_solc_version(path)
+            if ver is not None:
+                installed_solc.setdefault(ver, path)
+            break
+    return installed_solc
+
+def load_cache():
+    global version_cache
+    if version_cache is None:
+        version_cache = {}
+        if os.path.isfile(cache_file):
+            try:
+                with open(cache_file) as fh:
+                    version_cache = json.load(fh)
+            except ValueError:
+                version_cache = {}
+    return version_cache
+
+def save_cache():
+    if version_cache is None:
+        return
+    with open(cache_file, 'w') as fh:
+        json.dump(version_cache, fh)
+
+def source_hash(filename):
+    with open(filename, 'rb') as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+def resolve_version(filename):
+    """Pick the newest installed solc version allowed by the contract's pragma"""
+    cache = load_cache()
+    key = source_hash(filename)
+    if key in cache:
+        ver = parse_version(cache[key])
+        if ver in list_installed_solc():
+            return ver
+
+    with open(filename, 'rb') as fh:
+        expr = get_pragma(fh.read())
+    candidates = sorted(list_installed_solc(), reverse=True)
+    if expr is not None:
+        alternatives = parse_constraints(expr)
+        candidates = [ver for ver in candidates if satisfies(ver, alternatives)]
+        """Open ranges such as >=0.5.11 prefer the breaking series of their lower bound over newer ones"""
+        lower = [v for constraints in alternatives for op, v in constraints if op in ('>=', '>', '=')]
+        upper = [v for constraints in alternatives for op, v in constraints if op in ('<=', '<')]
+        if len(lower) > 0 and len(upper) == 0:
+            series = breaking_series(min(lower))
+            candidates.sort(key=lambda ver: breaking_series(ver) == series, reverse=True)
+    if len(candidates) == 0:
+        return None
+
+    cache[key] = version_str(candidates[0])
+    save_cache()
+    return candidates[0]
+
+def resolve_solc(filename):
+    """Return the solc binary to use for a contract, falling back to the solc on PATH"""
+    ver = resolve_version(filename)
+    if ver is None:
+        return "solc"
+    return list_installed_solc()[ver]
+
+def group_by_version(files):
+    """Batch contracts by the solc binary they resolve to"""
+    groups = {}
+    for f in files:
+        groups.setdefault(resolve_solc(f), []).append(f)
+    return groups
+
+def get_error_files(stderr):
+    """Files with errors in solc's output, which gives their location either before the message
+    (file:line:col: ParserError: ..., solc 0.5 and earlier) or on a line below it (Error: ... / --> file:line:col:)"""
+    files = set()
+    severity = None
+    for line in stderr.splitlines():
+        m = re.match(r'^(.+?):\d+:\d+:\s*(\w*Error|Warning|Info):', line)
+        if m is not None:
+            if m.group(2).endswith("Error"):
+                files.add(os.path.normpath(m.group(1)))
+            severity = None
+            continue
+        m = re.match(r'^(\w*Error|Warning|Info):', line)
+        if m is not None:
+            severity = m.group(1)
+            continue
+        m = re.match(r'^\s*-->\s*(.+?):\d+:\d+:', line)
+        if m is not None and severity is not None and severity.endswith("Error"):
+            files.add(os.path.normpath(m.group(1)))
+            severity = None
+    return files
+
+def compile_check(files):
+    """Compile contracts with one solc invocation per resolved version, returns the files that failed"""
+    failed = []
+    for solc, group in group_by_version(files).items():
+        try:
+            proc = subprocess.run([solc] + group, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError:
+            failed.extend(group)
+            continue
+        errors = get_error_files(proc.stderr.decode(errors="ignore"))
+        for f in group:
+            if os.path.normpath(f) in errors or (proc.returncode != 0 and len(errors) == 0):
+                failed.append(f)
+            else:
+                verified_contracts.add(source_hash(f))
+    return failed
+
+def standard_json_errors(files):
+    """Compile contracts with one solc --standard-json invocation per resolved version
+
+    Returns the errors of each file as a list of dicts with 'start', 'end' (byte offsets, None when
+    unknown) and 'message'; files that compiled have an empty list.
+    """
+    errors = dict((f, []) for f in files)
+    for solc, group in group_by_version(files).items():
+        sources = {}
+        for f in group:
+            with open(f) as fh:
+                sources[f] = {'content':fh.read()}
+        std_input = {'language':'Solidity', 'sources':sources, 'settings':{'outputSelection':{'*':{'':[]}}}}
+        try:
+            proc = subprocess.run([solc, '--standard-json'], input=json.dumps(std_input).encode(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            output = json.loads(proc.stdout.decode(errors="ignore"))
+        except (OSError, ValueError):
+            for f in group:
+                errors[f].append({'start':None, 'end':None, 'message':'solc --standard-json failed'})
+            continue
+        for err in output.get('errors', []):
+            if err.get('severity') != 'error':
+                continue
+            loc = err.get('sourceLocation', {})
+            message = err.get('formattedMessage', err.get('message', '')).strip()
+            if loc.get('file') in errors:
+                errors[loc['file']].append({'start':loc.get('start'), 'end':loc.get('end'), 'message':message})
+            else:
+                """An error without a location fails the whole group"""
+                for f in group:
+                    errors[f].append({'start':None, 'end':None, 'message':message})
+    return errors
+
+def legacy_asts(files):
+    """Legacy ASTs of contracts with one solc --standard-json invocation per resolved version
+
+    Files that do not compile, or whose solc no longer produces the legacy AST (0.8 and later), get None.
+    """
+    asts = dict((f, None) for f in files)
+    for solc, group in group_by_version(files).items():
+        sources = {}
+        for f in group:
+            with open(f) as fh:
+                sources[f] = {'content':fh.read()}
+        std_input = {'language':'Solidity', 'sources':sources, 'settings':{'outputSelection':{'*':{'':['legacyAST']}}}}
+        try:
+            proc = subprocess.run([solc, '--standard-json'], input=json.dumps(std_input).encode(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            output = json.loads(proc.stdout.decode(errors="ignore"))
+        except (OSError, ValueError):
+            continue
+        if any(err.get('severity') == 'error' for err in output.get('errors', [])):
+            continue
+        for f in group:
+            asts[f] = output.get('sources', {}).get(f, {}).get('legacyAST')
+    return asts
+
+def is_verified(filename):
+    return source_hash(filename) in verified_contracts
+
+def printUsage(prog):
+    print("%s <source-code-file.sol> [<source-code-file.sol> ...]" % prog)
+
+if __name__ == "__main__":
+    if 1 == len(sys.argv) or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    for solc, group in group_by_version(sys.argv[1:]).items():
+        print(solc)
+        for f in group:
+            print("    " + f)
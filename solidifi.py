@@ -3,6 +3,11 @@
 import ijson, json
 import re, sys, os, shutil
 import inject_file
+import solc_versions
+import solparse
+import resources
+import planner
+import tracing
 import time, datetime
 import configparser
 import subprocess
@@ -14,8 +19,23 @@ cur_contr_ast_data = None
 cur_contr_file = None
 src_contr_file = None
 BugLog = []
+bug_types = None
+bug_snippets = {}
+combined_dir = "Combined"
+bip_ast = None
+bip_cache = {}
+"""AST source: "solc", or "solparse" for the built-in parser, which falls back to solc on code it does not handle"""
+ast_parser = "solc"
+"""Print the analyzer time estimate of every injection, not only of those under a --max-bugs budget"""
+verbose = False
 
 def inject_bug(bug_type):
+    inject_bugs([bug_type])
+
+@tracing.traced()
+def inject_bugs(bug_type_list):
+    """Inject snippets of one or more bug types into disjoint locations of the current contract"""
+    """With several types, the potential locations are handed out to the types in turn"""
     global bugs_dir
     global BugLog
     global src_contr_file
@@ -27,39 +47,56 @@ def inject_bug(bug_type):
     if not (bugs_dir.endswith("/") or bugs_dir.endswith("/")):
         bugs_dir = bugs_dir + "/"
     
-    cur_bug_type_details = get_bug_info (bug_type)
-    cur_bug_dir = os.path.join(bugs_dir , cur_bug_type_details[0]['bug_type_dir'])
+    bug_type_dirs = {}
+    for bug_type in bug_type_list:
+        cur_bug_type_details = get_bug_info (bug_type)
+        bug_type_dirs[bug_type] = os.path.join(bugs_dir , cur_bug_type_details[0]['bug_type_dir'])
+
+    """With an injection budget, the potential locations are filled in the planner's order up to the budget of each type"""
+    budget = planner.get_budget()
+    forms_left = dict((t, len([f for f in ("ts", "tf") if os.path.exists(os.path.join(bug_type_dirs[t], f))])) for t in bug_type_list)
+    injected = dict((t, 0) for t in bug_type_list)
 
     for bug_forms in ('s', 'f'):
         
-        cur_bug_dir = os.path.join(bugs_dir , cur_bug_type_details[0]['bug_type_dir'])
-        
         if bug_forms == 's':
             cur_bug = "ts"
         elif bug_forms == 'f':
             cur_bug = "tf"
     
-        cur_bug_dir = os.path.join(cur_bug_dir , cur_bug)
-
-        if os.path.exists(cur_bug_dir):
-            bugfiles = [f for f in os.listdir(cur_bug_dir) if os.path.isfile(os.path.join(cur_bug_dir, f)) and not f.startswith('.')]
-            bug_seq = 0
-        else:
+        bugfiles = {}
+        bug_seq = {}
+        quota = {}
+        for bug_type in bug_type_list:
+            cur_bug_dir = os.path.join(bug_type_dirs[bug_type] , cur_bug)
+            if os.path.exists(cur_bug_dir):
+                bugfiles[bug_type] = get_bug_snippets(cur_bug_dir)
+                bug_seq[bug_type] = 0
+                quota[bug_type] = None
+                if budget is not None:
+                    quota[bug_type] = planner.form_quota(budget-injected[bug_type], forms_left[bug_type])
+                    forms_left[bug_type] -= 1
+        active = [t for t in bug_type_list if t in bugfiles]
+        if len(active) == 0:
             continue
 
         """Scan the fource code and identify the potential locations for injecting bugs"""
         
-        BIP = get_potential_locs(cur_contr_ast_data, bug_forms)
-        for loc in reversed(BIP):
-            if  not bug_seq < len(bugfiles):
-                print("Running out of bug snippets")
+        BIP = get_bip(cur_contr_ast_data, bug_forms)
+        locs = reversed(BIP)
+        if budget is not None:
+            functions = [node for node in get_all_childs(cur_contr_ast_data) if node['name'] in ('FunctionDefinition', 'ModifierDefinition')]
+            plan_seed = "{0}:{1}:{2}:{3}".format(planner.seed, ",".join(bug_type_list), cur_bug, solc_versions.source_hash(src_contr_file))
+            locs = planner.plan_injection(BIP, functions, plan_seed)
+        turn = 0
+        for loc in locs:
+            active = [t for t in active if bug_seq[t] < len(bugfiles[t]) and (quota[t] is None or bug_seq[t] < quota[t])]
+            if len(active) == 0:
+                if any(bug_seq[t] >= len(bugfiles[t]) for t in bugfiles):
+                    print("Running out of bug snippets")
                 break
-            bug_f = open(os.path.join(cur_bug_dir,bugfiles[bug_seq]), "rb")
-            bug_snip = bug_f.read()
-            #print(os.path.join(cur_bug_dir,bugfiles[bug_seq]))
-            #print(bug_snip)
-            #print("************")
-            bug_f.close()
+            bug_type = active[turn % len(active)]
+            bug_snip = bugfiles[bug_type][bug_seq[bug_type]]['snippet']
             bug_snip_len = len(bug_snip.splitlines())
             soffset = int(get_src(loc['src'])['soffset'])
             eoffset = int(get_src(loc['src'])['eoffset'])
@@ -76,17 +113,23 @@ def inject_bug(bug_type):
                 and (new_loc[0] not in BugLog) and (soffset not in injected_loc_src_mapping)):
                 inject_file.update(cur_contr_file, new_loc[0], bug_snip.strip()+b'\n')
                 BugLog = inject_file.adjust_injected_loc(BugLog,new_loc[2], bug_snip_len)
-                BugLog.append({'loc':new_loc[2],'length':bug_snip_len,'bug type':bug_type,'approach':'code snippet injection'})
+                BugLog.append({'loc':new_loc[2],'length':bug_snip_len,'bug type':bug_type,'approach':'code snippet injection',
+                               'snippet':os.path.join(cur_bug, bugfiles[bug_type][bug_seq[bug_type]]['file'])})
                 injected_loc_src_mapping.append(soffset)
-                bug_seq +=1 
+                bug_seq[bug_type] +=1 
+                turn +=1
             elif (loc['name'] in ['Block', 'FunctionDefinition', 'ModifierDefinition'] and (new_loc[1] not in BugLog) and (eoffset not in injected_loc_src_mapping)):
                 inject_file.update(cur_contr_file, new_loc[1]+2, b'\n'+bug_snip.strip())
                 BugLog = inject_file.adjust_injected_loc(BugLog, new_loc[2]+2, bug_snip_len)
-                BugLog.append({'loc':new_loc[2]+1,'length':bug_snip_len,'bug type':bug_type,'approach':'code snippet injection'})
+                BugLog.append({'loc':new_loc[2]+1,'length':bug_snip_len,'bug type':bug_type,'approach':'code snippet injection',
+                               'snippet':os.path.join(cur_bug, bugfiles[bug_type][bug_seq[bug_type]]['file'])})
                 injected_loc_src_mapping.append(eoffset)
-                bug_seq +=1 
+                bug_seq[bug_type] +=1 
+                turn +=1
+        for bug_type in bug_seq:
+            injected[bug_type] += bug_seq[bug_type]
         
-    if bug_seq ==len(BIP):
+    if sum(bug_seq.values()) ==len(BIP):
         print("Injection is done in all potential loctions\n")
     print ("**************************************************\n")
     print ("************* Injection Is Done *****************\n")
@@ -94,16 +137,39 @@ def inject_bug(bug_type):
     print("Following are dettails of the injected bugs:\n")
     print (BugLog)    
     
+def get_bug_types():
+    """Parse bug_types.conf once per process"""
+    global bug_types
+    if bug_types is None:
+        bug_types = []
+        bug_type_configs = configparser.RawConfigParser(allow_no_value=True)
+        bug_type_configs.read("bug_types.conf")
+        for config in  bug_type_configs.sections():
+            _bug_type_id = bug_type_configs.get(config, 'bug_type_id')
+            _bug_type = bug_type_configs.get(config, 'bug_type')
+            _bug_type_dir = bug_type_configs.get(config, 'bug_type_dir')
+            bug_types.append ({'bug_type_id':_bug_type_id, 'bug_type':_bug_type,'bug_type_dir':_bug_type_dir})
+    return bug_types
+
+def get_bug_snippets(bug_dir):
+    """Snippet catalog of a bug type folder, kept in memory once listed"""
+    if bug_dir not in bug_snippets:
+        bugfiles = [f for f in os.listdir(bug_dir) if os.path.isfile(os.path.join(bug_dir, f)) and not f.startswith('.')]
+        snippets = []
+        for f in bugfiles:
+            with open(os.path.join(bug_dir,f), "rb") as bug_f:
+                snippets.append({'file':f, 'snippet':bug_f.read()})
+        bug_snippets[bug_dir] = snippets
+    return bug_snippets[bug_dir]
+
+def invalidate_snippets(bug_dir=None):
+    """Forget the cached snippets under bug_dir (all of them by default), so edited snippet files are read again"""
+    for key in list(bug_snippets):
+        if bug_dir is None or os.path.normpath(key).startswith(os.path.normpath(bug_dir)+os.sep):
+            del bug_snippets[key]
+
 def get_bug_info(bug_type):
-    bug_types = []
-    bug_type_configs = configparser.RawConfigParser(allow_no_value=True)
-    bug_type_configs.read("bug_types.conf")
-    for config in  bug_type_configs.sections():
-        _bug_type_id = bug_type_configs.get(config, 'bug_type_id')
-        _bug_type = bug_type_configs.get(config, 'bug_type')
-        _bug_type_dir = bug_type_configs.get(config, 'bug_type_dir')
-        bug_types.append ({'bug_type_id':_bug_type_id, 'bug_type':_bug_type,'bug_type_dir':_bug_type_dir})
-    bug_type_details = [bug_info for bug_info in bug_types if bug_info['bug_type'] == bug_type]
+    bug_type_details = [bug_info for bug_info in get_bug_types() if bug_info['bug_type'] == bug_type]
     return bug_type_details
 
 def get_src(src):
@@ -113,6 +179,17 @@ def get_src(src):
     
     return {"soffset":beg_offset, "stm_size": stm_size, "eoffset":int(beg_offset)+int(stm_size)+1}
     
+def get_bip(ast, bug_snip_type):
+    """BIP of a bug form, computed once per AST since the potential locations do not depend on the bug type"""
+    global bip_ast
+    if bip_ast is not ast:
+        bip_ast = ast
+        bip_cache.clear()
+    if bug_snip_type not in bip_cache:
+        bip_cache[bug_snip_type] = get_potential_locs(ast, bug_snip_type)
+    return bip_cache[bug_snip_type]
+
+@tracing.traced()
 def get_potential_locs(ast, bug_snip_type):
     """Identify all potential locations in the source code for injecting a bug type"""
     """Returns BIP (Bugs Injection Profile)"""
@@ -200,6 +277,44 @@ def get_main_blocks(ast):
             cont_main_blks.append({"id":(d['children'][i])['id'],"name":(d['children'][i])['name'],"src":(d['children'][i])['src']})
     return cont_main_blks
 
+def get_contract_names(contract_file, ast_file=None):
+    """Names of the deployable contracts of a file, interfaces and libraries left out
+
+    They are taken from the ContractDefinition nodes of the contract's AST when it has been generated,
+    otherwise from the declarations in the source.
+    """
+    names = None
+    if ast_file is not None and os.path.isfile(ast_file):
+        with open(ast_file) as fh:
+            try:
+                names = contract_names_from_ast(json.load(fh))
+            except ValueError:
+                names = None
+    if not names:
+        with open(contract_file, 'rb') as fh:
+            names = contract_names_from_source(fh.read())
+    return names
+
+def contract_names_from_ast(ast):
+    """None when the AST lacks the contract names (it was not produced by solc --ast-json)"""
+    names = []
+    for node in ast.get('children', []):
+        if node.get('name') != 'ContractDefinition':
+            continue
+        attributes = node.get('attributes', {})
+        if 'name' not in attributes:
+            return None
+        if attributes.get('contractKind', 'contract') == 'contract':
+            names.append(attributes['name'])
+    return names
+
+def contract_names_from_source(data):
+    names = []
+    for kind, name in re.findall(rb'^\s*(?:abstract\s+)?(contract|interface|library)\s+(\w+)', data, re.MULTILINE):
+        if kind == b'contract':
+            names.append(name.decode())
+    return names
+
 def extract_values(obj, key):
     """Pull all values of specified key from AST"""
     arr = []
@@ -243,6 +358,7 @@ def code_transform(filename, bug_type):
             bug_locs = inject_file.get_pattern_all_offsets(filename, bug['sec_snip'])
             """Transfer the secure code to make it unsecure to introduce bug into the source code"""
             if (len(bug_locs) >0):
+                inject_file.invalidate(filename)
                 ret = re.sub(re.compile(bug['sec_snip'].encode()), bug['bug_snip'].encode(), ret)
                 myfile.seek(0,0)
                 myfile.write(ret)
@@ -268,6 +384,7 @@ def weaken_sec_mec(filename, bug_type):
         """Weaken the existing security mechanisms to introduce bug into the source code"""
         if (len(bug_locs) >0):
             for loc in bug_locs:
+                inject_file.invalidate(filename)
                 with open(filename,'r+b') as sfile:
                     lines = sfile.readlines()                    
                     lines[loc['line']]=re.sub(b"revert\(\);",b"//revert();\n",lines[loc['line']])
@@ -276,6 +393,19 @@ def weaken_sec_mec(filename, bug_type):
                     sfile.truncate()
                 BugLog.append({'loc':loc['line'], 'length':1,'bug type':bug_type, 'approach':'weakening security'})            
             
+def compile_check(files):
+    """Contracts that fail to compile, or with the solparse AST source, that the built-in parser cannot parse, so no solc is needed"""
+    if ast_parser != "solparse":
+        return solc_versions.compile_check(files)
+    failed = []
+    for f in files:
+        try:
+            solparse.parse_file(f)
+        except (solparse.ParseError, RecursionError, OSError) as err:
+            print("solparse: {0}: {1}".format(f, err))
+            failed.append(f)
+    return failed
+
 """Clear global variables"""             
 def clear_globals():
     global cur_contr_ast_data
@@ -288,11 +418,131 @@ def clear_globals():
     src_contr_file = None
     BugLog = []
 
+@tracing.traced()
+def generate_ast(solc, contract_file, ast_json_file):
+    """Generate the AST of a contract with solc and load it"""
+    ast_cmd = "{0} --ast-json {1} > {2}".format(solc,contract_file,ast_json_file)
+    os.system(ast_cmd)
+    if not(os.path.isfile(ast_json_file)):
+        print("unable to generate AST")
+        return None
+    
+    inject_file.preprocess_json_file(ast_json_file)
+
+    with open(ast_json_file) as fh:
+        return json.loads(fh.read())
+
+def write_bug_log(csv_file):
+    csv_columns = ['loc','length','bug type','approach','snippet']
+    try:
+        with open(csv_file, 'w') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
+            writer.writeheader()
+            for data in BugLog:
+                writer.writerow(data)
+    except IOError:
+        print("I/O error")
+
+def inject_contract(contract_file, bug_type, buggy_dir, ast_json_files_dir="ast", ast_data=None, src_file=None):
+    """Copy a contract into buggy_dir and inject bugs of bug_type (or of several comma-separated types) into the copy"""
+    """Returns the path of the buggy contract, or None if its AST could not be generated"""
+    """src_file is an unmodified copy of the contract shared by several injections, see inject_all"""
+    global cur_contr_file
+    global src_contr_file
+    global cur_contr_ast_data
+
+    head, tail = os.path.split(contract_file)
+    os.makedirs(buggy_dir,exist_ok=True)
+    buggy_file_path = os.path.join(buggy_dir,"buggy_"+tail)
+
+    if os.path.isfile(buggy_file_path):
+        os.remove(buggy_file_path)
+    shutil.copyfile(contract_file,buggy_file_path)  
+    src_contr_file = contract_file
+    cur_contr_file=buggy_file_path
+
+    """Inject bugs using code tranforamtion approach"""
+    #code_transform(cur_contr_file, bug_type)
+
+
+    """Inject bugs using weakning security mechanisms approach"""
+    #weaken_sec_mec(cur_contr_file, bug_type)
+    
+    tmp_buggy_file_path = os.path.join(buggy_dir,"tmp_buggy_"+tail)
+    if src_file is not None:
+        tmp_buggy_file_path = src_file
+    else:
+        if os.path.isfile(tmp_buggy_file_path):
+            os.remove(tmp_buggy_file_path)
+        shutil.copyfile(buggy_file_path,tmp_buggy_file_path)  
+    src_contr_file = tmp_buggy_file_path
+
+    """ Generate AST"""
+    if ast_data is None:
+        os.makedirs(ast_json_files_dir,exist_ok=True)
+        ast_json_file = os.path.join(ast_json_files_dir, os.path.splitext(tail)[0]+".json")
+        if ast_parser == "solparse":
+            ast_data = solparse.generate_ast(cur_contr_file, ast_json_file)
+        if ast_data is None:
+            ast_data = generate_ast(solc_versions.resolve_solc(contract_file), cur_contr_file, ast_json_file)
+        if ast_data is None:
+            if src_file is None:
+                os.remove(tmp_buggy_file_path)
+            return None
+    cur_contr_ast_data = ast_data
+
+    with tracing.span("inject_contract", contract=contract_file, bug_type=bug_type) as sp:
+        inject_bugs(bug_type.split(","))
+        sp.set(injected_bugs=len(BugLog))
+    if verbose or planner.get_budget() is not None:
+        print("Estimated analyzer time: {0:.0f}s".format(planner.estimate_cost(cur_contr_file, len(BugLog))))
+    write_bug_log(os.path.join(buggy_dir,"BugLog_"+tail[0:len(tail)-4]+".csv"))
+
+    if src_file is not None:
+        inject_file.invalidate(cur_contr_file)
+        return buggy_file_path
+    inject_file.release_views()
+    os.remove(tmp_buggy_file_path)
+    return buggy_file_path
+
+def inject_all(contract_file, bug_type_list, buggy_root="buggy", ast_json_files_dir="ast", ast_data=None):
+    """Write one buggy contract per bug type from a single AST and BIP computation
+
+    Returns a dict mapping each bug type to its buggy contract and bug log, or None if the AST could not be generated.
+    """
+    global BugLog
+
+    head, tail = os.path.split(contract_file)
+    os.makedirs(buggy_root,exist_ok=True)
+    src_file = os.path.join(buggy_root,"tmp_src_"+tail)
+    shutil.copyfile(contract_file,src_file)
+    results = {}
+    try:
+        for bug_type in bug_type_list:
+            BugLog = []
+            buggy_file = inject_contract(contract_file, bug_type, os.path.join(buggy_root,bug_type), ast_json_files_dir, ast_data, src_file)
+            if buggy_file is None:
+                return None
+            ast_data = cur_contr_ast_data
+            results[bug_type] = {'buggy_file':buggy_file, 'bug_log':BugLog}
+    finally:
+        inject_file.release_views()
+        os.remove(src_file)
+    return results
+
 def printUsage(prog):
     print ("For inecting bugs of specific bug type, type the following command:\n")
-    print("%s <-i or --inject> <source-code-file.sol> <bug type>"% prog)
+    print("%s <-i or --inject> <source-code-file.sol> <bug type>[,<bug type>,...] [--max-bugs <n> [--seed <s>]] [--parser <solc|solparse>] [--verbose] [--trace <file>]"% prog)
+    print ("For generating one buggy contract per bug type at once, type the following command:\n")
+    print("%s <-i or --inject> <source-code-file.sol> all"% prog)
+    print ("For running the local injection service, type the following command:\n")
+    print("%s serve [--socket <path> | --port <port>] [--workers <n>]"% prog)
+    print ("For re-injecting and re-scoring whenever contracts, bug snippets or tool reports change, type the following command:\n")
+    print("%s watch [--tools <tool1,tool2,...>] [--bug-types <type1,type2,...>] [--contracts <dir>]"% prog)
 
 def main(argv=None):
+    global ast_parser
+    global verbose
     global cur_contr_file
     global src_contr_file
     global cur_contr_ast_data
@@ -310,76 +560,71 @@ def main(argv=None):
         start = time.time()        
     
         if  argv[1] in ('--inject', '-i'):
-            head, tail = os.path.split(argv[2])
-
-            out = subprocess.check_output(['solc',argv[2]])
-            if not(len(out)==0):
-                print("Contract file contains compilation errors")
-                exit()
             if not(os.path.isfile(argv[2])):
                 print("Specified source file does not exists")
-    
-            buggy_dir = os.path.join("buggy",argv[3])
-            os.makedirs(buggy_dir,exist_ok=True)
-            buggy_file_path = os.path.join(buggy_dir,"buggy_"+tail)
-
-            if os.path.isfile(buggy_file_path):
-                os.remove(buggy_file_path)
-            shutil.copyfile(argv[2],buggy_file_path)  
-            src_contr_file = argv[2]
-            cur_contr_file=buggy_file_path
-
-            """Inject bugs using code tranforamtion approach"""
-            #code_transform(cur_contr_file, argv[3])
-
-
-            """Inject bugs using weakning security mechanisms approach"""
-            #weaken_sec_mec(cur_contr_file, argv[3])
-            
-            tmp_buggy_file_path = os.path.join(buggy_dir,"tmp_buggy_"+tail)
-            if os.path.isfile(tmp_buggy_file_path):
-                os.remove(tmp_buggy_file_path)
-            shutil.copyfile(buggy_file_path,tmp_buggy_file_path)  
-            src_contr_file = tmp_buggy_file_path
-            
 
-            """ Generate AST"""
-            ast_json_files_dir = "ast"
-            os.makedirs(ast_json_files_dir,exist_ok=True)
-            ast_json_file = os.path.join(ast_json_files_dir, os.path.splitext(tail)[0]+".json")
-            
-            
-            ast_cmd = "solc --ast-json {0} > {1}".format(cur_contr_file,ast_json_file)
-            os.system(ast_cmd)
-            if not(os.path.isfile(ast_json_file)):
-                print("unable to generate AST")
+            """Optional injection budget: --max-bugs <n> [--seed <s>], the AST source: --parser <solc|solparse> and a trace file: --trace <file>"""
+            opts, args = getopt.getopt(argv[4:], "v", ["max-bugs=", "seed=", "parser=", "verbose", "trace="])
+            for opt, val in opts:
+                if opt == '--parser':
+                    if val not in ("solc", "solparse"):
+                        raise getopt.GetoptError("unknown parser " + val)
+                    ast_parser = val
+                elif opt in ('-v', '--verbose'):
+                    verbose = True
+                elif opt == '--trace':
+                    tracing.enable(val)
+                elif opt == '--max-bugs':
+                    planner.max_bugs = int(val)
+                elif opt == '--seed':
+                    planner.seed = int(val)
+
+            """Select the solc binary matching the contract's pragma, the solparse AST source needs none"""
+            if ast_parser == "solparse":
+                if len(compile_check([argv[2]])) > 0:
+                    print("Contract file cannot be parsed by solparse")
+                    exit()
+            elif not solc_versions.is_verified(argv[2]):
+                solc = solc_versions.resolve_solc(argv[2])
+                out = subprocess.check_output([solc,argv[2]])
+                if not(len(out)==0):
+                    print("Contract file contains compilation errors")
+                    exit()
+
+            """'all' writes one buggy contract per configured bug type from a single AST"""
+            if argv[3] == 'all':
+                with resources.measure() as usage:
+                    injected = inject_all(argv[2], [bug_info['bug_type'] for bug_info in get_bug_types()])
+                if injected is None:
+                    exit()
+                print("Injection: " + resources.format_usage(usage))
+                return "%.2g" % (time.time()-start)
+
+            """Several comma-separated bug types are injected together into buggy/Combined"""
+            buggy_dir = os.path.join("buggy",argv[3] if "," not in argv[3] else combined_dir)
+            with resources.measure() as usage:
+                buggy_file = inject_contract(argv[2], argv[3], buggy_dir)
+            if buggy_file is None:
                 exit()
-            
-            inject_file.preprocess_json_file(ast_json_file)
-
-            with open(ast_json_file) as fh:
-                cur_contr_ast_data = json.loads(fh.read())    
-
-        
-            inject_bug(argv[3])
-            csv_file = os.path.join(buggy_dir,"BugLog_"+tail[0:len(tail)-4]+".csv")
-            csv_columns = ['loc','length','bug type','approach']
-            try:
-                with open(csv_file, 'w') as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=csv_columns)
-                    writer.writeheader()
-                    for data in BugLog:
-                        writer.writerow(data)
-            except IOError:
-                print("I/O error")
-    
-            os.remove(tmp_buggy_file_path)
+            print("Injection: " + resources.format_usage(usage))
             end = time.time()
             return "%.2g" % (end-start)
+
+        elif argv[1] == 'serve':
+            import serve
+            return serve.main(argv[2:])
+
+        elif argv[1] == 'watch':
+            import watch
+            return watch.main(argv[2:])
             
+    except  getopt.GetoptError:
+        printUsage(sys.argv[0])
+        return 2
     except  OSError as err:
         #print >>sys.stderr, err.msg
         #print >>sys.stderr, "for help use --help"
+        print(err, file=sys.stderr)
         return 2
 
 def interior_main(opr, sc, bug_type):
@@ -0,0 +1,892 @@
+#!/usr/bin/python3
+
+import os, sys, re
+import json
+import time
+import tempfile
+
+"""A Solidity 0.4/0.5 tokenizer and parser producing the legacy AST node records SolidiFI uses, without solc
+
+Nodes have the layout of solc --ast-json ({attributes, children, id, name, src}, children before their
+parent in key order) and the source ranges solc's parser gives them, so that get_potential_locs finds the
+same BIPs. Only contract, function and event names and contract kinds are filled in as attributes: types
+and references need solc's analysis. Inline assembly is kept as a single node.
+"""
+
+class ParseError(Exception):
+    pass
+
+keywords = set(['pragma', 'import', 'contract', 'interface', 'library', 'is', 'function', 'constructor', 'modifier', 'event',
+                'struct', 'enum', 'using', 'for', 'mapping', 'returns', 'return', 'if', 'else', 'while', 'do', 'break',
+                'continue', 'throw', 'emit', 'new', 'delete', 'assembly', 'var', 'anonymous', 'indexed', 'public', 'private',
+                'internal', 'external', 'pure', 'view', 'payable', 'constant', 'memory', 'storage', 'calldata', 'true',
+                'false', 'type', 'hex'])
+elementary_pattern = re.compile(r'(u?int\d*|bytes\d*|byte|string|address|bool|u?fixed(\d+x\d+)?)$')
+subdenominations = set(['wei', 'szabo', 'finney', 'ether', 'seconds', 'minutes', 'hours', 'days', 'weeks', 'years'])
+token_pattern = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<hexstring>hex(?:"[0-9a-fA-F_]*"|'[0-9a-fA-F_]*'))
+  | (?P<string>"(?:[^"\\\n]|\\(?:.|\n))*"|'(?:[^'\\\n]|\\(?:.|\n))*')
+  | (?P<number>0[xX][0-9a-fA-F_]*|(?:\d[\d_]*(?:\.\d[\d_]*)?|\.\d[\d_]*)(?:[eE]-?\d[\d_]*)?)
+  | (?P<word>[a-zA-Z_$][a-zA-Z0-9_$]*)
+  | (?P<op>>>>=|>>=|<<=|>>>|\*\*|==|!=|<=|>=|&&|\|\||\+\+|--|\+=|-=|\*=|/=|%=|\|=|&=|\^=|<<|>>|=>|:=|->|[-+*/%<>=!~&|^?:;,.()\[\]{}])
+''', re.VERBOSE | re.DOTALL)
+
+visibilities = ('public', 'private', 'internal', 'external')
+mutabilities = ('pure', 'view', 'payable', 'constant')
+locations = ('memory', 'storage', 'calldata')
+assignment_ops = ('=', '|=', '^=', '&=', '<<=', '>>=', '>>>=', '+=', '-=', '*=', '/=', '%=')
+unary_ops = ('!', '~', 'delete', '+', '-', '++', '--')
+precedences = {'||':4, '&&':5, '==':6, '!=':6, '<':7, '>':7, '<=':7, '>=':7, '|':8, '^':9, '&':10,
+               '<<':11, '>>':11, '>>>':11, '+':12, '-':12, '*':13, '/':13, '%':13, '**':14}
+
+def tokenize(text):
+    """(kind, value, start, end) tuples, ending with an 'eos' token; text holds one character per source byte"""
+    tokens = []
+    pos = 0
+    length = len(text)
+    while pos < length:
+        m = token_pattern.match(text, pos)
+        if m is None:
+            raise ParseError("unexpected character {0!r} at {1}".format(text[pos], pos))
+        kind = m.lastgroup
+        if kind == 'word':
+            value = m.group()
+            kind = 'ident'
+            if value in keywords:
+                kind = 'keyword'
+            elif elementary_pattern.match(value):
+                kind = 'elementary'
+            tokens.append((kind, value, pos, m.end()))
+        elif kind not in ('space', 'comment'):
+            tokens.append((kind, m.group(), pos, m.end()))
+        pos = m.end()
+    tokens.append(('eos', '', length, length))
+    return tokens
+
+def get_span(node):
+    start, length = node['src'].split(':')[0:2]
+    return int(start), int(start)+int(length)
+
+class Parser:
+    """Recursive descent parser following the node ranges of solc's parser
+
+    As in solc, a node ending at the current token includes it ("mark end"), and a node created without an
+    explicit end ends with the token after it.
+    """
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.i = 0
+        self.next_id = 1
+        self.inside_modifier = False
+
+    def value(self):
+        return self.tokens[self.i][1]
+
+    def kind(self):
+        return self.tokens[self.i][0]
+
+    def peek(self):
+        return self.tokens[min(self.i+1, len(self.tokens)-1)][1]
+
+    def start(self):
+        return self.tokens[self.i][2]
+
+    def end(self):
+        return self.tokens[self.i][3]
+
+    def advance(self):
+        token = self.tokens[self.i]
+        if token[0] != 'eos':
+            self.i += 1
+        return token
+
+    def expect(self, value):
+        if self.value() != value or self.kind() in ('string', 'hexstring'):
+            raise ParseError("expected {0!r} at {1}, found {2!r}".format(value, self.start(), self.value()))
+        return self.advance()
+
+    def expect_identifier(self):
+        if self.kind() != 'ident':
+            raise ParseError("expected an identifier at {0}, found {1!r}".format(self.start(), self.value()))
+        return self.advance()[1]
+
+    def is_op(self, *values):
+        return self.kind() in ('op', 'keyword') and self.value() in values
+
+    def node(self, name, start, end, children=(), attributes=None):
+        node = {'attributes':attributes or {}, 'children':[child for child in children if child is not None],
+                'id':self.next_id, 'name':name, 'src':"{0}:{1}:0".format(start, end-start)}
+        self.next_id += 1
+        return node
+
+    def parse(self):
+        start = self.start()
+        nodes = []
+        while self.kind() != 'eos':
+            if self.is_op('pragma', 'import'):
+                name = 'PragmaDirective' if self.value() == 'pragma' else 'ImportDirective'
+                node_start = self.start()
+                while not self.is_op(';'):
+                    if self.kind() == 'eos':
+                        raise ParseError("unterminated {0}".format(name))
+                    self.advance()
+                nodes.append(self.node(name, node_start, self.end()))
+                self.advance()
+            elif self.is_op('contract', 'interface', 'library'):
+                nodes.append(self.parse_contract())
+            else:
+                raise ParseError("expected pragma, import directive or contract definition at {0}".format(self.start()))
+        return self.node('SourceUnit', start, self.end(), nodes)
+
+    def parse_contract(self):
+        start = self.start()
+        kind = self.advance()[1]
+        name = self.expect_identifier()
+        children = []
+        if self.is_op('is'):
+            while True:
+                self.advance()
+                children.append(self.parse_inheritance_specifier())
+                if not self.is_op(','):
+                    break
+        self.expect('{')
+        while not self.is_op('}'):
+            if self.is_op('function', 'constructor'):
+                children.append(self.parse_function_or_variable())
+            elif self.is_op('struct'):
+                children.append(self.parse_struct())
+            elif self.is_op('enum'):
+                children.append(self.parse_enum())
+            elif self.kind() in ('ident', 'elementary') or self.is_op('mapping'):
+                children.append(self.parse_variable_declaration(state=True, initial_value=True))
+                self.expect(';')
+            elif self.is_op('modifier'):
+                children.append(self.parse_modifier())
+            elif self.is_op('event'):
+                children.append(self.parse_event())
+            elif self.is_op('using'):
+                children.append(self.parse_using())
+            else:
+                raise ParseError("function, variable, struct or modifier declaration expected at {0}".format(self.start()))
+        end = self.end()
+        self.expect('}')
+        return self.node('ContractDefinition', start, end, children, {'contractKind':kind, 'name':name})
+
+    def parse_inheritance_specifier(self):
+        start = self.start()
+        name = self.parse_user_defined_type_name()
+        args = []
+        if self.is_op('('):
+            self.advance()
+            args = self.parse_call_list_arguments()
+            end = self.end()
+            self.expect(')')
+        else:
+            end = get_span(name)[1]
+        return self.node('InheritanceSpecifier', start, end, [name]+args)
+
+    def parse_user_defined_type_name(self):
+        start = self.start()
+        end = self.end()
+        path = [self.expect_identifier()]
+        while self.is_op('.'):
+            self.advance()
+            end = self.end()
+            path.append(self.expect_identifier())
+        return self.node('UserDefinedTypeName', start, end, attributes={'name':".".join(path)})
+
+    def parse_function_or_variable(self):
+        start = self.start()
+        header = self.parse_function_header(False, True)
+        if header['isConstructor'] or header['modifiers'] or header['name'] or self.is_op(';', '{'):
+            end = self.end()
+            block = None
+            if not self.is_op(';'):
+                block = self.parse_block()
+                end = get_span(block)[1]
+            else:
+                self.advance()
+            attributes = {'name':header['name'], 'isConstructor':header['isConstructor'], 'implemented':block is not None}
+            return self.node('FunctionDefinition', start, end, [header['parameters'], header['returnParameters']]+header['modifiers']+[block], attributes)
+        """A state variable of function type"""
+        type_name = self.node('FunctionTypeName', start, self.end(), [header['parameters'], header['returnParameters']])
+        type_name = self.parse_type_name_suffix(type_name, start)
+        variable = self.parse_variable_declaration(state=True, initial_value=True, type_name=type_name)
+        self.expect(';')
+        return variable
+
+    def parse_function_header(self, force_empty_name, allow_modifiers):
+        header = {'isConstructor':self.is_op('constructor'), 'modifiers':[]}
+        self.advance()
+        if header['isConstructor'] or force_empty_name or self.is_op('('):
+            header['name'] = ""
+        else:
+            header['name'] = self.expect_identifier()
+        header['parameters'] = self.parse_parameter_list()
+        while True:
+            if allow_modifiers and self.kind() == 'ident':
+                if header['name'] == "" and not header['isConstructor'] and self.peek() in (';', '='):
+                    break
+                header['modifiers'].append(self.parse_modifier_invocation())
+            elif self.is_op(*visibilities) or self.is_op(*mutabilities):
+                self.advance()
+            else:
+                break
+        if self.is_op('returns'):
+            self.advance()
+            header['returnParameters'] = self.parse_parameter_list(allow_empty=False)
+        else:
+            header['returnParameters'] = self.empty_parameter_list()
+        return header
+
+    def empty_parameter_list(self):
+        return self.node('ParameterList', self.start(), self.start())
+
+    def parse_parameter_list(self, allow_empty=True, indexed=False):
+        start = self.start()
+        params = []
+        self.expect('(')
+        if not allow_empty or not self.is_op(')'):
+            params.append(self.parse_variable_declaration(empty_name=True, indexed=indexed, location=True))
+            while not self.is_op(')'):
+                self.expect(',')
+                params.append(self.parse_variable_declaration(empty_name=True, indexed=indexed, location=True))
+        end = self.end()
+        self.advance()
+        return self.node('ParameterList', start, end, params)
+
+    def parse_modifier_invocation(self):
+        start = self.start()
+        name = self.parse_identifier()
+        args = []
+        if self.is_op('('):
+            self.advance()
+            args = self.parse_call_list_arguments()
+            end = self.end()
+            self.expect(')')
+        else:
+            end = get_span(name)[1]
+        return self.node('ModifierInvocation', start, end, [name]+args)
+
+    def parse_identifier(self):
+        start, end = self.start(), self.end()
+        name = self.expect_identifier()
+        return self.node('Identifier', start, end, attributes={'value':name})
+
+    def parse_variable_declaration(self, state=False, initial_value=False, empty_name=False, indexed=False, location=False, type_name=None):
+        if type_name is None:
+            start = self.start()
+            type_name = self.parse_type_name()
+        else:
+            start = get_span(type_name)[0]
+        end = get_span(type_name)[1]
+        while True:
+            if state and self.is_op('public', 'private', 'internal'):
+                self.advance()
+            elif (indexed and self.is_op('indexed')) or self.is_op('constant') or (location and self.is_op(*locations)):
+                end = self.end()
+                self.advance()
+            else:
+                break
+        name = ""
+        if not empty_name or self.kind() == 'ident':
+            end = self.end()
+            name = self.expect_identifier()
+        value = None
+        if initial_value and self.is_op('='):
+            self.advance()
+            value = self.parse_expression()
+            end = get_span(value)[1]
+        return self.node('VariableDeclaration', start, end, [type_name, value], {'name':name, 'stateVariable':state})
+
+    def parse_type_name(self):
+        start = self.start()
+        if self.kind() == 'elementary':
+            elementary = self.advance()
+            end = elementary[3]
+            if self.is_op('payable', 'view', 'pure'):
+                if elementary[1] == 'address':
+                    end = self.end()
+                self.advance()
+            type_name = self.node('ElementaryTypeName', start, end, attributes={'name':elementary[1]})
+        elif self.is_op('function'):
+            header = self.parse_function_header(True, False)
+            type_name = self.node('FunctionTypeName', start, self.end(), [header['parameters'], header['returnParameters']])
+        elif self.is_op('mapping'):
+            type_name = self.parse_mapping()
+        elif self.kind() == 'ident':
+            type_name = self.parse_user_defined_type_name()
+        else:
+            raise ParseError("expected a type name at {0}".format(self.start()))
+        return self.parse_type_name_suffix(type_name, start)
+
+    def parse_type_name_suffix(self, type_name, start):
+        while self.is_op('['):
+            self.advance()
+            length = None
+            if not self.is_op(']'):
+                length = self.parse_expression()
+            end = self.end()
+            self.expect(']')
+            type_name = self.node('ArrayTypeName', start, end, [type_name, length])
+        return type_name
+
+    def parse_mapping(self):
+        start = self.start()
+        self.expect('mapping')
+        self.expect('(')
+        if self.kind() == 'elementary':
+            key = self.node('ElementaryTypeName', self.start(), self.end(), attributes={'name':self.value()})
+            self.advance()
+        else:
+            key = self.parse_user_defined_type_name()
+        self.expect('=>')
+        value = self.parse_type_name()
+        end = self.end()
+        self.expect(')')
+        return self.node('Mapping', start, end, [key, value])
+
+    def parse_struct(self):
+        start = self.start()
+        self.expect('struct')
+        name = self.expect_identifier()
+        members = []
+        self.expect('{')
+        while not self.is_op('}'):
+            members.append(self.parse_variable_declaration())
+            self.expect(';')
+        end = self.end()
+        self.expect('}')
+        return self.node('StructDefinition', start, end, members, {'name':name})
+
+    def parse_enum(self):
+        start = self.start()
+        self.expect('enum')
+        name = self.expect_identifier()
+        values = []
+        self.expect('{')
+        while True:
+            values.append(self.node('EnumValue', self.start(), self.end(), attributes={'name':self.value()}))
+            self.expect_identifier()
+            if self.is_op('}'):
+                break
+            self.expect(',')
+        end = self.end()
+        self.expect('}')
+        return self.node('EnumDefinition', start, end, values, {'name':name})
+
+    def parse_event(self):
+        start = self.start()
+        self.expect('event')
+        name = self.expect_identifier()
+        params = self.parse_parameter_list(indexed=True)
+        if self.is_op('anonymous'):
+            self.advance()
+        end = self.end()
+        self.expect(';')
+        return self.node('EventDefinition', start, end, [params], {'name':name})
+
+    def parse_modifier(self):
+        start = self.start()
+        self.inside_modifier = True
+        self.expect('modifier')
+        name = self.expect_identifier()
+        if self.is_op('('):
+            params = self.parse_parameter_list(indexed=True)
+        else:
+            params = self.empty_parameter_list()
+        block = self.parse_block()
+        self.inside_modifier = False
+        return self.node('ModifierDefinition', start, get_span(block)[1], [params, block], {'name':name})
+
+    def parse_using(self):
+        start = self.start()
+        self.expect('using')
+        library = self.parse_user_defined_type_name()
+        type_name = None
+        self.expect('for')
+        if self.is_op('*'):
+            self.advance()
+        else:
+            type_name = self.parse_type_name()
+        end = self.end()
+        self.expect(';')
+        return self.node('UsingForDirective', start, end, [library, type_name])
+
+    def parse_block(self):
+        start = self.start()
+        self.expect('{')
+        statements = []
+        while not self.is_op('}'):
+            statements.append(self.parse_statement())
+        end = self.end()
+        self.expect('}')
+        return self.node('Block', start, end, statements)
+
+    def parse_statement(self):
+        start = self.start()
+        if self.is_op('if'):
+            return self.parse_if()
+        elif self.is_op('while'):
+            self.advance()
+            self.expect('(')
+            condition = self.parse_expression()
+            self.expect(')')
+            body = self.parse_statement()
+            return self.node('WhileStatement', start, get_span(body)[1], [condition, body])
+        elif self.is_op('do'):
+            self.advance()
+            body = self.parse_statement()
+            self.expect('while')
+            self.expect('(')
+            condition = self.parse_expression()
+            self.expect(')')
+            end = self.end()
+            self.expect(';')
+            return self.node('DoWhileStatement', start, end, [condition, body])
+        elif self.is_op('for'):
+            return self.parse_for()
+        elif self.is_op('{'):
+            return self.parse_block()
+        elif self.is_op('assembly'):
+            return self.parse_inline_assembly()
+        elif self.is_op('continue', 'break', 'throw'):
+            name = {'continue':'Continue', 'break':'Break', 'throw':'Throw'}[self.value()]
+            statement = self.node(name, start, self.end())
+            self.advance()
+        elif self.is_op('return'):
+            self.advance()
+            expression = None
+            if not self.is_op(';'):
+                expression = self.parse_expression()
+                end = get_span(expression)[1]
+            else:
+                end = self.end()
+            statement = self.node('Return', start, end, [expression])
+        elif self.is_op('emit'):
+            statement = self.parse_emit()
+        elif self.inside_modifier and self.kind() == 'ident' and self.value() == '_':
+            statement = self.node('PlaceholderStatement', start, self.end())
+            self.advance()
+        else:
+            statement = self.parse_simple_statement()
+        self.expect(';')
+        return statement
+
+    def parse_if(self):
+        start = self.start()
+        self.expect('if')
+        self.expect('(')
+        condition = self.parse_expression()
+        self.expect(')')
+        true_body = self.parse_statement()
+        false_body = None
+        end = get_span(true_body)[1]
+        if self.is_op('else'):
+            self.advance()
+            false_body = self.parse_statement()
+            end = get_span(false_body)[1]
+        return self.node('IfStatement', start, end, [condition, true_body, false_body])
+
+    def parse_for(self):
+        start = self.start()
+        self.expect('for')
+        self.expect('(')
+        init = condition = loop = None
+        if not self.is_op(';'):
+            init = self.parse_simple_statement()
+        self.expect(';')
+        if not self.is_op(';'):
+            condition = self.parse_expression()
+        self.expect(';')
+        if not self.is_op(')'):
+            expression = self.parse_expression()
+            loop = self.node('ExpressionStatement', *get_span(expression), children=[expression])
+        self.expect(')')
+        body = self.parse_statement()
+        return self.node('ForStatement', start, get_span(body)[1], [init, condition, loop, body])
+
+    def parse_inline_assembly(self):
+        """The assembly block is skipped as balanced braces"""
+        start = self.start()
+        self.expect('assembly')
+        if self.kind() == 'string':
+            self.advance()
+        self.expect('{')
+        depth = 1
+        while depth > 0:
+            if self.kind() == 'eos':
+                raise ParseError("unterminated assembly block at {0}".format(start))
+            if self.is_op('{'):
+                depth += 1
+            elif self.is_op('}'):
+                depth -= 1
+            end = self.end()
+            self.advance()
+        return self.node('InlineAssembly', start, end)
+
+    def parse_emit(self):
+        start = self.start()
+        self.expect('emit')
+        call_start = self.start()
+        path = [self.parse_identifier()]
+        while self.is_op('.'):
+            self.advance()
+            path.append(self.parse_identifier())
+        event = self.expression_from_path(path, [])
+        self.expect('(')
+        args = self.parse_call_arguments()
+        end = self.end()
+        self.expect(')')
+        call = self.node('FunctionCall', call_start, end, [event]+args)
+        return self.node('EmitStatement', start, end, [call])
+
+    def parse_simple_statement(self):
+        if self.is_op('('):
+            start = self.start()
+            self.advance()
+            empty = 0
+            while self.is_op(','):
+                self.advance()
+                empty += 1
+            statement_type, path, indices = self.try_parse_path()
+            if statement_type == 'declaration':
+                variables = [self.parse_variable_declaration(location=True, type_name=self.type_from_path(path, indices))]
+                while not self.is_op(')'):
+                    self.expect(',')
+                    if not self.is_op(',', ')'):
+                        variables.append(self.parse_variable_declaration(location=True))
+                self.expect(')')
+                self.expect('=')
+                value = self.parse_expression()
+                return self.node('VariableDeclarationStatement', start, get_span(value)[1], variables+[value])
+            components = [self.parse_expression(self.expression_from_path(path, indices))]
+            while not self.is_op(')'):
+                self.expect(',')
+                if not self.is_op(',', ')'):
+                    components.append(self.parse_expression())
+            end = self.end()
+            self.expect(')')
+            return self.parse_expression_statement(self.node('TupleExpression', start, end, components))
+        statement_type, path, indices = self.try_parse_path()
+        if statement_type == 'declaration':
+            return self.parse_variable_declaration_statement(self.type_from_path(path, indices))
+        return self.parse_expression_statement(self.expression_from_path(path, indices))
+
+    def peek_statement_type(self):
+        """'declaration', 'expression' or 'path' when only the path that follows can tell"""
+        if self.is_op('mapping', 'function', 'var'):
+            return 'declaration'
+        if self.kind() in ('ident', 'elementary'):
+            following = self.tokens[min(self.i+1, len(self.tokens)-1)]
+            if self.kind() == 'elementary' and following[0] == 'keyword' and following[1] in ('payable', 'view', 'pure'):
+                return 'declaration'
+            if following[0] == 'ident' or (following[0] == 'keyword' and following[1] in locations):
+                return 'declaration'
+            if following[0] == 'op' and following[1] in ('[', '.'):
+                return 'path'
+        return 'expression'
+
+    def try_parse_path(self):
+        statement_type = self.peek_statement_type()
+        if statement_type != 'path':
+            return statement_type, [], []
+        path, indices = self.parse_path()
+        if self.kind() == 'ident' or self.is_op(*locations):
+            return 'declaration', path, indices
+        return 'expression', path, indices
+
+    def parse_path(self):
+        """a.b.c[1][2] or uint[3], the start of a declaration or of an expression"""
+        path = []
+        indices = []
+        if self.kind() == 'ident':
+            path.append(self.parse_identifier())
+            while self.is_op('.'):
+                self.advance()
+                path.append(self.parse_identifier())
+        else:
+            path.append(self.node('ElementaryTypeNameExpression', self.start(), self.end(), attributes={'value':self.value()}))
+            self.advance()
+        while self.is_op('['):
+            self.expect('[')
+            index = None
+            if not self.is_op(']'):
+                index = self.parse_expression()
+            indices.append((index, get_span(path[0])[0], self.end()))
+            self.expect(']')
+        return path, indices
+
+    def expression_from_path(self, path, indices):
+        """Members of a path are names of MemberAccess nodes, their Identifier nodes are dropped as in solc"""
+        if len(path) == 0:
+            return None
+        expression = path[0]
+        start = get_span(path[0])[0]
+        for member in path[1:]:
+            expression = self.node('MemberAccess', start, get_span(member)[1], [expression], {'member_name':member['attributes']['value']})
+        for index, index_start, index_end in indices:
+            expression = self.node('IndexAccess', index_start, index_end, [expression, index])
+        return expression
+
+    def type_from_path(self, path, indices):
+        if len(path) == 0:
+            return None
+        start, end = get_span(path[0])[0], get_span(path[-1])[1]
+        if path[0]['name'] == 'ElementaryTypeNameExpression':
+            type_name = self.node('ElementaryTypeName', start, end, attributes={'name':path[0]['attributes']['value']})
+        else:
+            type_name = self.node('UserDefinedTypeName', start, end, attributes={'name':".".join(p['attributes']['value'] for p in path)})
+        for index, index_start, index_end in indices:
+            type_name = self.node('ArrayTypeName', index_start, index_end, [type_name, index])
+        return type_name
+
+    def parse_variable_declaration_statement(self, type_name):
+        start = self.start() if type_name is None else get_span(type_name)[0]
+        variable = self.parse_variable_declaration(location=True, type_name=type_name)
+        end = get_span(variable)[1]
+        value = None
+        if self.is_op('='):
+            self.advance()
+            value = self.parse_expression()
+            end = get_span(value)[1]
+        return self.node('VariableDeclarationStatement', start, end, [variable, value])
+
+    def parse_expression_statement(self, partial=None):
+        expression = self.parse_expression(partial)
+        return self.node('ExpressionStatement', *get_span(expression), children=[expression])
+
+    def parse_expression(self, partial=None):
+        expression = self.parse_binary(4, partial)
+        if self.is_op(*assignment_ops):
+            operator = self.advance()[1]
+            right = self.parse_expression()
+            return self.node('Assignment', get_span(expression)[0], get_span(right)[1], [expression, right], {'operator':operator})
+        if self.is_op('?'):
+            self.advance()
+            true_expression = self.parse_expression()
+            self.expect(':')
+            false_expression = self.parse_expression()
+            return self.node('Conditional', get_span(expression)[0], get_span(false_expression)[1], [expression, true_expression, false_expression])
+        return expression
+
+    def precedence(self):
+        if self.kind() != 'op':
+            return 0
+        return precedences.get(self.value(), 0)
+
+    def parse_binary(self, min_precedence, partial=None):
+        expression = self.parse_unary(partial)
+        start = get_span(expression)[0]
+        precedence = self.precedence()
+        while precedence >= min_precedence:
+            while self.precedence() == precedence:
+                operator = self.advance()[1]
+                right = self.parse_binary(precedence+1)
+                expression = self.node('BinaryOperation', start, get_span(right)[1], [expression, right], {'operator':operator})
+            precedence -= 1
+        return expression
+
+    def parse_unary(self, partial=None):
+        start = self.start() if partial is None else get_span(partial)[0]
+        if partial is None and self.is_op(*unary_ops):
+            operator = self.advance()[1]
+            sub = self.parse_unary()
+            return self.node('UnaryOperation', start, get_span(sub)[1], [sub], {'operator':operator, 'prefix':True})
+        sub = self.parse_left_hand_side(partial)
+        if not self.is_op('++', '--'):
+            return sub
+        end = self.end()
+        operator = self.advance()[1]
+        return self.node('UnaryOperation', start, end, [sub], {'operator':operator, 'prefix':False})
+
+    def parse_left_hand_side(self, partial=None):
+        start = self.start() if partial is None else get_span(partial)[0]
+        if partial is not None:
+            expression = partial
+        elif self.is_op('new'):
+            self.advance()
+            type_name = self.parse_type_name()
+            expression = self.node('NewExpression', start, get_span(type_name)[1], [type_name])
+        else:
+            expression = self.parse_primary()
+        while True:
+            if self.is_op('['):
+                self.advance()
+                index = None
+                if not self.is_op(']'):
+                    index = self.parse_expression()
+                end = self.end()
+                self.expect(']')
+                expression = self.node('IndexAccess', start, end, [expression, index])
+            elif self.is_op('.'):
+                self.advance()
+                end = self.end()
+                if self.kind() == 'elementary' and self.value() == 'address':
+                    member = self.advance()[1]
+                else:
+                    member = self.expect_identifier()
+                expression = self.node('MemberAccess', start, end, [expression], {'member_name':member})
+            elif self.is_op('('):
+                self.advance()
+                args = self.parse_call_arguments()
+                end = self.end()
+                self.expect(')')
+                expression = self.node('FunctionCall', start, end, [expression]+args)
+            else:
+                return expression
+
+    def parse_primary(self):
+        start = self.start()
+        kind, value = self.kind(), self.value()
+        if kind == 'keyword' and value in ('true', 'false'):
+            expression = self.node('Literal', start, self.end(), attributes={'value':value})
+            self.advance()
+        elif kind == 'number':
+            self.advance()
+            end = self.tokens[self.i-1][3]
+            if self.kind() == 'ident' and self.value() in subdenominations:
+                end = self.end()
+                self.advance()
+            expression = self.node('Literal', start, end, attributes={'value':value})
+        elif kind in ('string', 'hexstring'):
+            expression = self.node('Literal', start, self.end(), attributes={'value':value})
+            self.advance()
+        elif kind == 'ident' or (kind == 'keyword' and value == 'type'):
+            expression = self.node('Identifier', start, self.end(), attributes={'value':value})
+            self.advance()
+        elif self.is_op('(', '['):
+            closing = ')' if value == '(' else ']'
+            self.advance()
+            components = []
+            if not self.is_op(closing):
+                while True:
+                    if not self.is_op(',', closing):
+                        components.append(self.parse_expression())
+                    if self.is_op(closing):
+                        break
+                    self.expect(',')
+            end = self.end()
+            self.expect(closing)
+            expression = self.node('TupleExpression', start, end, components, {'isInlineArray':value == '['})
+        elif kind == 'elementary':
+            expression = self.node('ElementaryTypeNameExpression', start, self.end(), attributes={'value':value})
+            self.advance()
+        else:
+            raise ParseError("expected a primary expression at {0}, found {1!r}".format(start, value))
+        return expression
+
+    def parse_call_arguments(self):
+        if not self.is_op('{'):
+            return self.parse_call_list_arguments()
+        self.expect('{')
+        args = []
+        while not self.is_op('}'):
+            if len(args) > 0:
+                self.expect(',')
+                if self.is_op('}'):
+                    break
+            self.expect_identifier()
+            self.expect(':')
+            args.append(self.parse_expression())
+        self.expect('}')
+        return args
+
+    def parse_call_list_arguments(self):
+        args = []
+        if not self.is_op(')'):
+            args.append(self.parse_expression())
+            while not self.is_op(')'):
+                self.expect(',')
+                args.append(self.parse_expression())
+        return args
+
+def parse(source):
+    """Legacy AST of Solidity source bytes, raises ParseError on code the parser does not handle"""
+    if isinstance(source, bytes):
+        source = source.decode('latin-1')
+    return Parser(source).parse()
+
+def parse_file(contract_file):
+    with open(contract_file, 'rb') as fh:
+        return parse(fh.read())
+
+def generate_ast(contract_file, ast_json_file):
+    """Parse a contract and store its AST like solidifi.generate_ast, None if the parser fails"""
+    try:
+        ast = parse_file(contract_file)
+    except (ParseError, RecursionError) as err:
+        print("solparse: {0}: {1}".format(contract_file, err))
+        return None
+    with open(ast_json_file, 'w') as fh:
+        json.dump(ast, fh)
+    return ast
+
+def get_bips(contract_file, ast):
+    """The BIPs of both bug forms of a contract as (node kind, start, length) lists"""
+    import solidifi
+    import inject_file
+    solidifi.src_contr_file = contract_file
+    bips = {}
+    for form in ('s', 'f'):
+        bips[form] = [(node['name'],)+tuple(int(n) for n in node['src'].split(':')[0:2]) for node in solidifi.get_potential_locs(ast, form)]
+    inject_file.release_views()
+    return bips
+
+def validate(contracts_dir):
+    """Compare the BIPs found from solparse's AST and from solc's AST of every contract, returns the contracts that differ"""
+    import solidifi
+    import solc_versions
+    differ = []
+    solc_time = parse_time = 0.0
+    with tempfile.TemporaryDirectory(prefix="solparse_") as work_dir:
+        for name in sorted(os.listdir(contracts_dir), key=lambda n: (len(n), n)):
+            if not name.endswith(".sol"):
+                continue
+            contract_file = os.path.join(contracts_dir, name)
+            start = time.time()
+            try:
+                solc_ast = solidifi.generate_ast(solc_versions.resolve_solc(contract_file), contract_file, os.path.join(work_dir, name+".json"))
+            except ValueError:
+                solc_ast = None
+            solc_time += time.time()-start
+            start = time.time()
+            try:
+                ast = parse_file(contract_file)
+            except (ParseError, RecursionError) as err:
+                print("{0}: solparse failed: {1}".format(name, err))
+                differ.append(name)
+                continue
+            parse_time += time.time()-start
+            if solc_ast is None:
+                print("{0}: no solc AST".format(name))
+                differ.append(name)
+                continue
+            expected, found = get_bips(contract_file, solc_ast), get_bips(contract_file, ast)
+            for form in ('s', 'f'):
+                if expected[form] != found[form]:
+                    missing = [bip for bip in expected[form] if bip not in found[form]]
+                    extra = [bip for bip in found[form] if bip not in expected[form]]
+                    print("{0}: {1} BIPs differ, missing {2}, extra {3}{4}".format(name, form, missing[0:5], extra[0:5],
+                          "" if missing or extra else ", order differs"))
+                    differ.append(name)
+                    break
+            else:
+                print("{0}: {1} + {2} BIPs identical".format(name, len(found['s']), len(found['f'])))
+    print("solc: {0:.2f}s, solparse: {1:.2f}s".format(solc_time, parse_time))
+    return differ
+
+def printUsage(prog):
+    print("%s <contract.sol>                print the AST of a contract in the layout of solc --ast-json" % prog)
+    print("%s validate [<contracts dir>]    compare the BIPs from solparse and solc on every contract" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    if sys.argv[1] == 'validate':
+        differ = validate(sys.argv[2] if len(sys.argv) > 2 else "contracts")
+        sys.exit(1 if differ else 0)
+    print(json.dumps(parse_file(sys.argv[1]), indent=1))
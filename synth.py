@@ -0,0 +1,249 @@
+#!/usr/bin/python3
+
+import os, sys
+import io
+import json
+import time
+import getopt
+import contextlib
+import random
+import tempfile
+import tracemalloc
+import solidifi
+import solc_versions
+
+"""Synthetic Solidity contracts of any size, and a benchmark of injection time and memory against contract size
+
+The generated contracts use the 0.5 syntax of the bundled contracts: a library, an interface and contracts deriving from
+a base contract, with state variables, structs, events, modifiers and functions of mixed statements.
+"""
+
+sizes = [250, 500, 1000, 2000]
+rounds = 1
+bench_file = "scaling.jsonl"
+"""Growth exponent above which the benchmark warns about a superlinear stage"""
+max_exponent = 1.3
+
+def gen_library(rng):
+    return ["library SafeMath {",
+            "    function add(uint256 a, uint256 b) internal pure returns (uint256) {",
+            "        uint256 c = a + b;",
+            "        require(c >= a, \"addition overflow\");",
+            "        return c;",
+            "    }",
+            "    function sub(uint256 a, uint256 b) internal pure returns (uint256) {",
+            "        require(b <= a, \"subtraction overflow\");",
+            "        return a - b;",
+            "    }",
+            "}", ""]
+
+def gen_interface(rng):
+    return ["interface IRegistry {",
+            "    function lookup(address account) external view returns (uint256);",
+            "    function register(address account, uint256 value) external returns (bool);",
+            "}", ""]
+
+def gen_statements(rng, i, count):
+    """count lines of statements for function i; every kind of statement SolidiFI injects around shows up"""
+    lines = []
+    while len(lines) < count:
+        kind = rng.randrange(7)
+        if kind == 0:
+            lines.append("        uint256 v{0}_{1} = a.add(b);".format(i, len(lines)))
+        elif kind == 1:
+            lines.append("        total = total.add(a);")
+        elif kind == 2:
+            lines += ["        if (a > limit) {",
+                      "            balances[msg.sender] = balances[msg.sender].sub(1);",
+                      "        } else {",
+                      "            balances[msg.sender] = balances[msg.sender].add(b);",
+                      "        }"]
+        elif kind == 3:
+            lines += ["        for (uint256 k = 0; k < 3; k++) {",
+                      "            total = total.add(k);",
+                      "        }"]
+        elif kind == 4:
+            lines.append("        require(b <= limit, \"limit exceeded\");")
+        elif kind == 5:
+            lines.append("        emit Updated(msg.sender, total);")
+        else:
+            lines.append("        records[a] = Record(msg.sender, b, now);")
+    return lines
+
+def gen_contract(rng, index, parent, functions, statements):
+    name = "Synth{0}".format(index)
+    lines = ["contract {0}{1} {{".format(name, " is "+parent if parent else ""),
+             "    using SafeMath for uint256;"]
+    if not parent:
+        lines += ["    address public owner;",
+                  "    uint256 public total;",
+                  "    uint256 public limit = 1000;",
+                  "    mapping(address => uint256) public balances;",
+                  "    struct Record {",
+                  "        address account;",
+                  "        uint256 value;",
+                  "        uint256 time;",
+                  "    }",
+                  "    mapping(uint256 => Record) public records;",
+                  "    event Updated(address indexed account, uint256 value);",
+                  "    modifier onlyOwner() {",
+                  "        require(msg.sender == owner, \"not owner\");",
+                  "        _;",
+                  "    }",
+                  "    constructor() public {",
+                  "        owner = msg.sender;",
+                  "    }"]
+    lines += ["    uint256 public counter{0};".format(index),
+              "    modifier below{0}(uint256 a) {{".format(index),
+              "        require(a < limit, \"too large\");",
+              "        _;",
+              "    }"]
+    for i in range(functions):
+        fn = "{0}_{1}".format(index, i)
+        modifier = ["", " onlyOwner", " below{0}(a)".format(index)][i % 3]
+        lines += ["    function f{0}(uint256 a, uint256 b) public{1} returns (uint256) {{".format(fn, modifier)]
+        lines += gen_statements(rng, fn, statements)
+        lines += ["        counter{0} = counter{0}.add(1);".format(index),
+                  "        return total;",
+                  "    }"]
+    lines += ["    function check{0}(address registry) public view returns (uint256) {{".format(index),
+              "        return IRegistry(registry).lookup(msg.sender);",
+              "    }",
+              "}", ""]
+    return name, lines
+
+def generate(target_lines, seed=1, functions=10, statements=12):
+    """Source of a contract file of about target_lines lines"""
+    rng = random.Random(seed)
+    lines = ["pragma solidity ^0.5.0;", ""] + gen_library(rng) + gen_interface(rng)
+    """Every other contract derives from the first one, which holds the shared state"""
+    base = None
+    index = 0
+    while len(lines) < target_lines:
+        name, contract_lines = gen_contract(rng, index, base, functions, statements)
+        base = base or name
+        lines += contract_lines
+        index += 1
+    return "\n".join(lines) + "\n"
+
+def count_nodes(ast):
+    count = 0
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if 'name' in node and 'src' in node:
+                count += 1
+            stack.extend(node.get('children', []))
+        elif isinstance(node, list):
+            stack.extend(node)
+    return count
+
+def bench_size(lines, bug_type, work_dir, seed=1):
+    """Injection time (best of rounds) and peak traced memory for one synthetic contract, solc excluded"""
+    contract_file = os.path.join(work_dir, "synth_{0}.sol".format(lines))
+    with open(contract_file, 'w') as fh:
+        fh.write(generate(lines, seed))
+    ast_dir = os.path.join(work_dir, "ast")
+    os.makedirs(ast_dir, exist_ok=True)
+    start = time.time()
+    ast = solidifi.generate_ast(solc_versions.resolve_solc(contract_file), contract_file, os.path.join(ast_dir, "synth_{0}.json".format(lines)))
+    ast_time = time.time()-start
+    if ast is None:
+        return None
+    buggy_dir = os.path.join(work_dir, "buggy")
+
+    times = []
+    for r in range(rounds):
+        solidifi.clear_globals()
+        solidifi.bip_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.time()
+            solidifi.inject_contract(contract_file, bug_type, buggy_dir, ast_dir, ast)
+            times.append(time.time()-start)
+        injected = len(solidifi.BugLog)
+
+    """A separate run under tracemalloc, which slows Python down too much to time the others"""
+    solidifi.clear_globals()
+    solidifi.bip_cache.clear()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        solidifi.inject_contract(contract_file, bug_type, buggy_dir, ast_dir, ast)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with open(contract_file, 'rb') as fh:
+        data = fh.read()
+    return {'lines':data.count(b'\n'), 'bytes':len(data), 'nodes':count_nodes(ast), 'bug_type':bug_type, 'injected':injected,
+            'time':min(times), 'ast_time':ast_time, 'peak_bytes':peak, 'at':time.time()}
+
+def get_exponent(xs, ys):
+    """Slope of log(y) against log(x): about 1 for linear growth, 2 for quadratic"""
+    import numpy as np
+    if len(xs) < 2:
+        return None
+    return float(np.polyfit(np.log(xs), np.log(ys), 1)[0])
+
+def plot(results, out_file):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(2, 2, figsize=(10, 8))
+    for col, (key, label) in enumerate([('lines', 'Contract size (lines)'), ('nodes', 'AST nodes')]):
+        xs = [r[key] for r in results]
+        axes[0][col].loglog(xs, [r['time'] for r in results], "o-")
+        axes[0][col].set_ylabel('Injection time (s)')
+        axes[1][col].loglog(xs, [r['peak_bytes']/1024.0**2 for r in results], "o-")
+        axes[1][col].set_ylabel('Peak traced memory (MB)')
+        axes[1][col].set_xlabel(label)
+    fig.tight_layout()
+    fig.savefig(out_file, dpi=150)
+
+def bench(bug_type, bench_sizes, out_file, seed=1):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="solidifi_synth_") as work_dir:
+        for lines in bench_sizes:
+            result = bench_size(lines, bug_type, work_dir, seed)
+            if result is None:
+                print("unable to generate the AST of a {0} line contract".format(lines))
+                continue
+            results.append(result)
+            print("{0:>7} lines {1:>8} nodes {2:>5} bugs  {3:8.3f}s  {4:8.1f} MB peak  (solc {5:.1f}s)".format(
+                result['lines'], result['nodes'], result['injected'], result['time'], result['peak_bytes']/1024.0**2, result['ast_time']))
+    if len(results) == 0:
+        return results
+    with open(bench_file, 'a') as fh:
+        for result in results:
+            fh.write(json.dumps(result)+"\n")
+    for key, label in [('time', 'Injection time'), ('peak_bytes', 'Peak memory')]:
+        exponent = get_exponent([r['lines'] for r in results], [max(r[key], 1e-9) for r in results])
+        if exponent is not None:
+            print("{0} grows as size^{1:.2f}{2}".format(label, exponent, "  <-- superlinear" if exponent > max_exponent else ""))
+    plot(results, out_file)
+    return results
+
+def printUsage(prog):
+    print("%s generate <output.sol> [--lines <n>] [--seed <s>] [--functions <n>] [--statements <n>]" % prog)
+    print("%s bench [--bug-type <type>] [--sizes <n1,n2,...>] [--rounds <n>] [--plot <file>]" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[2:], "", ["lines=", "seed=", "functions=", "statements=", "bug-type=", "sizes=", "rounds=", "plot="])
+    except getopt.GetoptError:
+        printUsage(sys.argv[0])
+        sys.exit(2)
+    opts = dict(opts)
+    seed = int(opts.get('--seed', 1))
+    if sys.argv[1] == 'generate' and len(args) == 1:
+        with open(args[0], 'w') as fh:
+            fh.write(generate(int(opts.get('--lines', 1000)), seed, int(opts.get('--functions', 10)), int(opts.get('--statements', 12))))
+    elif sys.argv[1] == 'bench':
+        if '--sizes' in opts:
+            sizes = [int(n) for n in opts['--sizes'].split(',')]
+        rounds = int(opts.get('--rounds', rounds))
+        bench(opts.get('--bug-type', 'Re-entrancy'), sizes, opts.get('--plot', 'scaling.png'), seed)
+    else:
+        printUsage(sys.argv[0])
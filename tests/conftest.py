@@ -0,0 +1,5 @@
+import os, sys
+
+"""The modules of SolidiFI are imported from the repository root, which also holds the configs and bug snippets they read"""
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
@@ -0,0 +1,93 @@
+import os
+import json
+
+"""Writes the tool_results tree of a small made-up campaign, for the inspection tests
+
+Every tool has a folder per bug type with 50 buggy contracts, each with one to three injected bugs at lines
+20, 40 and 60 and a report in the tool's own format. Some injected bugs are reported with the right code,
+some with the code of another bug type and some not at all. Reports also hold findings outside the injected
+code: at line 8 by every tool (excluded by majority), at line 9 by Mythril and Smartcheck on a few contracts
+(Mythril reports are matched against any contract), at line 12 with codes of no bug type ("Other") and at
+line 100 plus the index of the folder's bug type with its code.
+"""
+
+tools = ["Securify", "Mythril", "Smartcheck", "Slither"]
+contracts = range(1, 51)
+
+#tool -> bug type -> codes, as in inspection.bug_codes
+codes = {
+    'Securify':{'Unhandled-Exceptions':'UnhandledException', 'TOD':'TODAmount', 'Unchecked-Send':'UnrestrictedEtherFlow', 'Re-entrancy':'DAO'},
+    'Mythril':{'Unhandled-Exceptions':'Unchecked Call Return Value', 'Timestamp-Dependency':'Dependence on predictable environment variable',
+               'Overflow-Underflow':'Integer Overflow', 'tx.origin':'Use of tx.origin', 'Unchecked-Send':'Unprotected Ether Withdrawal',
+               'Re-entrancy':'State change after external call'},
+    'Smartcheck':{'Unhandled-Exceptions':'SOLIDITY_UNCHECKED_CALL', 'Timestamp-Dependency':'SOLIDITY_EXACT_TIME',
+                  'Overflow-Underflow':'SOLIDITY_UINT_CANT_BE_NEGATIVE', 'tx.origin':'SOLIDITY_TX_ORIGIN', 'Re-entrancy':'SOLIDITY_ETRNANCY'},
+    'Slither':{'Unhandled-Exceptions':'unchecked-lowlevel', 'Timestamp-Dependency':'timestamp', 'tx.origin':'tx-origin', 'Re-entrancy':'reentrancy-eth'},
+}
+other_codes = {'Securify':'MissingInputValidation', 'Mythril':'Exception State', 'Smartcheck':'SOLIDITY_LOCKED_MONEY', 'Slither':'naming-convention'}
+bug_types = {
+    'Securify':['Re-entrancy','Unchecked-Send','Unhandled-Exceptions','TOD'],
+    'Mythril':['Re-entrancy','Timestamp-Dependency','Unchecked-Send','Unhandled-Exceptions','Overflow-Underflow','tx.origin'],
+    'Smartcheck':['Re-entrancy','Timestamp-Dependency','Unhandled-Exceptions','Overflow-Underflow','tx.origin'],
+    'Slither':['Re-entrancy','Timestamp-Dependency','Unhandled-Exceptions','tx.origin'],
+}
+
+def get_bug_log(tool, bug_type, cs):
+    return [(loc, 5) for loc in (20, 40, 60)[0:1+(cs+bug_types[tool].index(bug_type))%3]]
+
+def get_findings(tool, bug_type, cs):
+    """(line, code) of the findings of a tool on one buggy contract"""
+    findings = []
+    bug_log = get_bug_log(tool, bug_type, cs)
+    other_type = [t for t in bug_types[tool] if t != bug_type][cs % (len(bug_types[tool])-1)]
+    n = cs+tools.index(tool)+bug_types[tool].index(bug_type)
+    if n % 2 == 0:
+        findings.append((bug_log[0][0]+1, codes[tool][bug_type]))
+    if len(bug_log) > 1 and n % 3 != 1:
+        findings.append((bug_log[1][0]+2, codes[tool][other_type]))
+    if len(bug_log) > 2 and n % 4 == 1:
+        findings.append((bug_log[2][0]+4, codes[tool][bug_type]))
+    if cs % 5 in (0, 1):
+        findings.append((8, codes[tool]['Unhandled-Exceptions']))
+    if tool == 'Mythril' and cs in (3, 7, 30):
+        findings.append((9, codes[tool]['tx.origin']))
+    if tool == 'Smartcheck' and cs in (3, 11):
+        findings.append((9, codes[tool]['tx.origin']))
+    if cs % 7 == 0:
+        findings.append((12, other_codes[tool]))
+    if cs % 4 == 0:
+        findings.append((100+bug_types[tool].index(bug_type), codes[tool][bug_type]))
+    return findings
+
+def write_report(tool, path, cs, findings):
+    with open(path, 'w') as fh:
+        if tool == 'Slither':
+            detectors = [{'check':code, 'impact':'High', 'confidence':'Medium',
+                          'description':"C.f() (buggy_{0}.sol#{1}) is flagged\n".format(cs, line), 'elements':[]} for line, code in findings]
+            json.dump({'success':True, 'error':None, 'results':{'detectors':detectors}}, fh)
+            return
+        for line, code in findings:
+            if tool == 'Securify':
+                fh.write("Violation for {0} in contract 'C':\n    |    uint x = 1;\n  > |    msg.sender.transfer(x);\n"
+                         "at /project/buggy_{1}.sol({2})\n\n".format(code, cs, line))
+            elif tool == 'Mythril':
+                fh.write("==== {0} ====\nSWC ID: 101\nSeverity: High\nContract: C\n--------------------\n"
+                         "In file: buggy_{1}.sol:{2}\n\nmsg.sender.transfer(x)\n\n--------------------\n\n".format(code, cs, line))
+            elif tool == 'Smartcheck':
+                fh.write("ruleId: {0}\npatternId: 12e802\nseverity: 2\nline: {1}\ncolumn: 8\ncontent: x\n\n".format(code, line))
+
+def make_campaign(main_dir, tools=tools):
+    """Write the bug logs, buggy contracts and reports of every tool, bug type and contract under main_dir"""
+    for tool in tools:
+        for bug_type in bug_types[tool]:
+            injected_scs = os.path.join(main_dir, tool, "analyzed_buggy_contracts", bug_type)
+            os.makedirs(os.path.join(injected_scs, "results"), exist_ok=True)
+            for cs in contracts:
+                with open(os.path.join(injected_scs, "BugLog_{0}.csv".format(cs)), 'w') as fh:
+                    fh.write("loc,length,bug type,approach\n")
+                    for loc, length in get_bug_log(tool, bug_type, cs):
+                        fh.write("{0},{1},{2},code snippet injection\n".format(loc, length, bug_type))
+                with open(os.path.join(injected_scs, "buggy_{0}.sol".format(cs)), 'w') as fh:
+                    fh.write("pragma solidity ^0.5.0;\ncontract C {}\n")
+                ext = ".json" if tool == 'Slither' else ".txt"
+                write_report(tool, os.path.join(injected_scs, "results", "buggy_{0}.sol{1}".format(cs, ext)), cs, get_findings(tool, bug_type, cs))
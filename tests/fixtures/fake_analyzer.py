@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+
+import sys, time
+
+"""Stands in for an analyzer in the tool runner tests
+
+fake_analyzer.py sleep <seconds>: report one finding, then hang
+fake_analyzer.py malformed [<output file>]: write a truncated Slither JSON report to stdout or to the output file
+fake_analyzer.py batch <file> ...: report a SmartCheck finding per file, each after a marker line naming the file
+"""
+
+def finding(rule, line):
+    return "ruleId: {0}\npatternId: 12e802\nseverity: 2\nline: {1}\ncolumn: 8\ncontent: tx.origin\n\n".format(rule, line)
+
+if __name__ == "__main__":
+    mode = sys.argv[1]
+    if mode == 'sleep':
+        sys.stdout.write(finding("SOLIDITY_TX_ORIGIN", 3))
+        sys.stdout.flush()
+        time.sleep(float(sys.argv[2]))
+    elif mode == 'malformed':
+        report = '{"success": true, "results": {"detectors": [{"check": "tx-origin", "descr'
+        if len(sys.argv) > 2:
+            with open(sys.argv[2], 'w') as fh:
+                fh.write(report)
+        else:
+            sys.stdout.write(report)
+    elif mode == 'batch':
+        for i, f in enumerate(sys.argv[2:]):
+            sys.stdout.write("==> {0} <==\n".format(f))
+            sys.stdout.write(finding("SOLIDITY_TX_ORIGIN", 10+i))
@@ -0,0 +1,44 @@
+import os
+import pytest
+import conftest
+import planner
+import solidifi
+
+@pytest.fixture
+def inject(tmp_path, monkeypatch):
+    """Bug log of contracts/4.sol injected with several comma-separated bug types, with solparse"""
+    monkeypatch.chdir(conftest.root)
+    monkeypatch.setattr(solidifi, "ast_parser", "solparse")
+    def inject(bug_types):
+        solidifi.clear_globals()
+        solidifi.inject_contract(os.path.join("contracts", "4.sol"), bug_types, str(tmp_path/"buggy"), str(tmp_path/"ast"))
+        return list(solidifi.BugLog)
+    return inject
+
+def count(bug_log, bug_type, form):
+    return len([bug for bug in bug_log if bug['bug type'] == bug_type and os.path.dirname(bug['snippet']) == form])
+
+def test_types_take_turns(inject):
+    """Only Timestamp-Dependency has statement snippets; the function locations go to both types in turn"""
+    bug_log = inject("Timestamp-Dependency,Re-entrancy")
+    assert count(bug_log, "Re-entrancy", "ts") == 0 and count(bug_log, "Timestamp-Dependency", "ts") > 0
+    tf_types = [bug['bug type'] for bug in bug_log if os.path.dirname(bug['snippet']) == 'tf']
+    assert len(tf_types) > 2
+    assert tf_types == [("Timestamp-Dependency", "Re-entrancy")[i % 2] for i in range(len(tf_types))]
+    """Each line holds at most one snippet"""
+    assert len(set(bug['loc'] for bug in bug_log)) == len(bug_log)
+
+def test_quotas_per_type(inject, monkeypatch):
+    """The budget applies to every type, split over the forms the type has snippets of"""
+    monkeypatch.setattr(planner, "max_bugs", 4)
+    bug_log = inject("Timestamp-Dependency,Re-entrancy")
+    assert (count(bug_log, "Timestamp-Dependency", "ts"), count(bug_log, "Timestamp-Dependency", "tf")) == (2, 2)
+    assert count(bug_log, "Re-entrancy", "tf") == 4
+    assert len(bug_log) == 8
+
+def test_quota_carries_over(inject, monkeypatch):
+    """An odd budget rounds the statement share up and leaves the rest to function snippets"""
+    monkeypatch.setattr(planner, "max_bugs", 3)
+    bug_log = inject("Timestamp-Dependency,TOD,Unchecked-Send")
+    assert (count(bug_log, "Timestamp-Dependency", "ts"), count(bug_log, "Timestamp-Dependency", "tf")) == (2, 1)
+    assert count(bug_log, "TOD", "tf") == 3 and count(bug_log, "Unchecked-Send", "tf") == 3
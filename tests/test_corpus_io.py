@@ -0,0 +1,49 @@
+import io
+import os
+import tarfile
+import zipfile
+import pytest
+
+import conftest
+import corpus_io
+import solidifi
+
+def make_tar(path, members):
+    with tarfile.open(path, 'w') as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+def test_same_file_name_in_different_folders(tmp_path, monkeypatch):
+    with open(os.path.join(conftest.root, "contracts", "4.sol"), 'rb') as fh:
+        source = fh.read()
+    corpus = str(tmp_path/"corpus.tar")
+    make_tar(corpus, [("a/4.sol", source), ("b/4.sol", source.replace(b"pragma solidity", b"// b\npragma solidity", 1))])
+    assert [name for name, data in corpus_io.iter_contracts(corpus)] == ["a/4.sol", "b/4.sol"]
+
+    monkeypatch.chdir(conftest.root)
+    monkeypatch.setattr(solidifi, "ast_parser", "solparse")
+    output = str(tmp_path/"out.zip")
+    counts = corpus_io.inject_corpus(corpus, ["Re-entrancy"], output)
+    assert counts == {'contracts':2, 'failed':0}
+    with zipfile.ZipFile(output) as zf:
+        names = zf.namelist()
+        assert len(names) == len(set(names))
+        assert b"// b" not in zf.read("Re-entrancy/a/buggy_4.sol")
+        assert b"// b" in zf.read("Re-entrancy/b/buggy_4.sol")
+    assert {"Re-entrancy/a/BugLog_4.csv", "Re-entrancy/b/BugLog_4.csv", "ast/a/4.json", "ast/b/4.json"} <= set(names)
+
+@pytest.mark.parametrize("name", ["../4.sol", "/tmp/4.sol", "a/../../4.sol"])
+def test_paths_outside_the_corpus_are_refused(tmp_path, name):
+    corpus = str(tmp_path/"corpus.tar")
+    make_tar(corpus, [(name, b"contract C {}")])
+    with pytest.raises(ValueError):
+        list(corpus_io.iter_contracts(corpus))
+
+def test_duplicate_names_are_refused(tmp_path):
+    corpus = str(tmp_path/"corpus.jsonl")
+    with open(corpus, 'w') as fh:
+        fh.write('{"name": "a/1.sol", "source": "contract C {}"}\n{"name": "a/./1.sol", "source": "contract D {}"}\n')
+    with pytest.raises(ValueError):
+        list(corpus_io.iter_contracts(corpus))
@@ -0,0 +1,30 @@
+import os
+import conftest
+import solidifi
+
+def read(path):
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+def test_inject_all_matches_per_type_injection(tmp_path, monkeypatch):
+    """One AST and BIP pass over contracts/4.sol gives every bug type the buggy contract and bug log of its own run"""
+    monkeypatch.chdir(conftest.root)
+    monkeypatch.setattr(solidifi, "ast_parser", "solparse")
+    contract_file = os.path.join("contracts", "4.sol")
+    bug_types = [bug_info['bug_type'] for bug_info in solidifi.get_bug_types()]
+    assert len(bug_types) > 1
+
+    solidifi.clear_globals()
+    results = solidifi.inject_all(contract_file, bug_types, str(tmp_path/"all"), str(tmp_path/"ast_all"))
+    assert sorted(results) == sorted(bug_types)
+    """The shared copy of the source is removed"""
+    assert sorted(os.listdir(str(tmp_path/"all"))) == sorted(bug_types)
+
+    for bug_type in bug_types:
+        buggy_dir = str(tmp_path/"single"/bug_type)
+        solidifi.clear_globals()
+        buggy_file = solidifi.inject_contract(contract_file, bug_type, buggy_dir, str(tmp_path/"ast_single"))
+        assert sorted(os.listdir(buggy_dir)) == sorted(os.listdir(str(tmp_path/"all"/bug_type))) == ["BugLog_4.csv", "buggy_4.sol"]
+        assert read(results[bug_type]['buggy_file']) == read(buggy_file)
+        assert len(solidifi.BugLog) > 0 and results[bug_type]['bug_log'] == solidifi.BugLog
+        assert read(os.path.join(buggy_dir, "BugLog_4.csv")) == read(str(tmp_path/"all"/bug_type/"BugLog_4.csv"))
@@ -0,0 +1,81 @@
+import os
+import csv
+import pytest
+import inspection
+from fixtures import campaign
+
+"""FNs and FPs rows the baseline Inspect_results gave on the campaign of fixtures/campaign.py"""
+baseline_FNs = {
+    'Securify':[('Re-entrancy', 101, 72, 17, 55), ('Unchecked-Send', 100, 71, 17, 54), ('Unhandled-Exceptions', 99, 70, 16, 54), ('TOD', 101, 71, 17, 54)],
+    'Mythril':[('Re-entrancy', 101, 72, 34, 38), ('Timestamp-Dependency', 100, 71, 33, 38), ('Unchecked-Send', 99, 70, 33, 37),
+               ('Unhandled-Exceptions', 101, 72, 34, 38), ('Overflow-Underflow', 100, 71, 33, 38), ('tx.origin', 99, 70, 33, 37)],
+    'Smartcheck':[('Re-entrancy', 101, 72, 17, 55), ('Timestamp-Dependency', 100, 71, 16, 55), ('Unhandled-Exceptions', 99, 70, 17, 53),
+                  ('Overflow-Underflow', 101, 72, 17, 55), ('tx.origin', 100, 71, 16, 55)],
+    'Slither':[('Re-entrancy', 101, 71, 17, 54), ('Timestamp-Dependency', 100, 70, 17, 53), ('Unhandled-Exceptions', 99, 70, 16, 54), ('tx.origin', 101, 72, 17, 55)],
+}
+baseline_FPs = {
+    'Securify':[('Unhandled-Exceptions', 0, 32, 32), ('TOD', 12, 0, 12), ('Unchecked-Send', 12, 0, 12), ('Re-entrancy', 0, 12, 12), ('Other', 7, 0, 7)],
+    'Mythril':[('Unhandled-Exceptions', 0, 32, 32), ('Timestamp-Dependency', 0, 12, 12), ('Overflow-Underflow', 0, 12, 12), ('tx.origin', 0, 15, 15),
+               ('Unchecked-Send', 0, 12, 12), ('Re-entrancy', 0, 12, 12), ('Other', 7, 0, 7)],
+    'Smartcheck':[('Unhandled-Exceptions', 0, 32, 32), ('Timestamp-Dependency', 0, 12, 12), ('Overflow-Underflow', 12, 0, 12), ('tx.origin', 13, 1, 14),
+                  ('Re-entrancy', 0, 12, 12), ('Other', 7, 0, 7)],
+    'Slither':[('Unhandled-Exceptions', 0, 32, 32), ('Timestamp-Dependency', 0, 12, 12), ('tx.origin', 12, 0, 12), ('Re-entrancy', 0, 12, 12), ('Other', 7, 0, 7)],
+}
+FN_columns = ['BugType', 'InjectedBugs', 'FalseNegatives', 'MisClassified', 'UnDetected']
+FP_columns = ['BugType', 'FalsePositives', 'ExcludedByMajority', 'Total']
+
+@pytest.fixture(scope="module")
+def main_dir(tmp_path_factory):
+    main_dir = str(tmp_path_factory.mktemp("campaign")/"tool_results")
+    campaign.make_campaign(main_dir)
+    return main_dir
+
+def as_rows(rows, columns):
+    return [tuple(row[c] if c == 'BugType' else int(row[c]) for c in columns) for row in rows]
+
+def read_rows(csv_file, columns):
+    with open(csv_file) as fh:
+        return as_rows(csv.DictReader(fh), columns)
+
+def test_inspect_results_matches_baseline(main_dir, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(inspection, "main_dir", main_dir)
+    os.makedirs("FNs")
+    os.makedirs("FPs")
+    inspection.Inspect_results(campaign.tools)
+    for tool in campaign.tools:
+        assert read_rows(os.path.join("FNs", tool+"_FNs.csv"), FN_columns) == baseline_FNs[tool]
+        assert read_rows(os.path.join("FPs", tool+"_FPs.csv"), FP_columns) == baseline_FPs[tool]
+
+def test_mythril_reports_are_matched_against_every_contract():
+    """A Mythril report outside injected code is excluded when enough reports at its line exist in any contract"""
+    non_injected = [{'tool':'Mythril', 'lines':9, 'bugType':'Use of tx.origin', 'contract':cs} for cs in (3, 30)]
+    non_injected.append({'tool':'Smartcheck', 'lines':9, 'bugType':'SOLIDITY_TX_ORIGIN', 'contract':30})
+    coded = inspection.get_coded_non_injected(non_injected)
+    mythril = dict((row['BugType'], row) for row in inspection.get_fps('Mythril', coded, [3, 30]))
+    smartcheck = dict((row['BugType'], row) for row in inspection.get_fps('Smartcheck', coded, [3, 30]))
+    assert (mythril['tx.origin']['FalsePositives'], mythril['tx.origin']['ExcludedByMajority']) == (0, 2)
+    assert (smartcheck['tx.origin']['FalsePositives'], smartcheck['tx.origin']['ExcludedByMajority']) == (0, 1)
+    assert mythril['Other']['Total'] == 0
+
+def test_aggregator_totals_match_inspect_results(main_dir):
+    """Contracts scored one job at a time, in any order and some of them twice, add up to the Inspect_results rows"""
+    aggregator = inspection.Aggregator(interval=0)
+    jobs = []
+    for tool in campaign.tools:
+        for bug_type in campaign.bug_types[tool]:
+            injected_scs = os.path.join(main_dir, tool, "analyzed_buggy_contracts", bug_type)
+            for cs in campaign.contracts:
+                jobs.append({'tool':tool, 'file':os.path.join(injected_scs, "buggy_{0}.sol".format(cs)), 'contract':cs})
+    aggregator.expect(len(jobs))
+    jobs.reverse()
+    """A batch job covering contracts that are scored again later"""
+    aggregator.on_done({'tool':jobs[0]['tool'], 'batch':jobs[0:3]}, {})
+    for job in jobs:
+        aggregator.on_done(job, {'status':'ok'})
+
+    summary = aggregator.get_summary()
+    assert (summary['done'], summary['expected']) == (len(jobs), len(jobs))
+    for tool in campaign.tools:
+        assert as_rows(summary['FNs'][tool], FN_columns) == sorted(baseline_FNs[tool])
+        assert as_rows(summary['FPs'][tool], FP_columns) == baseline_FPs[tool]
@@ -0,0 +1,68 @@
+import os, sys
+import time
+import signal
+import subprocess
+
+import conftest
+import job_queue
+import campaign_db
+
+"""A command task that marks its start, runs for a while and then marks its end"""
+task_script = """
+import sys, time
+open(sys.argv[1], 'a').write('start\\n')
+time.sleep(float(sys.argv[3]))
+open(sys.argv[2], 'a').write('done\\n')
+"""
+
+def wait_for(predicate, timeout=30):
+    end = time.time()+timeout
+    while time.time() < end:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+def read_lines(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path) as fh:
+        return fh.read().split()
+
+def test_killed_worker_task_is_released_and_finishes_once(tmp_path, monkeypatch):
+    db_path = str(tmp_path/"queue.db")
+    started = str(tmp_path/"started")
+    finished = str(tmp_path/"finished")
+    conn = job_queue.connect(db_path)
+    task_id = job_queue.submit(conn, "test", 'command', {'argv':[sys.executable, "-c", task_script, started, finished, "3"]})
+
+    """The first worker is killed, with the command it runs, while the task is in progress"""
+    proc = subprocess.Popen([sys.executable, os.path.join(conftest.root, "job_queue.py"), db_path, "worker", "--name", "w1", "--lease", "2"],
+                            cwd=str(tmp_path), start_new_session=True, stdout=subprocess.DEVNULL)
+    try:
+        assert wait_for(lambda: read_lines(started) == ['start'])
+        assert conn.execute("SELECT state, worker FROM tasks WHERE id = ?", (task_id,)).fetchone() == ('leased', 'w1')
+    finally:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+    assert read_lines(finished) == []
+
+    """Once the lease expires, the second worker takes the task again and runs it to the end"""
+    monkeypatch.setattr(job_queue, "lease_seconds", 2)
+    monkeypatch.setattr(job_queue, "poll_interval", 0.1)
+    monkeypatch.setattr(campaign_db, "journal_mode", campaign_db.journal_mode)
+    assert job_queue.work(db_path, "w2") == 1
+    assert read_lines(started) == ['start', 'start']
+    assert read_lines(finished) == ['done']
+    state, worker, attempts = conn.execute("SELECT state, worker, attempts FROM tasks WHERE id = ?", (task_id,)).fetchone()
+    assert (state, worker, attempts) == ('done', 'w2', 2)
+    assert job_queue.pending(conn) == 0
+    conn.close()
+
+def test_workers_open_the_campaign_store_without_wal(tmp_path, monkeypatch):
+    """Workers of several hosts may share the store over a network filesystem, where WAL does not work"""
+    monkeypatch.setattr(campaign_db, "journal_mode", "WAL")
+    assert job_queue.work(str(tmp_path/"queue.db"), "w1") == 0
+    conn = campaign_db.connect(str(tmp_path/"campaign.db"))
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ('delete',)
+    conn.close()
@@ -0,0 +1,47 @@
+import pytest
+import minimize
+
+def get_results():
+    """Tool A misses half of the bugs of type T, one more on contract 4; tool B misses none. Only contract 4 has a T2 bug."""
+    results = {('A', 'T'):dict((cs, [2, 1]) for cs in (1, 2, 3, 5, 6)), ('B', 'T'):dict((cs, [2, 0]) for cs in range(1, 7)),
+               ('A', 'T2'):{4:[1, 1]}}
+    results[('A', 'T')][4] = [2, 2]
+    return results
+
+def with_rate(rates, pair, rate):
+    rates = dict(rates)
+    rates[pair] = rate
+    return rates
+
+def test_rates():
+    rates = minimize.get_rates(get_results(), [1, 4])
+    assert rates == {('A', 'T'):0.75, ('B', 'T'):0.0, ('A', 'T2'):1.0}
+    assert minimize.get_rates(get_results(), [1])[('A', 'T2')] is None
+
+def test_error():
+    full_rates = {('A', 'T'):0.5, ('B', 'T'):0.2, ('A', 'T2'):1.0}
+    assert minimize.get_error(full_rates, dict(full_rates)) == 0
+    """Deviations within the tolerance are free, the part beyond it counts"""
+    assert minimize.get_error(full_rates, with_rate(full_rates, ('B', 'T'), 0.24)) == 0
+    assert minimize.get_error(full_rates, with_rate(full_rates, ('A', 'T'), 0.6)) == pytest.approx(0.05)
+    """A pair without injected bugs in the subset counts 1"""
+    assert minimize.get_error(full_rates, with_rate(full_rates, ('A', 'T2'), None)) == 1
+    """So does every pair of tools ranked the other way round"""
+    assert minimize.get_error(full_rates, with_rate(full_rates, ('A', 'T'), 0.2)) == pytest.approx(1+0.25)
+
+def test_minimize():
+    results = get_results()
+    costs = {1:5.0, 2:1.0, 3:3.0, 5:2.0, 6:4.0}
+    subset = minimize.minimize(results, costs)
+    """Contract 4 holds the only T2 bug, the cheapest of the others bring the T rates within tolerance"""
+    assert subset == [2, 3, 4, 5]
+    assert minimize.get_error(minimize.get_rates(results, range(1, 7)), minimize.get_rates(results, subset)) == 0
+
+def test_minimize_tolerance(monkeypatch):
+    monkeypatch.setattr(minimize, "tolerance", 0.5)
+    assert minimize.minimize(get_results(), {}) == [4]
+
+def test_redundant_contracts_are_dropped():
+    """Contract 1 has the FN rates of the whole campaign and is picked first, but 2 and 3, needed for tool B, give them as well"""
+    results = {('A', 'T'):{1:[2, 1], 2:[2, 2], 3:[2, 0]}, ('B', 'T'):{2:[1, 1]}, ('A', 'U'):{1:[2, 2], 3:[3, 3]}}
+    assert minimize.minimize(results, {}) == [2, 3]
@@ -0,0 +1,53 @@
+import os
+import pytest
+import conftest
+import planner
+import solidifi
+import solparse
+
+@pytest.fixture
+def bip(tmp_path, monkeypatch):
+    """Statement locations of contracts/4.sol and its functions, from the solparse AST"""
+    contract_file = os.path.join(conftest.root, "contracts", "4.sol")
+    monkeypatch.setattr(solidifi, "src_contr_file", contract_file)
+    ast = solparse.generate_ast(contract_file, str(tmp_path/"4.json"))
+    functions = [node for node in solidifi.get_all_childs(ast) if node['name'] in ('FunctionDefinition', 'ModifierDefinition')]
+    return solidifi.get_potential_locs(ast, 's'), functions
+
+def get_strata(BIP, functions):
+    return [(loc['name'], planner.enclosing_function(loc, functions)) for loc in BIP]
+
+def test_plan_is_deterministic_per_seed(bip):
+    BIP, functions = bip
+    plan = planner.plan_injection(BIP, functions, "1:Re-entrancy:ts:x")
+    assert plan == planner.plan_injection(list(BIP), functions, "1:Re-entrancy:ts:x")
+    assert plan != planner.plan_injection(BIP, functions, "2:Re-entrancy:ts:x")
+    assert sorted(plan, key=lambda loc: loc['src']) == sorted(BIP, key=lambda loc: loc['src'])
+
+def test_plan_spreads_over_strata(bip):
+    """The first locations of the plan come one from each (node kind, function) stratum"""
+    BIP, functions = bip
+    strata = set(get_strata(BIP, functions))
+    assert len(strata) > 1 and len(strata) < len(BIP)
+    plan = planner.plan_injection(BIP, functions, 4)
+    assert set(get_strata(plan[0:len(strata)], functions)) == strata
+
+def inject(tmp_path, seed):
+    buggy_dir = str(tmp_path/"buggy_{0}".format(seed))
+    solidifi.clear_globals()
+    buggy_file = solidifi.inject_contract(os.path.join("contracts", "4.sol"), "Timestamp-Dependency", buggy_dir, str(tmp_path/"ast"))
+    with open(buggy_file, 'rb') as fh:
+        return fh.read(), list(solidifi.BugLog)
+
+def test_injection_is_deterministic_per_seed(tmp_path, monkeypatch):
+    monkeypatch.chdir(conftest.root)
+    monkeypatch.setattr(solidifi, "ast_parser", "solparse")
+    monkeypatch.setattr(planner, "max_bugs", 4)
+    monkeypatch.setattr(planner, "seed", 1)
+    first, bug_log = inject(tmp_path, 1)
+    """Two bugs of each form under a budget of four"""
+    assert len(bug_log) == 4
+    assert sorted(os.path.dirname(bug['snippet']) for bug in bug_log) == ['tf', 'tf', 'ts', 'ts']
+    assert inject(tmp_path, 1) == (first, bug_log)
+    monkeypatch.setattr(planner, "seed", 2)
+    assert inject(tmp_path, 2)[0] != first
@@ -0,0 +1,38 @@
+import pytest
+import sampling
+
+@pytest.mark.parametrize("k, n, expected", [
+    (5, 10, (0.2366, 0.7634)),
+    (0, 10, (0.0, 0.2775)),
+    (10, 10, (0.7225, 1.0)),
+    (1, 100, (0.0018, 0.0545)),
+])
+def test_wilson_interval(k, n, expected):
+    assert sampling.wilson_interval(k, n) == pytest.approx(expected, abs=1e-4)
+
+def test_wilson_interval_without_trials():
+    assert sampling.wilson_interval(0, 0) == (0.0, 1.0)
+
+def get_stats(contracts, ibugs=0, fns=0, fp_contracts=0):
+    stats = sampling.new_stats()
+    for i in range(contracts):
+        sampling.add_score(stats, {'ibugs':ibugs, 'false_negatives':[None]*(fns if i == 0 else 0)})
+        sampling.add_fps(stats, 1 if i < fp_contracts else 0)
+    return stats
+
+def test_add_score():
+    stats = get_stats(3, ibugs=4, fns=2, fp_contracts=1)
+    assert (stats['contracts'], stats['ibugs'], stats['fns'], stats['fp_contracts']) == (3, 12, 2, 1)
+
+def test_is_settled():
+    """With no FP, the FP interval [0, z^2/(n+z^2)] is narrower than 0.2 from 16 contracts on"""
+    assert not sampling.is_settled(get_stats(15, ibugs=10))
+    assert sampling.is_settled(get_stats(16, ibugs=10))
+    """Both intervals must be narrow"""
+    assert not sampling.is_settled(get_stats(16, ibugs=1, fns=8))
+    assert not sampling.is_settled(get_stats(16, ibugs=10, fp_contracts=8))
+
+def test_min_contracts(monkeypatch):
+    monkeypatch.setattr(sampling, "width", 1.0)
+    assert not sampling.is_settled(get_stats(sampling.min_contracts-1, ibugs=10))
+    assert sampling.is_settled(get_stats(sampling.min_contracts, ibugs=10))
@@ -0,0 +1,71 @@
+import os, sys
+import json
+import time
+import socket
+import subprocess
+import pytest
+from conftest import root
+
+def request(socket_path, method, path, body=None, timeout=10):
+    """One request on its own connection, read until the server closes it"""
+    data = json.dumps(body).encode() if body is not None else b''
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    conn.connect(socket_path)
+    conn.sendall("{0} {1} HTTP/1.1\r\nContent-Length: {2}\r\nConnection: close\r\n\r\n".format(method, path, len(data)).encode() + data)
+    start = time.time()
+    response = b''
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        response += chunk
+    conn.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return int(head.split(b' ')[1]), json.loads(body), time.time()-start
+
+@pytest.fixture
+def service(tmp_path):
+    socket_path = str(tmp_path/"solidifi.sock")
+    proc = subprocess.Popen([sys.executable, "solidifi.py", "serve", "--socket", socket_path, "--workers", "2", "--parser", "solparse"],
+                            cwd=root, stdout=subprocess.DEVNULL)
+    deadline = time.time()+30
+    while not os.path.exists(socket_path):
+        assert proc.poll() is None and time.time() < deadline
+        time.sleep(0.1)
+    yield socket_path
+    proc.terminate()
+    proc.wait()
+
+def get_source():
+    with open(os.path.join(root, "contracts", "4.sol")) as fh:
+        return fh.read()
+
+def test_first_connection_is_closed(service):
+    """The first request of each worker must not leave its connection open"""
+    for i in range(4):
+        source = get_source() + "\n" * i
+        status, response, elapsed = request(service, 'POST', '/inject', {'name':'4.sol', 'source':source, 'bug_type':'Re-entrancy'})
+        assert status == 200
+        assert len(response['bug_log']) > 0
+        assert elapsed < 5
+
+def test_ast_is_cached(service):
+    body = {'name':'4.sol', 'source':get_source(), 'bug_type':'Re-entrancy'}
+    first = request(service, 'POST', '/inject', body)[1]
+    second = request(service, 'POST', '/inject', body)[1]
+    assert not first['ast_cached'] and second['ast_cached']
+    assert first['buggy_source'] == second['buggy_source']
+    assert request(service, 'GET', '/health')[1] == {'status':'ok', 'cached_asts':1}
+
+@pytest.mark.parametrize("name", ["..", "", "dir/", "4.txt", ".sol", 4])
+def test_invalid_name(service, name):
+    status, response, _ = request(service, 'POST', '/inject', {'name':name, 'source':get_source(), 'bug_type':'Re-entrancy'})
+    assert status == 400
+    assert "Invalid contract name" in response['error']
+
+def test_bad_requests(service):
+    assert request(service, 'POST', '/inject', {'name':'4.sol', 'source':get_source(), 'bug_type':'No-such-bug'})[0] == 422
+    assert request(service, 'POST', '/inject', {'name':'4.sol', 'bug_type':'TOD'})[0] == 400
+    assert request(service, 'POST', '/inject', {'name':'4.sol', 'source':'contract {', 'bug_type':'TOD'})[0] == 422
+    assert request(service, 'GET', '/nothing')[0] == 404
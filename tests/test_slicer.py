@@ -0,0 +1,60 @@
+import os
+import json
+import shutil
+import pytest
+from conftest import root
+import inject_file
+import slicer
+
+@pytest.fixture
+def contract(tmp_path):
+    """contracts/4.sol with its legacy AST, the solc --ast-json output bundled as contracts/4.json"""
+    ast_json_file = str(tmp_path/"4.json")
+    shutil.copyfile(os.path.join(root, "contracts", "4.json"), ast_json_file)
+    inject_file.preprocess_json_file(ast_json_file)
+    with open(ast_json_file) as fh:
+        ast = json.load(fh)
+    with open(os.path.join(root, "contracts", "4.sol"), 'rb') as fh:
+        return fh.read(), ast
+
+def test_line_map(contract):
+    data, ast = contract
+    """A bug injected into burnCoins keeps the constructor and transfer, which write the state burnCoins reads, and toWei they call"""
+    sliced, line_map = slicer.slice_source(data, ast, [{'loc':105, 'length':3}])
+    full_lines = data.split(b'\n')
+    sliced_lines = sliced.split(b'\n')
+    assert len(line_map) == len(sliced_lines)
+    assert line_map == sorted(line_map)
+    for line, full_line in zip(sliced_lines, line_map):
+        assert line == full_lines[full_line-1]
+    """The interface functions, the unused modifier and the view functions are dropped with their lines"""
+    dropped = set(range(1, len(full_lines)+1))-set(line_map)
+    assert dropped == set([18, 19, 20]) | set(range(45, 49)) | set(range(72, 75)) | set(range(76, 79))
+    assert b"function burnCoins" in sliced and b"function transfer" in sliced and b"function toWei" in sliced
+    assert b"modifier isOwner" not in sliced and b"function balanceOf" not in sliced
+
+def test_translate_lines(contract):
+    data, ast = contract
+    sliced, line_map = slicer.slice_source(data, ast, [{'loc':105, 'length':3}])
+    burn_line = sliced.split(b'\n').index(b"    function burnCoins(uint256 value) public {")+1
+    bugs = [{'tool':'Slither', 'lines':burn_line, 'bugType':'reentrancy-eth', 'contract':4}, {'tool':'Slither', 'lines':0, 'bugType':'x', 'contract':4}]
+    assert [bug['lines'] for bug in slicer.translate_lines(bugs, line_map)] == [104, 0]
+    assert slicer.translate_lines(bugs, None) is bugs
+
+def test_nothing_to_drop(contract):
+    data, ast = contract
+    assert slicer.slice_source(data, ast, [{'loc':1, 'length':data.count(b'\n')+1}]) is None
+
+def test_restore(tmp_path):
+    buggy_sc = str(tmp_path/"buggy_4.sol")
+    with open(buggy_sc+slicer.full_suffix, 'w') as fh:
+        fh.write("full\n")
+    with open(buggy_sc, 'w') as fh:
+        fh.write("sliced\n")
+    with open(slicer.map_file(buggy_sc), 'w') as fh:
+        json.dump([2], fh)
+    assert slicer.is_sliced(buggy_sc) and slicer.load_line_map(buggy_sc) == [2]
+    slicer.restore(buggy_sc)
+    assert not slicer.is_sliced(buggy_sc) and slicer.load_line_map(buggy_sc) is None
+    with open(buggy_sc) as fh:
+        assert fh.read() == "full\n"
@@ -0,0 +1,69 @@
+import pytest
+import solc_versions
+
+installed = {(0,4,24):"/opt/solc-0.4.24", (0,4,26):"/opt/solc-0.4.26", (0,5,12):"/opt/solc-0.5.12",
+             (0,6,12):"/opt/solc-0.6.12", (0,8,19):"/opt/solc-0.8.19"}
+
+@pytest.fixture
+def solc(tmp_path, monkeypatch):
+    """Pretend a fixed set of solc versions is installed, with an empty version cache"""
+    monkeypatch.setattr(solc_versions, "installed_solc", dict(installed))
+    monkeypatch.setattr(solc_versions, "version_cache", None)
+    monkeypatch.setattr(solc_versions, "cache_file", str(tmp_path/"solc_cache.json"))
+    return tmp_path
+
+def write_contract(path, pragma):
+    path.write_text("pragma solidity {0};\ncontract C {{}}\n".format(pragma) if pragma is not None else "contract C {}\n")
+    return str(path)
+
+@pytest.mark.parametrize("expr, expected", [
+    ("^0.5.0", [[('>=', (0,5,0)), ('<', (0,6,0))]]),
+    ("^0.0.3", [[('>=', (0,0,3)), ('<', (0,0,4))]]),
+    ("^1.2.0", [[('>=', (1,2,0)), ('<', (2,0,0))]]),
+    ("~0.4.2", [[('>=', (0,4,2)), ('<', (0,5,0))]]),
+    ("0.4.24", [[('=', (0,4,24))]]),
+    ("0.5", [[('>=', (0,5,0)), ('<', (0,6,0))]]),
+    (">=0.4.22 <0.6.0", [[('>=', (0,4,22)), ('<', (0,6,0))]]),
+    ("^0.4.24 || ^0.5.0", [[('>=', (0,4,24)), ('<', (0,5,0))], [('>=', (0,5,0)), ('<', (0,6,0))]]),
+])
+def test_parse_constraints(expr, expected):
+    assert solc_versions.parse_constraints(expr) == expected
+
+@pytest.mark.parametrize("pragma, expected", [
+    ("^0.4.24", (0,4,26)),
+    ("0.4.24", (0,4,24)),
+    (">=0.4.22 <0.6.0", (0,5,12)),
+    (">=0.5.11", (0,5,12)),
+    (">=0.6.0", (0,6,12)),
+    ("^0.4.24 || ^0.6.0", (0,6,12)),
+    (None, (0,8,19)),
+    ("^0.7.0", None),
+])
+def test_resolve_version(solc, pragma, expected):
+    assert solc_versions.resolve_version(write_contract(solc/"c.sol", pragma)) == expected
+
+def test_resolve_version_is_cached(solc):
+    contract = write_contract(solc/"c.sol", "^0.4.24")
+    assert solc_versions.resolve_version(contract) == (0,4,26)
+    solc_versions.installed_solc[(0,4,25)] = "/opt/solc-0.4.25"
+    assert solc_versions.resolve_version(contract) == (0,4,26)
+    """A cached version that is no longer installed is resolved again"""
+    del solc_versions.installed_solc[(0,4,26)]
+    assert solc_versions.resolve_version(contract) == (0,4,25)
+
+def test_group_by_version(solc):
+    files = [write_contract(solc/"{0}.sol".format(i), pragma) for i, pragma in enumerate(["^0.4.24", "^0.5.0", "0.4.26", "^0.7.0"])]
+    assert solc_versions.group_by_version(files) == {"/opt/solc-0.4.26":[files[0], files[2]], "/opt/solc-0.5.12":[files[1]], "solc":[files[3]]}
+
+def test_error_files_before_0_6():
+    stderr = ("contracts/1.sol:12:5: ParserError: Expected ';' but got '}'\n    }\n    ^\n"
+              "./contracts/2.sol:3:1: Warning: Source file does not specify required compiler version!\n"
+              "contracts/3.sol:7:9: TypeError: Undeclared identifier.\n")
+    assert solc_versions.get_error_files(stderr) == {"contracts/1.sol", "contracts/3.sol"}
+
+def test_error_files_from_0_6():
+    stderr = ("Warning: SPDX license identifier not provided in source file.\n --> contracts/2.sol\n\n"
+              "Warning: Unused local variable.\n --> contracts/2.sol:5:9:\n  |\n5 |         uint x;\n  |         ^^^^^^\n\n"
+              "ParserError: Expected ';' but got '}'\n  --> ./contracts/1.sol:12:5:\n   |\n12 |     }\n   |     ^\n\n"
+              "Error: Undeclared identifier.\n --> contracts/3.sol:7:9:\n  |\n")
+    assert solc_versions.get_error_files(stderr) == {"contracts/1.sol", "contracts/3.sol"}
@@ -0,0 +1,33 @@
+import os
+import json
+import shutil
+import pytest
+from conftest import root
+import inject_file
+import solparse
+
+contract = os.path.join(root, "contracts", "4.sol")
+
+@pytest.fixture
+def solc_ast(tmp_path):
+    """contracts/4.json is the output of solc --ast-json for contracts/4.sol"""
+    ast_json_file = str(tmp_path/"4.json")
+    shutil.copyfile(os.path.join(root, "contracts", "4.json"), ast_json_file)
+    inject_file.preprocess_json_file(ast_json_file)
+    with open(ast_json_file) as fh:
+        return json.load(fh)
+
+def test_same_injection_locations_as_solc(solc_ast):
+    expected = solparse.get_bips(contract, solc_ast)
+    found = solparse.get_bips(contract, solparse.parse_file(contract))
+    assert len(expected['s']) > 0 and len(expected['f']) > 0
+    assert found == expected
+
+def test_same_contract_nodes_as_solc(solc_ast):
+    ast = solparse.parse_file(contract)
+    assert ast['name'] == solc_ast['name'] == "SourceUnit"
+    assert [(node['name'], node['src']) for node in ast['children']] == [(node['name'], node['src']) for node in solc_ast['children']]
+
+def test_parse_error():
+    with pytest.raises(solparse.ParseError):
+        solparse.parse("pragma solidity ^0.5.0;\ncontract C {\n    function f() public {\n")
@@ -0,0 +1,48 @@
+import os, sys
+import gzip
+
+import conftest
+import tool_runner
+
+fake_analyzer = os.path.join(conftest.root, "tests", "fixtures", "fake_analyzer.py")
+
+def run_one(job):
+    return tool_runner.run_jobs([job])[0]
+
+def test_timeout_keeps_partial_report(tmp_path):
+    report = str(tmp_path/"buggy_1.sol.txt")
+    result = run_one({'tool':'Smartcheck', 'argv':[sys.executable, fake_analyzer, "sleep", "60"], 'report':report, 'contract':1, 'timeout':1})
+    assert result['status'] == 'timeout'
+    assert result['time'] < 30
+    assert [(bug['lines'], bug['bugType']) for bug in result['bugs']] == [(3, 'SOLIDITY_TX_ORIGIN')]
+    with gzip.open(report+".gz") as fh:
+        assert b"SOLIDITY_TX_ORIGIN" in fh.read()
+
+def test_malformed_stdout_report_gives_no_bugs(tmp_path):
+    result = run_one({'tool':'Slither', 'argv':[sys.executable, fake_analyzer, "malformed"], 'report':str(tmp_path/"buggy_1.sol.json"), 'contract':1})
+    assert result['status'] == 'ok'
+    assert result['bugs'] == []
+
+def test_malformed_output_file_gives_no_bugs(tmp_path):
+    output = str(tmp_path/"global.findings")
+    result = run_one({'tool':'Slither', 'argv':[sys.executable, fake_analyzer, "malformed", output], 'report':str(tmp_path/"buggy_1.sol.json"),
+                      'contract':1, 'output':output})
+    assert result['status'] == 'ok'
+    assert result['bugs'] == []
+
+def test_batch_report_is_split_per_contract(tmp_path):
+    batch = []
+    for cs in (1, 2, 3):
+        buggy_sc = str(tmp_path/"buggy_{0}.sol".format(cs))
+        open(buggy_sc, 'w').close()
+        batch.append({'file':buggy_sc, 'report':str(tmp_path/"results"/"buggy_{0}.sol.txt".format(cs)), 'contract':cs})
+    job = {'tool':'Smartcheck', 'argv':[sys.executable, fake_analyzer, "batch"] + [os.path.basename(c['file']) for c in batch],
+           'report':str(tmp_path/"results"/"batch_buggy_1.txt"), 'batch':batch, 'split':'marker'}
+    result = run_one(job)
+    assert result['status'] == 'ok'
+    assert [(c['contract'], [bug['lines'] for bug in c['bugs']]) for c in result['contracts']] == [(1, [10]), (2, [11]), (3, [12])]
+    for i, c in enumerate(batch):
+        with gzip.open(c['report']+".gz") as fh:
+            data = fh.read()
+        assert "line: {0}".format(10+i).encode() in data
+        assert data.count(b"ruleId") == 1
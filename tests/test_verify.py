@@ -0,0 +1,56 @@
+import os
+import random
+import pytest
+import conftest
+import solidifi
+import verify
+
+@pytest.fixture
+def injected(tmp_path, monkeypatch):
+    """contracts/4.sol with statement (ts) and function (tf) snippets of Timestamp-Dependency, injected with solparse"""
+    monkeypatch.chdir(conftest.root)
+    monkeypatch.setattr(solidifi, "ast_parser", "solparse")
+    solidifi.clear_globals()
+    buggy_file = solidifi.inject_contract(os.path.join("contracts", "4.sol"), "Timestamp-Dependency", str(tmp_path/"buggy"), str(tmp_path/"ast"))
+    with open(buggy_file, 'rb') as fh:
+        data = fh.read()
+    return data, verify.read_bug_log(str(tmp_path/"buggy"/"BugLog_4.csv"))
+
+def check_bugs(data, bug_log):
+    """Every bug log row points at the lines of its snippet"""
+    lines = data.split(b'\n')
+    for bug in bug_log:
+        assert b'\n'.join(lines[bug['loc']-1:bug['loc']-1+bug['length']]).strip() == verify.get_snippet(bug).strip()
+
+def test_replace_bug(injected):
+    data, bug_log = injected
+    check_bugs(data, bug_log)
+    """All five statement snippets are in the contract already, there is none left to swap in"""
+    ts_bug = [b for b in bug_log if b['snippet'].startswith('ts')][0]
+    assert verify.next_snippet(ts_bug, bug_log, set()) == (None, None)
+    """The first and the last function snippet in the file, so that the rows of the bugs below them have to move"""
+    tf_bugs = sorted((b for b in bug_log if b['snippet'].startswith('tf')), key=lambda b: b['loc'])
+    for bug in (tf_bugs[0], tf_bugs[-1]):
+        name, snippet = verify.next_snippet(bug, bug_log, set())
+        assert name is not None and name not in [b['snippet'] for b in bug_log]
+        data = verify.replace_bug(data, bug_log, bug, name, snippet)
+        assert bug['snippet'] == name and bug['length'] == len(snippet.splitlines())
+        check_bugs(data, bug_log)
+
+def test_remove_bugs(injected):
+    data, bug_log = injected
+    rows = len(bug_log)
+    bugs = list(bug_log)
+    random.Random(4).shuffle(bugs)
+    for i, bug in enumerate(bugs):
+        data = verify.replace_bug(data, bug_log, bug)
+        assert len(bug_log) == rows-i-1
+        check_bugs(data, bug_log)
+    """Taking every snippet out gives the original contract back"""
+    with open(os.path.join(conftest.root, "contracts", "4.sol"), 'rb') as fh:
+        assert data == fh.read()
+
+def test_replace_missing_bug(injected):
+    data, bug_log = injected
+    bug = dict(bug_log[0], loc=len(data.split(b'\n')))
+    assert verify.replace_bug(data, bug_log, bug) is None
@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+
+import os, sys, re
+import gzip
+import time
+import shutil
+import signal
+import asyncio
+import inspection
+import tracing
+import report_cache
+import resources
+
+"""Runs analyzers as subprocesses without a shell, compressing their reports and parsing them as they stream in
+
+Each run is started through resources.py, which stores its CPU time, peak RSS and I/O as <report>.usage.json.
+"""
+
+chunk_size = 65536
+kill_grace = 10
+
+def terminate(proc):
+    """Stop the analyzer and everything it spawned"""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+async def pump(stream, out, parser):
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        out.write(chunk)
+        if parser is not None:
+            parser.feed(chunk)
+
+class Collector:
+    """Keeps the combined report of a batch run in memory so it can be split per contract"""
+    def __init__(self):
+        self.data = bytearray()
+
+    def feed(self, chunk):
+        self.data += chunk
+
+def split_report(data, files, mode):
+    """Split the combined report of a batch run into one report per analyzed file
+
+    'marker' reports name each file on a line of its own before its findings,
+    'in_file' reports name the file inside every finding ("In file: <path>:<line>").
+    """
+    names = dict((os.path.basename(f), f) for f in files)
+    reports = dict((f, bytearray()) for f in files)
+    if mode == 'marker':
+        current = None
+        for line in data.splitlines(keepends=True):
+            name = os.path.basename(line.strip().decode(errors='ignore').strip('=<> '))
+            if name in names:
+                current = names[name]
+                continue
+            if current is not None:
+                reports[current] += line
+    elif mode == 'in_file':
+        for block in re.split(rb'\n(?=\n)', data):
+            m = re.search(rb'In file:\s*(\S+?\.sol)', block)
+            if m is not None and os.path.basename(m.group(1).decode(errors='ignore')) in names:
+                reports[names[os.path.basename(m.group(1).decode(errors='ignore'))]] += block.lstrip(b'\n') + b'\n\n'
+    return dict((f, bytes(r)) for f, r in reports.items())
+
+def store_batch(job, data, usage=None):
+    """Write the per-contract reports of a batch job, with an equal share of its usage, and parse each of them"""
+    contracts = []
+    split = split_report(data, [c['file'] for c in job['batch']], job['split'])
+    usage = resources.share(usage, len(job['batch']))
+    for c in job['batch']:
+        with gzip.open(c['report']+".gz", 'wb') as out:
+            out.write(split[c['file']])
+        if usage is not None:
+            resources.save(usage, resources.usage_file(c['report']))
+        try:
+            bugs = inspection.parse_report(job['tool'], split[c['file']], c['contract'])
+        except ValueError:
+            bugs = []
+        contracts.append({'file':c['file'], 'report':c['report'], 'contract':c['contract'], 'bugs':bugs, 'usage':usage})
+    return contracts
+
+async def run_tool(job):
+    """Run one analyzer job
+
+    job is a dict with 'tool', 'argv', 'report' and optionally 'contract', 'timeout', 'cwd',
+    'output' (a file written by the analyzer that holds the report instead of its stdout) and
+    'file' (the analyzed contract, which makes the report cacheable, see report_cache).
+    The report is stored as <report>.gz and the bugs found in it are returned with the run status and,
+    unless the report came from the cache, its resource usage.
+    Batch jobs analyze several files at once: 'batch' lists dicts with 'file', 'report' and 'contract'
+    and 'split' tells split_report how to divide the combined report between them.
+    """
+    start = time.time()
+    os.makedirs(os.path.dirname(job['report']) or '.', exist_ok=True)
+
+    """Reuse the report of an earlier run of the same tool, version and options on an identical contract"""
+    key = report_cache.get_key(job) if report_cache.enabled else None
+    if key is not None and report_cache.get(key, job['report']+".gz"):
+        with gzip.open(job['report']+".gz", 'rb') as fh:
+            data = fh.read()
+        try:
+            bugs = inspection.parse_report(job['tool'], data, job.get('contract'))
+        except ValueError:
+            bugs = []
+        return {'tool':job['tool'], 'report':job['report'], 'status':'ok', 'returncode':0, 'time':time.time()-start,
+                'bugs':bugs, 'cached':True}
+
+    parser = None
+    if job.get('batch') is not None:
+        parser = Collector()
+    elif job.get('output') is None and (job['tool'] in inspection.violation_patterns or job['tool'] == 'Slither'):
+        parser = inspection.ReportParser(job['tool'], job.get('contract'))
+
+    status = 'ok'
+    argv = job['argv']
+    usage_path = resources.usage_file(job['report'])
+    if resources.enabled:
+        if os.path.isfile(usage_path):
+            os.remove(usage_path)
+        argv = resources.wrap(argv, usage_path)
+    try:
+        proc = await asyncio.create_subprocess_exec(*argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+                                                    cwd=job.get('cwd'), start_new_session=True)
+    except OSError as err:
+        return {'tool':job['tool'], 'report':job['report'], 'status':'error', 'error':str(err), 'returncode':None,
+                'time':time.time()-start, 'bugs':[]}
+
+    with gzip.open(job['report']+".gz", 'wb') as out:
+        try:
+            await asyncio.wait_for(asyncio.gather(pump(proc.stdout, out, parser), proc.wait()), job.get('timeout'))
+        except asyncio.TimeoutError:
+            status = 'timeout'
+            terminate(proc)
+            try:
+                await asyncio.wait_for(proc.wait(), kill_grace)
+            except asyncio.TimeoutError:
+                os.killpg(proc.pid, signal.SIGKILL)
+                await proc.wait()
+            """Keep what the analyzer reported before it was stopped"""
+            while True:
+                chunk = await proc.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                out.write(chunk)
+                if parser is not None:
+                    parser.feed(chunk)
+
+        if job.get('output') is not None and os.path.isfile(job['output']):
+            with open(job['output'], 'rb') as fh:
+                data = fh.read()
+            out.write(data)
+
+    usage = resources.load(usage_path) if resources.enabled else None
+    if usage is not None and 'error' in usage:
+        os.remove(usage_path)
+        return {'tool':job['tool'], 'report':job['report'], 'status':'error', 'error':usage['error'], 'returncode':None,
+                'time':time.time()-start, 'bugs':[]}
+
+    if job.get('batch') is not None:
+        contracts = store_batch(job, bytes(parser.data), usage)
+        return {'tool':job['tool'], 'report':job['report'], 'status':status, 'returncode':proc.returncode,
+                'time':time.time()-start, 'bugs':[bug for c in contracts for bug in c['bugs']], 'contracts':contracts, 'usage':usage}
+    elif job.get('output') is not None:
+        bugs = []
+        if os.path.isfile(job['output']):
+            try:
+                bugs = inspection.parse_report(job['tool'], data, job.get('contract'))
+            except ValueError:
+                bugs = []
+    else:
+        try:
+            bugs = parser.close() if parser is not None else []
+        except ValueError:
+            bugs = []
+
+    """Only complete runs are cached, a timed out run may finish on a faster machine"""
+    if key is not None and status == 'ok' and proc.returncode is not None and proc.returncode >= 0:
+        report_cache.put(key, job['report']+".gz")
+
+    return {'tool':job['tool'], 'report':job['report'], 'status':status, 'returncode':proc.returncode,
+            'time':time.time()-start, 'bugs':bugs, 'usage':usage}
+
+async def run_jobs_async(jobs, concurrency, on_done=None):
+    semaphore = asyncio.Semaphore(concurrency)
+    """Runs are traced on one row per concurrency slot, as they all run in the event loop's thread"""
+    lanes = list(range(1, concurrency+1))
+    for lane in lanes:
+        tracing.name_thread(lane, "analyzer slot {0}".format(lane))
+
+    async def run_one(job):
+        async with semaphore:
+            lane = lanes.pop(0)
+            if job.get('before') is not None:
+                job['before'](job)
+            try:
+                with tracing.span("tool_run", tid=lane, tool=job['tool'], report=job['report']) as sp:
+                    result = await run_tool(job)
+                    sp.set(status=result['status'], bugs=len(result['bugs']))
+            finally:
+                lanes.append(lane)
+                lanes.sort()
+            if job.get('after') is not None:
+                job['after'](job, result)
+            if on_done is not None:
+                on_done(job, result)
+            return result
+
+    return await asyncio.gather(*[run_one(job) for job in jobs])
+
+def run_jobs(jobs, concurrency=1, on_done=None):
+    """Run analyzer jobs with at most concurrency of them at a time, returns their results in order"""
+    if len(jobs) == 0:
+        return []
+    return asyncio.run(run_jobs_async(jobs, concurrency, on_done))
+
+def printUsage(prog):
+    print("%s <tool> <report-file> <command> [<args> ...]" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    result = run_jobs([{'tool':sys.argv[1], 'report':sys.argv[2], 'argv':sys.argv[3:]}])[0]
+    print(result)
@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+
+import os, sys
+import json
+import time
+import atexit
+import functools
+import threading
+
+"""Lightweight spans and counters, exported as Chrome trace JSON (chrome://tracing, Perfetto) or JSON lines
+
+Tracing is off unless enable() is called or SOLIDIFI_TRACE=<output file> is set. When it is off,
+span() returns a shared no-op context manager and count() returns right away.
+"""
+
+enabled = False
+output_file = None
+events = []
+counters = {}
+lock = threading.Lock()
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+null_span = NullSpan()
+
+class Span:
+    def __init__(self, name, args, tid=None):
+        self.name = name
+        self.args = args
+        self.tid = tid
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        event = {'name':self.name, 'ph':'X', 'ts':round(self.start*1e6, 3), 'dur':round((end-self.start)*1e6, 3),
+                 'pid':os.getpid(), 'tid':threading.get_ident() if self.tid is None else self.tid}
+        if self.args:
+            event['args'] = self.args
+        with lock:
+            events.append(event)
+        return False
+
+    def set(self, **args):
+        """Attach extra values to the span once they are known"""
+        self.args.update(args)
+
+def span(name, tid=None, **args):
+    """Time a block: with tracing.span("inject_bug", bug_type=t): ...
+
+    Spans of work running concurrently in one thread (e.g. asyncio tasks) need a tid of their own,
+    otherwise the trace viewer nests them into each other.
+    """
+    if not enabled:
+        return null_span
+    return Span(name, args, tid)
+
+def name_thread(tid, name):
+    """Label the row of tid in the trace viewer"""
+    if not enabled:
+        return
+    with lock:
+        events.append({'name':'thread_name', 'ph':'M', 'pid':os.getpid(), 'tid':tid, 'args':{'name':name}})
+
+def traced(name=None):
+    """Decorator recording a span for every call of a function"""
+    def decorator(func):
+        span_name = name or func.__name__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, value=1):
+    """Add value to a counter (file opens, bytes read, regex scans, ...)"""
+    if not enabled:
+        return
+    with lock:
+        counters[name] = counters.get(name, 0) + value
+        events.append({'name':name, 'ph':'C', 'ts':round(time.perf_counter()*1e6, 3), 'pid':os.getpid(),
+                       'args':{name:counters[name]}})
+
+def enable(path=None):
+    """Start recording, and export to path when the process exits"""
+    global enabled, output_file
+    enabled = True
+    if path is not None and output_file is None:
+        atexit.register(export_at_exit)
+    if path is not None:
+        output_file = path
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    with lock:
+        del events[:]
+        counters.clear()
+
+def summary():
+    """Total time and call count per span name, plus the counters"""
+    spans = {}
+    for event in events:
+        if event['ph'] == 'X':
+            s = spans.setdefault(event['name'], {'calls':0, 'total_ms':0.0})
+            s['calls'] += 1
+            s['total_ms'] += event['dur']/1000.0
+    return {'spans':spans, 'counters':dict(counters)}
+
+def export(path):
+    """Write the trace as JSON lines if path ends with .jsonl, as Chrome trace JSON otherwise"""
+    with lock:
+        recorded = list(events)
+    """Each process exports its own trace when several workers record at once"""
+    if os.path.exists(path) and os.getpid() != main_pid:
+        root, ext = os.path.splitext(path)
+        path = "{0}.{1}{2}".format(root, os.getpid(), ext)
+    with open(path, 'w') as fh:
+        if path.endswith(".jsonl"):
+            for event in recorded:
+                fh.write(json.dumps(event)+"\n")
+        else:
+            json.dump({'traceEvents':recorded, 'displayTimeUnit':'ms', 'otherData':{'counters':dict(counters)}}, fh)
+    return path
+
+def export_at_exit():
+    if output_file is not None and len(events) > 0:
+        export(output_file)
+
+main_pid = os.getpid()
+if os.environ.get("SOLIDIFI_TRACE"):
+    enable(os.environ["SOLIDIFI_TRACE"])
+
+if __name__ == "__main__":
+    """Print the per-span totals of an exported trace"""
+    if len(sys.argv) != 2 or sys.argv[1] in ('--help', '-h'):
+        print("%s <trace.json or trace.jsonl>" % sys.argv[0])
+        sys.exit()
+    with open(sys.argv[1]) as fh:
+        if sys.argv[1].endswith(".jsonl"):
+            events = [json.loads(line) for line in fh]
+        else:
+            events = json.load(fh)['traceEvents']
+    for name, s in sorted(summary()['spans'].items(), key=lambda kv: -kv[1]['total_ms']):
+        print("{0:40} {1:8d} calls {2:12.3f} ms".format(name, s['calls'], s['total_ms']))
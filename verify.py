@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+
+import os, sys
+import csv
+import glob
+import solidifi
+import solc_versions
+import tracing
+
+"""Post-injection compile check: batched solc --standard-json runs, repairing the snippets that broke a buggy contract"""
+
+max_rounds = 3
+
+def read_bug_log(csv_file):
+    with open(csv_file) as fh:
+        bug_log = list(csv.DictReader(fh))
+    for bug in bug_log:
+        bug['loc'] = int(bug['loc'])
+        bug['length'] = int(bug['length'])
+    return bug_log
+
+def get_line(data, offset):
+    return data.count(b'\n', 0, offset)+1
+
+def get_line_offset(data, line):
+    offset = 0
+    for i in range(line-1):
+        offset = data.index(b'\n', offset)+1
+    return offset
+
+def find_bug(bug_log, line):
+    """The injected bug whose lines contain line"""
+    for bug in bug_log:
+        if bug['loc'] <= line < bug['loc']+bug['length']:
+            return bug
+    return None
+
+def get_snippet(bug):
+    """Raw text of the snippet a bug log row was injected from"""
+    form, name = os.path.split(bug['snippet'])
+    bug_dir = os.path.join(solidifi.bugs_dir, solidifi.get_bug_info(bug['bug type'])[0]['bug_type_dir'], form)
+    for snippet in solidifi.get_bug_snippets(bug_dir):
+        if snippet['file'] == name:
+            return snippet['snippet']
+    return None
+
+def next_snippet(bug, bug_log, tried):
+    """An unused snippet of the same bug type and form, None when all have been tried"""
+    form, name = os.path.split(bug['snippet'])
+    bug_dir = os.path.join(solidifi.bugs_dir, solidifi.get_bug_info(bug['bug type'])[0]['bug_type_dir'], form)
+    used = set(b['snippet'] for b in bug_log) | tried
+    for snippet in solidifi.get_bug_snippets(bug_dir):
+        if os.path.join(form, snippet['file']) not in used:
+            return os.path.join(form, snippet['file']), snippet['snippet']
+    return None, None
+
+def replace_bug(data, bug_log, bug, new_name=None, new_snippet=None):
+    """Swap the snippet of one injected bug for another one, or take it out when new_snippet is None
+
+    Snippets were inserted as <snippet>\\n before statements and as \\n<snippet> after blocks, whatever their
+    form, see inject_bugs; both ways the removal takes the snippet out with one of the line breaks around it.
+    Returns the new contents; the bug log is updated in place.
+    """
+    old = get_snippet(bug).strip()
+    start = get_line_offset(data, max(bug['loc']-1, 1))
+    pos = data.find(old, start)
+    if pos < 0:
+        return None
+    needle = old
+    if new_snippet is None:
+        replacement = b''
+        if data[pos+len(old):pos+len(old)+1] == b'\n':
+            needle = old+b'\n'
+        elif data[pos-1:pos] == b'\n':
+            pos, needle = pos-1, b'\n'+old
+    else:
+        replacement = new_snippet.strip()
+    data = data[0:pos] + replacement + data[pos+len(needle):]
+
+    new_length = len(new_snippet.splitlines()) if new_snippet is not None else 0
+    delta = (replacement.count(b'\n') - needle.count(b'\n'))
+    for b in bug_log:
+        if b['loc'] > bug['loc']:
+            b['loc'] += delta
+    if new_snippet is None:
+        bug_log.remove(bug)
+    else:
+        bug['length'] = new_length
+        bug['snippet'] = new_name
+    return data
+
+def write_bug_log(csv_file, bug_log):
+    with open(csv_file, 'w') as fh:
+        writer = csv.DictWriter(fh, fieldnames=['loc','length','bug type','approach','snippet'])
+        writer.writeheader()
+        for bug in bug_log:
+            writer.writerow(bug)
+
+@tracing.traced()
+def verify_variants(variants):
+    """Make sure buggy contracts compile, retrying or dropping the snippets that broke them
+
+    variants is a list of dicts with 'buggy_file', 'bug_log_file' and optionally 'bug_log' (kept up to date
+    in place). Each gets a 'status': 'ok', 'repaired' or 'failed' (errors outside any injected snippet, or
+    still failing after max_rounds).
+    """
+    pending = dict((v['buggy_file'], v) for v in variants)
+    tried = dict((v['buggy_file'], set()) for v in variants)
+    for v in variants:
+        if v.get('bug_log') is None:
+            v['bug_log'] = read_bug_log(v['bug_log_file'])
+        v['status'] = 'ok'
+
+    for rnd in range(max_rounds+1):
+        if len(pending) == 0:
+            break
+        errors = solc_versions.standard_json_errors(list(pending))
+        retry = {}
+        for f, v in pending.items():
+            if len(errors[f]) == 0:
+                continue
+            if rnd == max_rounds:
+                v['status'] = 'failed'
+                continue
+            with open(f, 'rb') as fh:
+                data = fh.read()
+            bugs = []
+            for err in errors[f]:
+                bug = find_bug(v['bug_log'], get_line(data, err['start'])) if err['start'] is not None else None
+                if bug is None or bug.get('snippet') in (None, ''):
+                    bugs = None
+                    break
+                if bug not in bugs:
+                    bugs.append(bug)
+            if bugs is None:
+                v['status'] = 'failed'
+                v['errors'] = [err['message'] for err in errors[f]]
+                continue
+
+            """Later bugs first, so each change only moves the lines of bugs already handled"""
+            for bug in sorted(bugs, key=lambda b: -b['loc']):
+                tried[f].add(bug['snippet'])
+                new_name, new_snippet = next_snippet(bug, v['bug_log'], tried[f])
+                new_data = replace_bug(data, v['bug_log'], bug, new_name, new_snippet)
+                if new_data is None:
+                    v['status'] = 'failed'
+                    break
+                data = new_data
+            if v['status'] == 'failed':
+                continue
+            with open(f, 'wb') as fh:
+                fh.write(data)
+            write_bug_log(v['bug_log_file'], v['bug_log'])
+            v['status'] = 'repaired'
+            retry[f] = v
+        pending = retry
+    return variants
+
+def get_variants(buggy_dir):
+    variants = []
+    for buggy_file in sorted(glob.glob(os.path.join(buggy_dir, "buggy_*.sol"))):
+        tail = os.path.basename(buggy_file)[len("buggy_"):-len(".sol")]
+        variants.append({'buggy_file':buggy_file, 'bug_log_file':os.path.join(buggy_dir, "BugLog_"+tail+".csv")})
+    return variants
+
+def printUsage(prog):
+    print("%s <buggy contracts dir> [<buggy contracts dir> ...]" % prog)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] in ('--help', '-h'):
+        printUsage(sys.argv[0])
+        sys.exit()
+    variants = []
+    for buggy_dir in sys.argv[1:]:
+        variants.extend(get_variants(buggy_dir))
+    for v in verify_variants(variants):
+        print("{0}: {1}".format(v['buggy_file'], v['status']))
+        for message in v.get('errors', []):
+            print("    " + message)
@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+
+import os, sys, re
+import time
+import getopt
+import shutil
+import solidifi
+import inspection
+import evaluator
+import tool_runner
+import slicer
+
+"""Watch mode: re-inject and re-score only what a change to the contracts, the bug snippets or the tool reports affects
+
+The trees are polled; a change is handled once they have been quiet for the debounce period.
+"""
+
+poll_interval = 0.5
+debounce = 1.0
+contracts_dir = "contracts"
+
+def snapshot(roots):
+    """Modification time and size of every file under the roots"""
+    state = {}
+    for root in roots:
+        for dirpath, dirs, files in os.walk(root):
+            for f in files:
+                if f.startswith('.') or f.startswith("tmp_"):
+                    continue
+                path = os.path.join(dirpath, f)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                state[path] = (st.st_mtime_ns, st.st_size)
+    return state
+
+def get_changes(old, new):
+    return set(path for path in set(old) | set(new) if old.get(path) != new.get(path))
+
+def wait_for_changes(roots, state):
+    """Block until files under the roots change and then stay unchanged for debounce seconds"""
+    changes = set()
+    quiet_since = None
+    while True:
+        time.sleep(poll_interval)
+        new_state = snapshot(roots)
+        new_changes = get_changes(state, new_state)
+        state = new_state
+        if new_changes:
+            changes |= new_changes
+            quiet_since = time.time()
+        elif changes and time.time()-quiet_since >= debounce:
+            return state, changes
+
+def get_contract_id(path):
+    """contracts/12.sol and buggy_12.sol.txt -> 12"""
+    name = os.path.basename(path)
+    if name.startswith("buggy_"):
+        name = name[len("buggy_"):]
+    name = re.split(r'[.:]', name)[0]
+    return int(name) if name.isdigit() else name
+
+class Watcher:
+    """Keeps the score of every (tool, bug type, contract) and updates the ones a change affects"""
+    def __init__(self, tools, bug_type_list):
+        self.tools = tools
+        self.bug_type_list = bug_type_list
+        self.asts = {}
+        self.scores = {}
+        self.metrics = {}
+        self.written = set()
+
+    def tool_dir(self, tool, bug_type):
+        return os.path.join(inspection.main_dir, tool, "analyzed_buggy_contracts", bug_type)
+
+    def tool_bug_types(self, tool):
+        return [bug_type for bug_type in [bugs['bugs'] for bugs in evaluator.bug_types if bugs['tool'] == tool][0]
+                if bug_type in self.bug_type_list]
+
+    def roots(self):
+        roots = [contracts_dir, solidifi.bugs_dir]
+        for tool in self.tools:
+            roots.append(os.path.join(inspection.main_dir, tool, "analyzed_buggy_contracts"))
+        return roots
+
+    def get_snippet_types(self, path):
+        """Bug types whose snippets live in the folder of path"""
+        rel = os.path.relpath(path, solidifi.bugs_dir).split(os.sep)
+        return [bug_info['bug_type'] for bug_info in solidifi.get_bug_types()
+                if bug_info['bug_type_dir'] == rel[0] and bug_info['bug_type'] in self.bug_type_list]
+
+    def handle(self, changes):
+        """Work out what the changed files affect and recompute it, in dependency order"""
+        inject = {}
+        rescore = set()
+        for path in sorted(changes):
+            if path in self.written:
+                continue
+            if path.startswith(os.path.join(solidifi.bugs_dir, "")):
+                bug_types = self.get_snippet_types(path)
+                for bug_type in bug_types:
+                    bug_info = solidifi.get_bug_info(bug_type)[0]
+                    solidifi.invalidate_snippets(os.path.join(solidifi.bugs_dir, bug_info['bug_type_dir']))
+                    for contract_file in sorted(os.listdir(contracts_dir)):
+                        if contract_file.endswith(".sol"):
+                            inject.setdefault(os.path.join(contracts_dir, contract_file), set()).add(bug_type)
+            elif os.path.dirname(os.path.abspath(path)) == os.path.abspath(contracts_dir):
+                if path.endswith(".sol"):
+                    self.asts.pop(get_contract_id(path), None)
+                    inject.setdefault(path, set()).update(self.bug_type_list)
+            else:
+                """A report or bug log under <main dir>/<tool>/analyzed_buggy_contracts/<bug type>/"""
+                parts = os.path.relpath(path, inspection.main_dir).split(os.sep)
+                if len(parts) >= 4 and parts[0] in self.tools and os.path.basename(path).startswith(("buggy_", "BugLog_")):
+                    name = os.path.basename(path)
+                    cs = get_contract_id(name[len("BugLog_"):] if name.startswith("BugLog_") else name)
+                    rescore.add((parts[0], parts[2], cs))
+        self.written = set()
+
+        for contract_file, bug_types in sorted(inject.items()):
+            rescore |= self.reinject(contract_file, [bug_type for bug_type in self.bug_type_list if bug_type in bug_types])
+        for tool, bug_type, cs in sorted(rescore, key=str):
+            self.rescore(tool, bug_type, cs)
+
+    def reinject(self, contract_file, bug_type_list):
+        """Inject one contract again and analyze the new buggy contracts, returns the scores to update"""
+        cs = get_contract_id(contract_file)
+        if not os.path.isfile(contract_file):
+            for tool in self.tools:
+                for bug_type in self.tool_bug_types(tool):
+                    self.scores.pop((tool, bug_type, cs), None)
+            return set()
+        if cs not in self.asts and len(solidifi.compile_check([contract_file])) > 0:
+            print("{0} contains compilation errors".format(contract_file))
+            return set()
+        solidifi.clear_globals()
+        injected = solidifi.inject_all(contract_file, bug_type_list, "buggy", "ast", self.asts.get(cs))
+        if injected is None:
+            return set()
+        self.asts[cs] = solidifi.cur_contr_ast_data
+        kept = evaluator.verify_injections([{'contract':cs, 'bug_type':bug_type, 'bug_log':injected[bug_type]['bug_log']} for bug_type in bug_type_list])
+        kept_types = [inj['bug_type'] for inj in kept]
+        print("Re-injected {0}: {1}".format(contract_file, ", ".join(kept_types)))
+
+        rescore = set()
+        for tool in self.tools:
+            jobs = []
+            for bug_type in self.tool_bug_types(tool):
+                if bug_type not in kept_types:
+                    continue
+                injected_scs = self.tool_dir(tool, bug_type)
+                os.makedirs(os.path.join(injected_scs, "results"), exist_ok=True)
+                for name in ("buggy_"+str(cs)+".sol", "BugLog_"+str(cs)+".csv"):
+                    shutil.copyfile(os.path.join("buggy", bug_type, name), os.path.join(injected_scs, name))
+                    self.written.add(os.path.join(injected_scs, name))
+                buggy_sc = os.path.join(injected_scs, "buggy_"+str(cs)+".sol")
+                #the new buggy contract is not sliced, a line map left by a sliced campaign no longer applies
+                for stale in (buggy_sc+slicer.full_suffix, slicer.map_file(buggy_sc)):
+                    if os.path.isfile(stale):
+                        os.remove(stale)
+                result_file = os.path.join(injected_scs, "results", os.path.basename(buggy_sc)+(".json" if tool in ("Slither","Oyente") else ".txt"))
+                jobs.extend(evaluator.get_tool_jobs(tool, buggy_sc, injected_scs, result_file))
+                rescore.add((tool, bug_type, cs))
+            for job in jobs:
+                self.written.add(job['report']+".gz")
+            tool_runner.run_jobs(jobs, evaluator.concurrency)
+        return rescore
+
+    def rescore(self, tool, bug_type, cs):
+        key = (tool, bug_type, cs)
+        injected_scs = self.tool_dir(tool, bug_type)
+        bug_log = os.path.join(injected_scs, "BugLog_"+str(cs)+".csv")
+        if not os.path.isfile(bug_log):
+            self.scores.pop(key, None)
+            return
+        try:
+            self.scores[key] = inspection.Inspector(tool).inspect(inspection.read_file(bug_log), inspection.get_reports(tool, injected_scs, cs),
+                                                                  bug_type, cs, inspection.get_line_map(injected_scs, cs))
+        except (OSError, ValueError):
+            """No report yet, or one still being written"""
+            self.scores.pop(key, None)
+
+    def score_all(self):
+        for tool in self.tools:
+            for bug_type in self.tool_bug_types(tool):
+                injected_scs = self.tool_dir(tool, bug_type)
+                if not os.path.isdir(injected_scs):
+                    continue
+                for name in sorted(os.listdir(injected_scs)):
+                    if name.startswith("BugLog_"):
+                        self.rescore(tool, bug_type, get_contract_id(name[len("BugLog_"):]))
+
+    def get_metrics(self):
+        """FN and misclassification counts per tool and bug type, and FP counts per tool and reported bug type, over the scored contracts"""
+        metrics = {}
+        reported_non_injected = []
+        for (tool, bug_type, cs), score in self.scores.items():
+            m = metrics.setdefault((tool, 'FN', bug_type), {'InjectedBugs':0, 'FalseNegatives':0, 'MisClassified':0})
+            m['InjectedBugs'] += score['ibugs']
+            m['FalseNegatives'] += len(score['false_negatives'])
+            m['MisClassified'] += len(score['misclassifications'])
+            reported_non_injected.extend(score['non_injected'])
+        contracts = sorted(set(cs for (tool, bug_type, cs) in self.scores), key=str)
+        coded_reported_non_injected = inspection.get_coded_non_injected(reported_non_injected)
+        for tool in self.tools:
+            for fp in inspection.get_fps(tool, coded_reported_non_injected, contracts):
+                metrics[(tool, 'FP', fp['BugType'])] = {'FalsePositives':fp['FalsePositives'], 'ExcludedByMajority':fp['ExcludedByMajority']}
+        return metrics
+
+    def print_deltas(self):
+        metrics = self.get_metrics()
+        for key in sorted(set(metrics) | set(self.metrics)):
+            old = self.metrics.get(key, {})
+            new = metrics.get(key, {})
+            if old == new:
+                continue
+            tool, kind, bug_type = key
+            values = []
+            for column in sorted(set(old) | set(new)):
+                before, after = old.get(column, 0), new.get(column, 0)
+                values.append("{0} {1}".format(column, after) if before == after else "{0} {1} -> {2} ({3:+d})".format(column, before, after, after-before))
+            print("{0} {1} {2}: {3}".format(tool, kind, bug_type, ", ".join(values)))
+        self.metrics = metrics
+
+    def run(self):
+        print("Scoring the existing reports")
+        self.score_all()
+        self.print_deltas()
+        roots = self.roots()
+        state = snapshot(roots)
+        print("Watching {0}".format(", ".join(roots)))
+        while True:
+            state, changes = wait_for_changes(roots, state)
+            start = time.time()
+            self.handle(changes)
+            """Our own outputs are not changes to handle, anything else that changed meanwhile is"""
+            new_state = snapshot(roots)
+            pending = get_changes(state, new_state) - self.written
+            state = new_state
+            if pending:
+                self.handle(pending)
+                state = snapshot(roots)
+            self.print_deltas()
+            print("Updated in {0:.1f}s".format(time.time()-start))
+
+def printUsage(prog):
+    print("%s watch [--tools <tool1,tool2,...>] [--bug-types <type1,type2,...>] [--contracts <dir>] [--interval <s>] [--debounce <s>] [--jobs <n>]" % prog)
+
+def main(argv):
+    global poll_interval, debounce, contracts_dir
+    try:
+        opts, args = getopt.getopt(argv, "hj:", ["help", "tools=", "bug-types=", "contracts=", "interval=", "debounce=", "jobs="])
+    except getopt.GetoptError:
+        printUsage("solidifi.py")
+        return 2
+    tools = []
+    bug_type_list = None
+    for opt, val in opts:
+        if opt in ('-h', '--help'):
+            printUsage("solidifi.py")
+            return 0
+        elif opt == '--tools':
+            tools = val.split(',')
+        elif opt == '--bug-types':
+            bug_type_list = val.split(',')
+        elif opt == '--contracts':
+            contracts_dir = val
+        elif opt == '--interval':
+            poll_interval = float(val)
+        elif opt == '--debounce':
+            debounce = float(val)
+        elif opt in ('-j', '--jobs'):
+            evaluator.concurrency = int(val)
+    if bug_type_list is None:
+        """The bug types of the watched tools, or all of them"""
+        tool_bugs = set(bug for bugs in evaluator.bug_types if bugs['tool'] in tools for bug in bugs['bugs'])
+        bug_type_list = [bug_info['bug_type'] for bug_info in solidifi.get_bug_types() if len(tools) == 0 or bug_info['bug_type'] in tool_bugs]
+    try:
+        Watcher(tools, bug_type_list).run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))